@@ -1,6 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Course, ChatMessage, KnowledgeBase
+from django.db.models.functions import Substr
+from .admin_scaling import AutocompleteFilter, AutocompleteFilterMixin, LargeTableMixin
+from .search import engine_for, search_ids
+from .models import User, Course, ChatMessage, Conversation, ConversationArchive, KnowledgeBase, TranscriptSummary
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -9,20 +12,60 @@ class CustomUserAdmin(UserAdmin):
     ordering = ('email',)
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ('course_name', 'user', 'letter_grade', 'credits')
-    list_filter = ('user',)
+    list_filter = (('user', AutocompleteFilter),)
+    list_select_related = ('user',)
 
 @admin.register(ChatMessage)
-class ChatMessageAdmin(admin.ModelAdmin):
+class ChatMessageAdmin(LargeTableMixin, AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ('role', 'user', 'content_preview', 'created_at')
-    list_filter = ('role', 'created_at', 'user')
-    
+    list_filter = ('role', 'created_at', ('user', AutocompleteFilter))
+    list_select_related = ('user',)
+
+    def get_queryset(self, request):
+        # Cut the preview in SQL rather than loading whole messages.
+        return super().get_queryset(request).annotate(preview=Substr('content', 1, 50)).defer('content')
+
     def content_preview(self, obj):
-        return obj.content[:50]
+        return obj.preview
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ('conversation_id', 'user', 'title', 'message_count', 'last_activity')
+    search_fields = ('conversation_id', 'title')
+    raw_id_fields = ('user',)
+    list_select_related = ('user',)
+
+@admin.register(ConversationArchive)
+class ConversationArchiveAdmin(admin.ModelAdmin):
+    list_display = ('conversation_id', 'user', 'codec', 'message_count', 'raw_bytes', 'last_created_at')
+    list_filter = ('codec',)
+    raw_id_fields = ('user',)
+    list_select_related = ('user',)
+    exclude = ('data',)
 
 @admin.register(KnowledgeBase)
-class KnowledgeBaseAdmin(admin.ModelAdmin):
-    list_display = ('question', 'is_verified', 'created_at')
+class KnowledgeBaseAdmin(LargeTableMixin, admin.ModelAdmin):
+    list_display = ('question_preview', 'is_verified', 'created_at')
     search_fields = ('question', 'answer')
     list_filter = ('is_verified',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(preview=Substr('question', 1, 50)).defer('question', 'answer')
+
+    @admin.display(description='Question')
+    def question_preview(self, obj):
+        return obj.preview
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of LIKE '%term%' scans where we have one.
+        if not search_term or engine_for() == 'like':
+            return super().get_search_results(request, queryset, search_term)
+        ids = [pk for pk, _ in search_ids(search_term, limit=1000)]
+        return queryset.filter(id__in=ids), False
+
+@admin.register(TranscriptSummary)
+class TranscriptSummaryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'semester_year', 'course_count', 'total_credits', 'semester_gpa', 'cumulative_gpa')
+    list_select_related = ('user',)
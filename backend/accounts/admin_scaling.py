@@ -0,0 +1,165 @@
+"""Admin changelists for tables with millions of rows (chat messages).
+
+The stock changelist runs ``COUNT(*)`` over the filtered table (and again
+unfiltered), pages with ``OFFSET`` and renders one link per related row in a
+foreign-key filter. :class:`LargeTableMixin` replaces those with
+
+* :class:`EstimatedCountPaginator`: the unfiltered total is read from the
+  planner statistics (PostgreSQL) or the largest id, and filtered totals are
+  counted up to ``ADMIN_COUNT_LIMIT`` rows, then shown as "N+";
+* :class:`KeysetChangeList`: newest-first pages of ``id < cursor``, so any
+  page is an index range scan; sorting by a column falls back to numbered
+  pages (with the estimated count).
+
+:class:`AutocompleteFilter` is a foreign-key list filter that searches the
+related admin's ``search_fields`` as you type instead of listing every row;
+admins using it need :class:`AutocompleteFilterMixin` for the select2 assets.
+"""
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+CURSOR_VAR = 'cursor'
+
+
+def estimated_count(model, using):
+    """Row count of a whole table without scanning it."""
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                           [connection.ops.quote_name(model._meta.db_table)])
+            row = cursor.fetchone()
+        if row and row[0] >= 0:  # -1 until the table is first analyzed
+            return row[0]
+    # One index probe; overcounts by the rows deleted since.
+    return model._default_manager.using(using).aggregate(n=Max('pk'))['n'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    exact = True
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            self.exact = False
+            return estimated_count(queryset.model, queryset.db)
+        limit = getattr(settings, 'ADMIN_COUNT_LIMIT', 10000)
+        count = queryset.order_by().values('pk')[:limit].count()
+        self.exact = count < limit
+        return count
+
+    @property
+    def count_label(self):
+        count = self.count
+        if self.exact:
+            return str(count)
+        if self.object_list.query.where:
+            return f'{count}+'
+        return f'about {count}'
+
+
+class KeysetChangeList(ChangeList):
+    """Changelist paged on ``id < cursor`` while in its default ``-pk`` order."""
+    cursor = None
+    next_cursor = None
+    keyset = False
+
+    def get_queryset(self, request, exclude_parameters=None):
+        # Not a field lookup: keep it out of the filters and of the links they build.
+        if CURSOR_VAR in self.params:
+            self.cursor = self.params.pop(CURSOR_VAR)
+            self.filter_params.pop(CURSOR_VAR, None)
+        return super().get_queryset(request, exclude_parameters)
+
+    def get_results(self, request):
+        self.keyset = ORDER_VAR not in self.params
+        if not self.keyset:
+            return super().get_results(request)
+
+        queryset = self.queryset
+        if self.cursor:
+            try:
+                queryset = queryset.filter(pk__lt=int(self.cursor))
+            except ValueError:
+                raise IncorrectLookupParameters
+        rows = list(queryset[:self.list_per_page + 1])
+        if len(rows) > self.list_per_page:
+            rows = rows[:self.list_per_page]
+            self.next_cursor = rows[-1].pk
+
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = self.paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = bool(self.cursor or self.next_cursor)
+
+    @property
+    def first_page_url(self):
+        return self.get_query_string()
+
+    @property
+    def next_page_url(self):
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+
+class LargeTableMixin:
+    """ModelAdmin mixin: estimated counts, keyset pages, no facet counts."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    ordering = ('-pk',)
+    change_list_template = 'admin/accounts/keyset_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """Foreign-key filter backed by the admin autocomplete view.
+
+    Only the selected row is queried; the related model's admin must define
+    ``search_fields``.
+    """
+    template = 'admin/accounts/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.admin_site = model_admin.admin_site
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        widget = AutocompleteSelect(self.field, self.admin_site, attrs={
+            'class': 'autocomplete-filter',
+            'data-lookup': self.lookup_kwarg,
+            'data-query-string': changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+        })
+        field = forms.ModelChoiceField(self.field.remote_field.model._default_manager.all(), required=False,
+                                       widget=widget)
+        value = self.lookup_val[-1] if self.lookup_val else None
+        yield {'widget': field.widget.render(self.lookup_kwarg, value)}
+
+
+class AutocompleteFilterMixin:
+    """ModelAdmin mixin loading select2 for :class:`AutocompleteFilter`."""
+
+    @property
+    def media(self):
+        return (super().media + AutocompleteSelect(None, self.admin_site).media
+                + forms.Media(js=['accounts/admin/autocomplete_filter.js']))
@@ -0,0 +1,145 @@
+"""Cold storage for idle conversations.
+
+``compact()`` moves every message of a conversation that has been idle for
+longer than N days out of ChatMessage into one ConversationArchive row holding
+the messages as compressed JSON (zlib or lzma), then deletes the hot rows. If
+an archived conversation is resumed, the next compaction merges the new
+messages into the same archive.
+
+Archived messages keep their original ids and timestamps, so the (created_at,
+id) history cursor continues seamlessly from hot rows into the archive.
+Decompressed archives are kept in a small per-process LRU keyed by archive id
+and ``archived_at``, so a re-compacted archive is never served stale.
+"""
+import json
+import lzma
+import zlib
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .kb_cache import LRUCache
+from .models import ChatMessage, ConversationArchive
+
+CODECS = {
+    'zlib': (lambda raw: zlib.compress(raw, 9), zlib.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+DEFAULT_CODEC = 'zlib'
+ARCHIVE_FIELDS = ('id', 'role', 'content', 'context', 'created_at')
+
+archive_cache = LRUCache(
+    maxsize=getattr(settings, 'CHAT_ARCHIVE_CACHE_SIZE', 128),
+    ttl=getattr(settings, 'CHAT_ARCHIVE_CACHE_TTL', 600),
+)
+
+
+def _dumps(rows):
+    return json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def pack(rows, codec=DEFAULT_CODEC):
+    """Compress ``[(id, role, content, context, created_at_iso), ...]``. Returns ``(blob, raw_bytes)``."""
+    raw = _dumps(rows)
+    return CODECS[codec][0](raw), len(raw)
+
+
+def unpack(blob, codec):
+    return json.loads(CODECS[codec][1](bytes(blob)))
+
+
+def _row(message):
+    pk, role, content, context, created_at = message
+    return [pk, role, content, context, created_at.isoformat()]
+
+
+def archive_conversation(user_id, conversation_id, codec=DEFAULT_CODEC):
+    """Move the hot rows of one conversation into its archive.
+
+    Returns ``{'messages', 'hot_bytes', 'archive_bytes'}``: the uncompressed
+    payload removed from ChatMessage and how much the archive blob grew. None
+    if there was nothing to move.
+    """
+    with transaction.atomic():
+        hot = [
+            _row(m) for m in
+            ChatMessage.objects.filter(user_id=user_id, conversation_id=conversation_id)
+            .order_by('created_at', 'id').values_list(*ARCHIVE_FIELDS)
+        ]
+        if not hot:
+            return None
+        archive = (
+            ConversationArchive.objects.select_for_update()
+            .filter(user_id=user_id, conversation_id=conversation_id).first()
+        )
+        old_size = len(archive.data) if archive else 0
+        rows = unpack(archive.data, archive.codec) + hot if archive else hot
+        blob, raw_bytes = pack(rows, codec)
+
+        archive = archive or ConversationArchive(user_id=user_id, conversation_id=conversation_id)
+        archive.codec = codec
+        archive.data = blob
+        archive.message_count = len(rows)
+        archive.raw_bytes = raw_bytes
+        archive.first_created_at = datetime.fromisoformat(rows[0][4])
+        archive.last_created_at = datetime.fromisoformat(rows[-1][4])
+        archive.save()
+
+        # Rows inserted after the SELECT above get larger ids and stay hot.
+        ChatMessage.objects.filter(
+            user_id=user_id, conversation_id=conversation_id, id__lte=max(row[0] for row in hot),
+        ).delete()
+    return {
+        'messages': len(hot),
+        'hot_bytes': len(_dumps(hot)),
+        'archive_bytes': len(blob) - old_size,
+    }
+
+
+def idle_conversations(days):
+    """``(user_id, conversation_id)`` pairs whose newest hot message is older than ``days``."""
+    cutoff = timezone.now() - timedelta(days=days)
+    return (
+        ChatMessage.objects.values_list('user_id', 'conversation_id')
+        .annotate(last=Max('created_at')).filter(last__lt=cutoff)
+        .order_by('user_id', 'conversation_id')
+    )
+
+
+def compact(days, codec=DEFAULT_CODEC, dry_run=False):
+    """Archive every conversation idle for more than ``days``. Returns totals."""
+    totals = {'conversations': 0, 'messages': 0, 'hot_bytes': 0, 'archive_bytes': 0}
+    for user_id, conversation_id, _ in list(idle_conversations(days)):
+        if dry_run:
+            totals['conversations'] += 1
+            continue
+        result = archive_conversation(user_id, conversation_id, codec)
+        if result:
+            totals['conversations'] += 1
+            for key in ('messages', 'hot_bytes', 'archive_bytes'):
+                totals[key] += result[key]
+    totals['reclaimed_bytes'] = totals['hot_bytes'] - totals['archive_bytes']
+    return totals
+
+
+def archived_messages(user_id, conversation_id):
+    """Unsaved ChatMessage objects of a conversation's archive, oldest first (cached)."""
+    meta = (
+        ConversationArchive.objects.filter(user_id=user_id, conversation_id=conversation_id)
+        .values_list('id', 'archived_at').first()
+    )
+    if meta is None:
+        return []
+    messages = archive_cache.get(meta)
+    if messages is None:
+        blob, codec = ConversationArchive.objects.values_list('data', 'codec').get(id=meta[0])
+        messages = [
+            ChatMessage(id=pk, user_id=user_id, conversation_id=conversation_id, role=role,
+                        content=content, context=context, created_at=datetime.fromisoformat(created_at))
+            for pk, role, content, context, created_at in unpack(blob, codec)
+        ]
+        archive_cache.set(meta, messages)
+    return messages
@@ -0,0 +1,181 @@
+"""Native async views, served without a sync worker under ASGI.
+
+DRF views are synchronous, so these are plain Django async views that reuse
+simplejwt for authentication and return JSON / Server-Sent Events directly.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import update_last_login
+from django.db import IntegrityError
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import CachedJWTAuthentication
+from .chat import recent_history, save_turn
+from .chat_backends import get_chat_backend
+from .hashing import HashingPoolSaturated, hashing_pool
+from .models import User
+from .serializers import UserRegistrationSerializer
+
+MAX_MESSAGE_LENGTH = 8000
+
+
+async def authenticate(request):
+    """Return the JWT user for ``request`` or None."""
+    auth = CachedJWTAuthentication()
+    try:
+        header = auth.get_header(request)
+        raw_token = auth.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        validated_token = auth.get_validated_token(raw_token)
+        return await sync_to_async(auth.get_user)(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def _read_json(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def too_busy():
+    response = JsonResponse({'success': False, 'error': 'Server busy, please retry.'}, status=429)
+    response['Retry-After'] = '1'
+    return response
+
+
+def sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+# STREAMING CHAT (Server-Sent Events)
+# POST {"message": "...", "conversation_id": "...", "context": "..."} and read
+# `token` events until `done`. Both ChatMessage rows are written once the reply
+# has finished streaming, or with the partial reply if the client disconnects.
+# `done` carries the reply's message_id unless the write is still queued
+# (CHAT_WRITE_BEHIND).
+@csrf_exempt
+@require_POST
+async def chat_stream(request):
+    user = await authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    data = _read_json(request)
+    message = (data or {}).get('message')
+    if not isinstance(message, str) or not message.strip() or len(message) > MAX_MESSAGE_LENGTH:
+        return JsonResponse({'success': False, 'error': 'Invalid message'}, status=400)
+    conversation_id = str(data.get('conversation_id') or 'default')[:50]
+    context = str(data.get('context') or 'general')[:20]
+
+    history = await sync_to_async(recent_history)(user, conversation_id)
+    backend = get_chat_backend()
+
+    async def events():
+        chunks, completed, failed = [], False, False
+        try:
+            async for chunk in backend.stream(history, message, context):
+                chunks.append(chunk)
+                yield sse('token', {'token': chunk})
+            completed = True
+        except Exception:
+            failed = True
+        finally:
+            if not completed and not failed:
+                # Client went away (cancelled, or closed at a yield): keep what was said so far.
+                await asyncio.shield(sync_to_async(save_turn)(user, conversation_id, context, message,
+                                                              ''.join(chunks)))
+        if failed:
+            yield sse('error', {'error': 'Generation failed'})
+            await sync_to_async(save_turn)(user, conversation_id, context, message, '')
+            return
+        saved = await sync_to_async(save_turn)(user, conversation_id, context, message, ''.join(chunks))
+        done = {'conversation_id': conversation_id}
+        if saved[-1].id is not None:  # None while only queued (CHAT_WRITE_BEHIND)
+            done['message_id'] = saved[-1].id
+        yield sse('done', done)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ASYNC REGISTRATION / LOGIN
+# Same request and response bodies as register/ and login/, but the password
+# hash runs in the bounded hashing pool; when it is full the answer is 429.
+def _validate_registration(data):
+    serializer = UserRegistrationSerializer(data=data)
+    return serializer.validated_data if serializer.is_valid() else None
+
+
+def _create_user(data, password_hash):
+    user = User(email=User.objects.normalize_email(data['email']),
+                username=User.normalize_username(data['username']), password=password_hash)
+    try:
+        user.save()
+    except IntegrityError:
+        return None  # lost a race with a sign-up for the same email/username
+    return user
+
+
+@csrf_exempt
+@require_POST
+async def register(request):
+    data = _read_json(request)
+    validated = await sync_to_async(_validate_registration)(data) if data is not None else None
+    if validated is None:
+        return JsonResponse({'error': 'Registration failed.'}, status=400)
+    try:
+        password_hash = await hashing_pool.run(make_password, validated['password'])
+    except HashingPoolSaturated:
+        return too_busy()
+    user = await sync_to_async(_create_user)(validated, password_hash)
+    if user is None:
+        return JsonResponse({'error': 'Registration failed.'}, status=400)
+    return JsonResponse({'success': True, 'user': {'username': user.username, 'email': user.email}}, status=201)
+
+
+def _find_user(email):
+    return User.objects.filter(email=email).first()
+
+
+def _issue_tokens(user):
+    refresh = RefreshToken.for_user(user)
+    if api_settings.UPDATE_LAST_LOGIN:
+        update_last_login(None, user)
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    data = _read_json(request) or {}
+    email, password = data.get('email'), data.get('password')
+    if not isinstance(email, str) or not isinstance(password, str):
+        return JsonResponse({'detail': 'Email and password are required.'}, status=400)
+    user = await sync_to_async(_find_user)(email)
+    try:
+        if user is None:
+            # Hash anyway so response time does not reveal which emails exist.
+            await hashing_pool.run(make_password, password)
+            valid = False
+        else:
+            valid = await hashing_pool.run(check_password, password, user.password)
+    except HashingPoolSaturated:
+        return too_busy()
+    if not valid or not user.is_active:
+        return JsonResponse({'detail': 'No active account found with the given credentials'}, status=401)
+    return JsonResponse(await sync_to_async(_issue_tokens)(user))
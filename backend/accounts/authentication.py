@@ -0,0 +1,89 @@
+"""JWT authentication without a User query on every request.
+
+``CachedJWTAuthentication`` resolves the token's user through a bounded
+per-process LRU with a short TTL (``AUTH_USER_CACHE_SIZE`` /
+``AUTH_USER_CACHE_TTL``). Each entry is tagged with the user's generation in
+the shared cache (accounts.caching), which the User save/delete signals bump,
+so deactivating, deleting a user or changing their password takes effect
+immediately in this process and within the shared cache's ``LOCAL_TIMEOUT``
+in the other workers.
+
+``ClaimsJWTAuthentication`` goes further for read endpoints: with
+``JWT_CLAIMS_ONLY_READS`` on, GET/HEAD/OPTIONS requests get a ``TokenUser``
+built from the token claims alone (no lookup at all). Views using it must only
+rely on ``request.user.id`` (converted to the User pk type, so it compares
+equal to ``user_id`` columns), and a deactivated user keeps read access until
+their access token expires.
+"""
+from copy import copy
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .caching import invalidate_namespace, namespace_generation
+from .kb_cache import LRUCache
+
+user_cache = LRUCache(
+    maxsize=getattr(settings, 'AUTH_USER_CACHE_SIZE', 4096),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+
+
+def _namespace(key):
+    return f'auth_user:{key}'
+
+
+def invalidate_user(user_id):
+    user_cache.delete(str(user_id))
+    invalidate_namespace(_namespace(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            key = str(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError as e:
+            raise InvalidToken('Token contained no recognizable user identification') from e
+
+        generation = namespace_generation(_namespace(key))
+        cached = user_cache.get(key)
+        if cached is None or cached[0] != generation:
+            user = super().get_user(validated_token)
+            user_cache.set(key, (generation, user))
+        else:
+            user = cached[1]
+            if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+                raise AuthenticationFailed('User is inactive', code='user_inactive')
+            if getattr(api_settings, 'CHECK_REVOKE_TOKEN', False) and (
+                    validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)):
+                raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        # Requests may set attributes on request.user; don't share one instance.
+        return copy(user)
+
+
+class ClaimsUser(TokenUser):
+    """TokenUser whose ``id`` has the User pk type instead of the claim's string."""
+
+    @cached_property
+    def id(self):
+        return get_user_model()._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+
+class ClaimsJWTAuthentication(CachedJWTAuthentication):
+    def authenticate(self, request):
+        self.claims_only = request.method in SAFE_METHODS and getattr(settings, 'JWT_CLAIMS_ONLY_READS', False)
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if self.claims_only:
+            if api_settings.USER_ID_CLAIM not in validated_token:
+                raise InvalidToken('Token contained no recognizable user identification')
+            return ClaimsUser(validated_token)
+        return super().get_user(validated_token)
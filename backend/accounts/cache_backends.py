@@ -0,0 +1,166 @@
+"""Cache backend shared by every worker process on one host, without Redis.
+
+``TwoTierCache`` keeps a small per-process LRU (tier 1) in front of a SQLite
+file in WAL mode (tier 2) that all gunicorn workers open. Reads hit tier 1
+first; tier-1 entries live at most ``LOCAL_TIMEOUT`` seconds, which bounds how
+long a worker can miss another worker's ``set``/``delete`` of the same key.
+Keys that must never be stale are versioned by the caller instead (see
+accounts.caching and accounts.versions).
+
+Configure it in ``CACHES``::
+
+    'default': {
+        'BACKEND': 'accounts.cache_backends.TwoTierCache',
+        'LOCATION': '/path/to/cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 20000, 'LOCAL_MAX_ENTRIES': 1024, 'LOCAL_TIMEOUT': 5},
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = 'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL) WITHOUT ROWID'
+CULL_EVERY = 200
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.local_max_entries = int(options.get('LOCAL_MAX_ENTRIES', 1024))
+        self.local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        self._local = OrderedDict()  # key -> (pickled value, monotonic expiry)
+        self._lock = threading.Lock()
+        self._tls = threading.local()
+        self._writes = 0
+
+    # --- shared tier (SQLite) ---
+    def _conn(self):
+        # One connection per thread, reopened in forked workers.
+        conn = getattr(self._tls, 'conn', None)
+        if conn is None or self._tls.pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(SCHEMA)
+            self._tls.conn, self._tls.pid = conn, os.getpid()
+        return conn
+
+    def _expiry(self, timeout):
+        return self.get_backend_timeout(timeout)  # absolute epoch seconds, or None
+
+    def _maybe_cull(self, conn):
+        self._writes += 1
+        if self._writes % CULL_EVERY:
+            return
+        conn.execute('DELETE FROM cache WHERE expires < ?', (time.time(),))
+        (count,) = conn.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count > self._max_entries:
+            conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,),
+            )
+
+    # --- local tier ---
+    def _local_get(self, key):
+        with self._lock:
+            item = self._local.get(key)
+            if item is None:
+                return None
+            if item[1] <= time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return item[0]
+
+    def _local_set(self, key, pickled, expires):
+        ttl = self.local_timeout if expires is None else min(self.local_timeout, expires - time.time())
+        if ttl <= 0:
+            return self._local_delete(key)
+        with self._lock:
+            self._local[key] = (pickled, time.monotonic() + ttl)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    # --- BaseCache API ---
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        pickled = self._local_get(key)
+        if pickled is None:
+            row = self._conn().execute(
+                'SELECT value, expires FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                return default
+            pickled = row[0]
+            self._local_set(key, pickled, row[1])
+        return pickle.loads(pickled)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        pickled, expires = pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expiry(timeout)
+        conn = self._conn()
+        conn.execute('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)', (key, pickled, expires))
+        self._local_set(key, pickled, expires)
+        self._maybe_cull(conn)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Atomic across processes: only replaces a missing or expired row.
+        key = self.make_and_validate_key(key, version=version)
+        pickled, expires = pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expiry(timeout)
+        conn = self._conn()
+        conn.execute(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (key, pickled, expires, time.time()),
+        )
+        added = conn.execute('SELECT changes()').fetchone()[0] == 1
+        if added:
+            self._local_set(key, pickled, expires)
+            self._maybe_cull(conn)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._conn()
+        conn.execute('UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                     (self._expiry(timeout), key, time.time()))
+        self._local_delete(key)
+        return conn.execute('SELECT changes()').fetchone()[0] == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._local_delete(key)
+        conn = self._conn()
+        conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+        return conn.execute('SELECT changes()').fetchone()[0] == 1
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self._conn().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Connections are per thread and reused across requests; nothing to do.
+        pass
+
+
+_MISSING = object()
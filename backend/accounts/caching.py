@@ -0,0 +1,94 @@
+"""Namespaced, single-flight helpers on top of the default Django cache.
+
+Every key lives in a namespace (``courses:<user_id>``, ``knowledge_base`` ...)
+whose generation token is part of the stored key, so
+:func:`invalidate_namespace` drops the whole namespace with one write.
+
+:func:`get_or_compute` lets only one caller recompute a missing value: threads
+of this process wait on a lock, other processes wait on a short ``cache.add``
+lease and pick up the value once the winner stores it.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+
+LEASE_SECONDS = 30
+WAIT_STEP = 0.02
+MAX_WAIT = 5.0
+
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+
+def _generation_key(namespace):
+    return f'ns:{namespace}'
+
+
+def namespace_generation(namespace):
+    generation = cache.get(_generation_key(namespace))
+    if generation is None:
+        generation = time.time_ns()
+        if not cache.add(_generation_key(namespace), generation, None):
+            generation = cache.get(_generation_key(namespace), generation)
+    return generation
+
+
+def invalidate_namespace(namespace):
+    cache.set(_generation_key(namespace), time.time_ns(), None)
+
+
+def namespaced_key(namespace, key):
+    return f'{namespace}:{namespace_generation(namespace)}:{key}'
+
+
+def _local_lock(key):
+    with _key_locks_guard:
+        lock = _key_locks.get(key)
+        if lock is None:
+            lock = _key_locks[key] = threading.Lock()
+        return lock
+
+
+def get_or_compute(namespace, key, compute, timeout=None, cacheable=None):
+    """Cached value of ``compute()``, computed by one caller at a time.
+
+    ``cacheable(value)`` can refuse to store a result (e.g. an error response);
+    ``timeout`` defaults to the cache's own TIMEOUT.
+    """
+    full_key = namespaced_key(namespace, key)
+    timeout_kwargs = {} if timeout is None else {'timeout': timeout}
+    value = cache.get(full_key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    lock = _local_lock(full_key)
+    with lock:
+        value = cache.get(full_key, _MISSING)
+        if value is not _MISSING:
+            return value
+        lease = f'lease:{full_key}'
+        deadline = time.monotonic() + MAX_WAIT
+        owned = cache.add(lease, 1, LEASE_SECONDS)
+        while not owned:
+            # Another process is computing it; wait for its result.
+            time.sleep(WAIT_STEP)
+            value = cache.get(full_key, _MISSING)
+            if value is not _MISSING:
+                return value
+            if time.monotonic() > deadline:
+                break  # the holder is slow or died; compute it ourselves
+            owned = cache.add(lease, 1, LEASE_SECONDS)
+        try:
+            value = compute()
+            if cacheable is None or cacheable(value):
+                cache.set(full_key, value, **timeout_kwargs)
+        finally:
+            if owned:
+                cache.delete(lease)
+            with _key_locks_guard:
+                _key_locks.pop(full_key, None)
+    return value
+
+
+_MISSING = object()
@@ -0,0 +1,68 @@
+"""Persistence helpers for chat turns."""
+from django.db import transaction
+
+from .archive import archived_messages
+from .chat_buffer import flush_pending, queue_messages, write_behind_enabled
+from .conversations import record_messages
+from .models import ChatMessage
+from .pagination import decode_keyset_cursor, encode_keyset_cursor, keyset_page
+
+HISTORY_CONTEXT_MESSAGES = 20
+
+
+def history_page(user_id, conversation_id, before=None, limit=50):
+    """One keyset page of a conversation, oldest first, spanning hot and archived rows.
+
+    Hot ChatMessage rows are always newer than the archived ones, so the archive
+    is only decompressed once the hot rows run out. Returns ``(rows, next_cursor)``.
+    """
+    flush_pending(user_id, conversation_id)
+    queryset = ChatMessage.objects.filter(user_id=user_id, conversation_id=conversation_id)
+    rows, next_cursor = keyset_page(queryset, before, limit)
+    if next_cursor:
+        return rows, next_cursor
+
+    archived = archived_messages(user_id, conversation_id)
+    if archived:
+        bound = decode_keyset_cursor(before) if before else None
+        if rows:
+            bound = (rows[0].created_at, rows[0].id)
+        if bound:
+            archived = [m for m in archived if (m.created_at, m.id) < bound]
+        needed = limit - len(rows)
+        taken = archived[-needed:] if needed else []
+        rows = taken + rows
+        if len(archived) > len(taken):
+            next_cursor = encode_keyset_cursor(rows[0].created_at, rows[0].id)
+    return rows, next_cursor
+
+
+def recent_history(user, conversation_id, limit=HISTORY_CONTEXT_MESSAGES):
+    """Last ``limit`` messages of a conversation, oldest first (uses the history index)."""
+    rows, _ = history_page(user.id, conversation_id, limit=limit)
+    return [{'role': m.role, 'content': m.content} for m in rows]
+
+
+def save_messages(messages):
+    """Insert a list of unsaved ChatMessage objects in one transaction.
+
+    With CHAT_WRITE_BEHIND on they are queued instead (ids stay None until the
+    buffer flushes).
+    """
+    if write_behind_enabled():
+        return queue_messages(messages)
+    with transaction.atomic():
+        created = ChatMessage.objects.bulk_create(messages)
+        record_messages(created)
+    return created
+
+
+def save_turn(user, conversation_id, context, user_text, ai_text):
+    """Store one user message and the AI reply to it, in that order."""
+    messages = [
+        ChatMessage(user=user, conversation_id=conversation_id, role='user', content=user_text, context=context),
+    ]
+    if ai_text:
+        messages.append(
+            ChatMessage(user=user, conversation_id=conversation_id, role='ai', content=ai_text, context=context))
+    return save_messages(messages)
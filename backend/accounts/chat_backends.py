@@ -0,0 +1,36 @@
+"""Pluggable model backends for streamed chat replies.
+
+A backend is any class with an async ``stream(history, message, context)``
+generator yielding text chunks. ``CHAT_BACKEND`` in settings picks one by
+dotted path; the default is the offline :class:`EchoChatBackend`, which is
+also what the tests use.
+"""
+import asyncio
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class ChatBackend:
+    async def stream(self, history, message, context):
+        """Yield reply chunks. ``history`` is a list of {'role', 'content'}."""
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+
+class EchoChatBackend(ChatBackend):
+    """Local fake model: streams a canned reply word by word."""
+
+    delay = 0.0
+
+    async def stream(self, history, message, context):
+        reply = f'You asked ({context}): {message}'
+        for i, word in enumerate(reply.split(' ')):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield word if i == 0 else ' ' + word
+
+
+def get_chat_backend():
+    path = getattr(settings, 'CHAT_BACKEND', 'accounts.chat_backends.EchoChatBackend')
+    return import_string(path)()
@@ -0,0 +1,257 @@
+"""Optional write-behind buffer for ChatMessage inserts.
+
+With ``CHAT_WRITE_BEHIND`` enabled, chat turns are queued in process memory
+and written with one ``bulk_create`` per flush instead of one INSERT + COMMIT
+per message, which matters on SQLite where every commit takes the database
+write lock. A flush happens when ``CHAT_WRITE_BEHIND_MAX_BATCH`` messages are
+queued, when the oldest queued message is ``CHAT_WRITE_BEHIND_MAX_DELAY``
+seconds old, and at interpreter exit.
+
+Readers call :func:`flush_pending` first. If the user has messages queued in
+this process it flushes them synchronously. Otherwise, if another worker
+process has queued messages for the user (a ``chat_pending:<user_id>`` marker
+in the shared cache, set when the first message is queued and removed once
+it is written), it waits for that worker's flush, at most MAX_DELAY plus
+``PENDING_MARGIN`` seconds. So history and conversation reads see the user's
+own writes whichever worker serves them, as long as the writing worker's
+flush succeeds within that time.
+
+A failed flush never raises. The batch is retried row by row. Rows the
+database rejects (integrity or data errors) are dead-lettered: logged and
+kept in ``dead_letters``. After a connection-level error the batch is
+re-queued; a row gets ``max_attempts`` flushes, and the queue at most
+``CHAT_WRITE_BEHIND_MAX_PENDING`` rows, before rows are dead-lettered.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import (
+    DataError, IntegrityError, InterfaceError, OperationalError, close_old_connections, connection, transaction,
+)
+
+from .conversations import record_messages
+from .models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+# Extra seconds a reader waits for another worker's flush beyond MAX_DELAY.
+PENDING_MARGIN = 0.25
+POLL_SECONDS = 0.02
+
+
+def pending_key(user_id):
+    return f'chat_pending:{user_id}'
+
+
+class ChatWriteBuffer:
+    def __init__(self, max_batch=200, max_delay=0.25, autostart=True, max_attempts=5, max_pending=10000):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.autostart = autostart
+        self.max_attempts = max_attempts
+        self.max_pending = max_pending
+        self.dead_letters = deque(maxlen=1000)
+        self._reset()
+
+    def _reset(self):
+        # Also called in forked children: locks and threads do not survive fork.
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._keys = {}
+        self._oldest = None
+        self._marked = set()  # users with a chat_pending marker from this buffer
+        self.token = f'{os.getpid()}:{id(self)}'
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopped = False
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, messages):
+        with self._lock:
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            for message in messages:
+                self._pending.append(message)
+                key = (message.user_id, message.conversation_id)
+                self._keys[key] = self._keys.get(key, 0) + 1
+            full = len(self._pending) >= self.max_batch
+            unmarked = {message.user_id for message in messages} - self._marked
+            self._marked |= unmarked
+        for user_id in unmarked:
+            self._mark(user_id)
+        if full:
+            self.flush()
+        elif self.autostart and self._thread is None:
+            self._start()
+        return messages
+
+    def has_pending(self, user_id, conversation_id=None):
+        if conversation_id is None:
+            return any(key[0] == user_id for key in list(self._keys))
+        return (user_id, conversation_id) in self._keys
+
+    def _mark(self, user_id):
+        deadline = time.time() + self.max_delay + PENDING_MARGIN
+        try:
+            cache.set(pending_key(user_id), (self.token, deadline), int(self.max_delay + PENDING_MARGIN) + 1)
+        except Exception:
+            logger.warning('Could not mark queued chat messages of user %s', user_id, exc_info=True)
+
+    def _unmark(self):
+        # Users whose rows were all written (or dead-lettered) in this flush.
+        with self._lock:
+            done = {user_id for user_id in self._marked if not self.has_pending(user_id)}
+            self._marked -= done
+        for user_id in done:
+            try:
+                marker = cache.get(pending_key(user_id))
+                if marker and marker[0] == self.token:
+                    cache.delete(pending_key(user_id))
+            except Exception:
+                logger.warning('Could not clear the queued chat marker of user %s', user_id, exc_info=True)
+
+    def flush(self):
+        """Write everything queued so far. Returns rows written; never raises."""
+        with self._flush_lock:
+            try:
+                return self._flush()
+            finally:
+                self._unmark()
+
+    def _flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._keys, self._oldest = {}, None
+        if not batch:
+            return 0
+        try:
+            self._write(batch)
+            return len(batch)
+        except (OperationalError, InterfaceError):
+            # The database is unavailable or locked: no row is at fault.
+            logger.warning('Chat write-behind flush failed; %d message(s) re-queued', len(batch), exc_info=True)
+            self._requeue(batch)
+            return 0
+        except Exception:
+            logger.warning('Chat write-behind batch of %d failed; retrying one at a time', len(batch),
+                           exc_info=True)
+
+        written, retry = 0, []
+        for message in batch:
+            try:
+                self._write([message])
+                written += 1
+            except (IntegrityError, DataError) as exc:
+                self._dead_letter(message, exc)
+            except Exception as exc:
+                retry.append(message)
+                message._write_error = exc
+        self._requeue(retry)
+        return written
+
+    def _write(self, messages):
+        with transaction.atomic():
+            ChatMessage.objects.bulk_create(messages)
+            record_messages(messages)
+
+    def _requeue(self, messages):
+        # In front, so order is kept; each row gets max_attempts flushes.
+        keep = []
+        for message in messages:
+            message._write_attempts = getattr(message, '_write_attempts', 0) + 1
+            if message._write_attempts >= self.max_attempts:
+                self._dead_letter(message, getattr(message, '_write_error', 'too many failed flushes'))
+            else:
+                keep.append(message)
+        with self._lock:
+            self._pending[:0] = keep
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                dropped, self._pending = self._pending[:overflow], self._pending[overflow:]
+            else:
+                dropped = []
+            self._keys = {}
+            for message in self._pending:
+                key = (message.user_id, message.conversation_id)
+                self._keys[key] = self._keys.get(key, 0) + 1
+            if self._pending:
+                self._oldest = self._oldest or time.monotonic()
+        for message in dropped:
+            self._dead_letter(message, 'write-behind queue full')
+
+    def _dead_letter(self, message, reason):
+        self.dead_letters.append((message, str(reason)))
+        logger.error('Chat write-behind dropped message (user %s, conversation %s, role %s, %d chars): %s',
+                     message.user_id, message.conversation_id, message.role, len(message.content or ''), reason)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name='chat-write-behind', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stopped:
+                self._wakeup.wait(self.max_delay)
+                oldest = self._oldest
+                if oldest is not None and time.monotonic() - oldest >= self.max_delay:
+                    if not self.flush() and self._pending:
+                        time.sleep(self.max_delay)  # back off while the database is failing
+        finally:
+            connection.close()
+
+    def shutdown(self):
+        self._stopped = True
+        self._wakeup.set()
+        try:
+            self.flush()
+        finally:
+            close_old_connections()
+
+
+def write_behind_enabled():
+    return getattr(settings, 'CHAT_WRITE_BEHIND', False)
+
+
+chat_buffer = ChatWriteBuffer(
+    max_batch=getattr(settings, 'CHAT_WRITE_BEHIND_MAX_BATCH', 200),
+    max_delay=getattr(settings, 'CHAT_WRITE_BEHIND_MAX_DELAY', 0.25),
+    max_pending=getattr(settings, 'CHAT_WRITE_BEHIND_MAX_PENDING', 10000),
+)
+atexit.register(chat_buffer.shutdown)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=chat_buffer._reset)
+
+
+def flush_pending(user_id, conversation_id=None):
+    """Make queued messages of one conversation (or all of a user's) visible before reading."""
+    try:
+        if chat_buffer.has_pending(user_id, conversation_id):
+            chat_buffer.flush()
+        elif write_behind_enabled():
+            wait_for_other_workers(user_id)
+    except Exception:
+        # A read must not fail because of a buffered write.
+        logger.exception('Chat write-behind flush before a read failed')
+
+
+def wait_for_other_workers(user_id):
+    """Wait until no other worker has messages of ``user_id`` queued (bounded by the marker's deadline)."""
+    marker = cache.get(pending_key(user_id))
+    while marker and marker[0] != chat_buffer.token and time.time() < marker[1]:
+        time.sleep(POLL_SECONDS)
+        marker = cache.get(pending_key(user_id))
+
+
+def queue_messages(messages):
+    return chat_buffer.add(messages)
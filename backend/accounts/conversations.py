@@ -0,0 +1,105 @@
+"""Incremental maintenance of the denormalized Conversation table.
+
+Every code path that inserts ChatMessage rows calls :func:`record_messages`
+inside the same transaction, so listing a user's conversations is a single
+index range scan on (user, -last_activity) instead of a GROUP BY over all of
+their messages.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Substr
+
+from .models import ChatMessage, Conversation, ConversationArchive
+
+
+def record_messages(messages):
+    """Fold freshly inserted ChatMessage objects into their Conversation rows."""
+    groups = {}
+    for message in messages:
+        groups.setdefault((message.user_id, message.conversation_id), []).append(message)
+
+    for (user_id, conversation_id), group in groups.items():
+        last = max(group, key=lambda m: (m.created_at, m.id or 0))
+        changes = {
+            'message_count': F('message_count') + len(group),
+            'last_activity': last.created_at,
+            'last_message_preview': last.content[:Conversation.PREVIEW_LENGTH],
+            'last_role': last.role,
+        }
+        rows = Conversation.objects.filter(user_id=user_id, conversation_id=conversation_id)
+        if rows.update(**changes):
+            continue
+        first_user = next((m for m in group if m.role == 'user'), group[0])
+        try:
+            with transaction.atomic():
+                Conversation.objects.create(
+                    user_id=user_id, conversation_id=conversation_id,
+                    title=first_user.content[:Conversation.TITLE_LENGTH],
+                    message_count=len(group), created_at=group[0].created_at,
+                    last_activity=last.created_at, last_role=last.role,
+                    last_message_preview=last.content[:Conversation.PREVIEW_LENGTH],
+                )
+        except IntegrityError:
+            # Another writer created it first; apply our messages as an update.
+            rows.update(**changes)
+
+
+def backfill_user_conversations(user_ids):
+    """Rebuild Conversation rows for ``user_ids`` from their ChatMessage and ConversationArchive rows."""
+    from .archive import unpack
+
+    messages = ChatMessage.objects.filter(user_id=OuterRef('user_id'), conversation_id=OuterRef('conversation_id'))
+    last = messages.order_by('-created_at', '-id')
+    first_user = messages.filter(role='user').order_by('created_at', 'id')
+    groups = (
+        ChatMessage.objects.filter(user_id__in=user_ids)
+        .values('user_id', 'conversation_id')
+        .annotate(
+            n=Count('id'),
+            first_at=Min('created_at'),
+            last_at=Max('created_at'),
+            preview=Subquery(last.values(v=Substr('content', 1, Conversation.PREVIEW_LENGTH))[:1]),
+            role=Subquery(last.values('role')[:1]),
+            title=Subquery(first_user.values(v=Substr('content', 1, Conversation.TITLE_LENGTH))[:1]),
+        )
+        .order_by()
+    )
+    rows = {
+        (g['user_id'], g['conversation_id']): Conversation(
+            user_id=g['user_id'], conversation_id=g['conversation_id'], title=g['title'] or '',
+            message_count=g['n'], created_at=g['first_at'], last_activity=g['last_at'],
+            last_message_preview=g['preview'] or '', last_role=g['role'] or '',
+        )
+        for g in groups
+    }
+
+    # Compacted messages are older than any hot row of the same conversation:
+    # the archive adds to the count and supplies the title, and the preview
+    # too when nothing is hot.
+    archives = (
+        ConversationArchive.objects.filter(user_id__in=user_ids)
+        .only('user_id', 'conversation_id', 'codec', 'data', 'message_count', 'first_created_at', 'last_created_at')
+    )
+    for archive in archives.iterator(chunk_size=50):
+        archived = unpack(archive.data, archive.codec)  # [id, role, content, context, created_at]
+        title = next((content for _, role, content, _, _ in archived if role == 'user'), None)
+        row = rows.get((archive.user_id, archive.conversation_id))
+        if row is None:
+            rows[(archive.user_id, archive.conversation_id)] = Conversation(
+                user_id=archive.user_id, conversation_id=archive.conversation_id,
+                title=(title or archived[0][2])[:Conversation.TITLE_LENGTH], message_count=archive.message_count,
+                created_at=archive.first_created_at, last_activity=archive.last_created_at,
+                last_message_preview=archived[-1][2][:Conversation.PREVIEW_LENGTH], last_role=archived[-1][1],
+            )
+            continue
+        row.message_count += archive.message_count
+        row.created_at = min(row.created_at, archive.first_created_at)
+        row.last_activity = max(row.last_activity, archive.last_created_at)
+        if title is not None:
+            row.title = title[:Conversation.TITLE_LENGTH]
+
+    Conversation.objects.bulk_create(
+        rows.values(), update_conflicts=True, unique_fields=['user', 'conversation_id'],
+        update_fields=['title', 'message_count', 'created_at', 'last_activity', 'last_message_preview', 'last_role'],
+    )
+    return len(rows)
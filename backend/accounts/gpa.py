@@ -0,0 +1,73 @@
+from itertools import chain
+
+import numpy as np
+
+# 5-point scale used across Thinkora (A=5 ... F=0)
+GRADE_POINTS = {'A': 5.0, 'B': 4.0, 'C': 3.0, 'D': 2.0, 'E': 1.0, 'F': 0.0}
+
+
+class GPAError(ValueError):
+    pass
+
+
+# Raw grade string -> points (nan for unknown). Seeded with the canonical
+# letters; other spellings (' a', 'b ') are normalized once and memoized so the
+# hot path is a single dict lookup per course.
+_GRADE_LOOKUP = dict(GRADE_POINTS)
+_GRADE_LOOKUP_LIMIT = 1024
+
+
+def _points(grade):
+    try:
+        return _GRADE_LOOKUP[grade]
+    except (KeyError, TypeError):
+        pass
+    points = GRADE_POINTS.get(str(grade).upper().strip(), np.nan)
+    if isinstance(grade, str) and len(_GRADE_LOOKUP) < _GRADE_LOOKUP_LIMIT:
+        _GRADE_LOOKUP[grade] = points
+    return points
+
+
+def grade_points_for(grades):
+    """Map letter grades to a float array; unknown grades become ``nan``."""
+    return np.fromiter(map(_points, grades), dtype=np.float64)
+
+
+def compute_gpas(grade_rows, credit_rows):
+    """Compute one GPA per row of ``grade_rows``/``credit_rows``.
+
+    Rows may have different lengths (a ragged batch) or all be the same length
+    (a matrix). Unknown grades are ignored, like the original per-course loop;
+    negative or non-finite credits raise :class:`GPAError`. Returns ``(gpas, total_credits)`` as NumPy arrays; rows without counted
+    credits get ``nan`` as their GPA.
+    """
+    if len(grade_rows) != len(credit_rows):
+        raise GPAError('Invalid data')
+    lengths = np.fromiter((len(row) for row in grade_rows), dtype=np.intp, count=len(grade_rows))
+    for grades, credits in zip(grade_rows, credit_rows):
+        if not grades or not credits or len(grades) != len(credits):
+            raise GPAError('Invalid data')
+
+    points = grade_points_for(chain.from_iterable(grade_rows))
+    flat_credits = np.fromiter(chain.from_iterable(credit_rows), dtype=np.float64)
+    if not np.isfinite(flat_credits).all() or (flat_credits < 0).any():
+        raise GPAError('Invalid credits')
+    rows = np.repeat(np.arange(len(grade_rows)), lengths)
+
+    known = ~np.isnan(points)
+    points = np.where(known, points, 0.0)
+    counted = np.where(known, flat_credits, 0.0)
+    total_credits = np.bincount(rows, weights=counted, minlength=len(grade_rows))
+    quality_points = np.bincount(rows, weights=points * counted, minlength=len(grade_rows))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gpas = np.where(total_credits > 0, quality_points / total_credits, np.nan)
+    return gpas, total_credits
+
+
+def compute_gpa(grades, credits):
+    """Single-student wrapper around :func:`compute_gpas`."""
+    gpas, total_credits = compute_gpas([grades], [credits])
+    if total_credits[0] == 0:
+        raise GPAError('No credits')
+    return float(gpas[0]), float(total_credits[0])
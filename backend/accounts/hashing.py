@@ -0,0 +1,54 @@
+"""Bounded thread pool for password hashing.
+
+PBKDF2 (``hashlib.pbkdf2_hmac``) releases the GIL, so hashing in a few threads
+runs in parallel and keeps the event loop free under ASGI. The pool accepts at
+most ``PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE`` jobs at once; past that
+``submit`` raises :class:`HashingPoolSaturated` and the async register/login
+views answer 429 instead of queueing without bound.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class HashingPoolSaturated(Exception):
+    pass
+
+
+class HashingPool:
+    def __init__(self, workers=None, queue=32):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.queue = queue
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+        return self._executor
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolSaturated()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def run(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+
+hashing_pool = HashingPool(
+    workers=getattr(settings, 'PASSWORD_HASH_WORKERS', None),
+    queue=getattr(settings, 'PASSWORD_HASH_QUEUE', 32),
+)
@@ -0,0 +1,109 @@
+"""Exact-match answers for KnowledgeBase with an in-process LRU cache.
+
+Questions are looked up by ``question_hash`` (see ``hash_question``). Verified
+answers - and misses - are kept in a bounded LRU per worker process, tagged
+with the ``knowledge_base`` DataVersion they were read under. The save/delete
+signals drop entries in this process at once; a hit is only served while its
+version is still current, so other worker processes pick up edits once their
+``version_cache`` entry expires (``KB_VERSION_CACHE_TTL``, 5 s by default).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import KnowledgeBase, hash_question
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU with a per-entry TTL and hit/miss counters."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING and item[1] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[0]
+            if item is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+            }
+
+
+answer_cache = LRUCache(
+    maxsize=getattr(settings, 'KB_ANSWER_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'KB_ANSWER_CACHE_TTL', 300),
+)
+
+# entry id -> hash it was cached under, so an edited question also evicts
+# the answer cached for its old wording.
+_hash_by_id = {}
+
+
+def lookup_answer(question):
+    """Return ``(entry_dict_or_None, cached)`` for the verified exact match."""
+    # versions imports LRUCache from here.
+    from .versions import KNOWLEDGE_BASE, get_version
+
+    key = hash_question(question)
+    version = get_version(KNOWLEDGE_BASE, cached=True)[0]
+    item = answer_cache.get(key, _MISSING)
+    if item is not _MISSING and item[0] == version:
+        return item[1], True
+    entry = (
+        KnowledgeBase.objects.filter(question_hash=key, is_verified=True)
+        .values('id', 'question', 'answer')
+        .order_by('id')
+        .first()
+    )
+    answer_cache.set(key, (version, entry))
+    if entry is not None:
+        _hash_by_id[entry['id']] = key
+    return entry, False
+
+
+def invalidate_entry(entry):
+    answer_cache.delete(hash_question(entry.question))
+    old_key = _hash_by_id.pop(entry.pk, None)
+    if old_key is not None:
+        answer_cache.delete(old_key)
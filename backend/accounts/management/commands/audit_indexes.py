@@ -0,0 +1,169 @@
+import re
+import statistics
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework.test import APIClient
+
+from accounts.models import Conversation, Course, KnowledgeBase, User
+
+# Query strings for endpoints that answer 400 without one.
+QUERY_PARAMS = {
+    'knowledge_search': {'q': 'gpa credits', 'verified': 'true'},
+    'knowledge_answer': {'q': 'What is a GPA?'},
+    'knowledge_similar': {'q': 'What is a GPA?', 'verified': 'true'},
+}
+# Findings that are the point of the endpoint: the staff export reads every
+# course, and search results are ordered by a relevance score.
+EXPECTED = {'admin_course_export': {'full scan'}, 'knowledge_search': {'sort'}}
+CATALOGS = ('sqlite_master', 'pg_catalog', 'information_schema')
+
+# "SCAN t USING INDEX i" walks an index (up to the LIMIT, or a partial one);
+# a bare "SCAN t" reads the whole table.
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)$')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+POSTGRES_SORT = re.compile(r'^\s*(->\s+)?(Incremental )?Sort\b')
+
+
+def api_endpoints(patterns=None):
+    """``(url name, [kwargs])`` of every named URL served by accounts views."""
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            yield from api_endpoints(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name and pattern.callback.__module__.startswith('accounts.'):
+            kwargs = list(pattern.pattern.regex.groupindex)
+            if 'format' not in kwargs:  # DRF's .json/.api suffix copies
+                yield pattern.name, kwargs
+
+
+def explain(connection, sql, params):
+    """``(plan lines, [(kind, detail)])`` for one SELECT; kinds are 'full scan' and 'sort'."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            lines = [row[3] for row in cursor.fetchall()]
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+            lines = [row[0] for row in cursor.fetchall()]
+        else:
+            raise CommandError(f'No EXPLAIN support for {connection.vendor}')
+    flags = []
+    for line in lines:
+        if connection.vendor == 'sqlite':
+            scan = SQLITE_SCAN.match(line)
+            if scan:
+                flags.append(('full scan', scan.group(1)))
+            if 'USE TEMP B-TREE' in line:
+                flags.append(('sort', line.split(' FOR ')[-1]))
+        else:
+            scan = POSTGRES_SCAN.search(line)
+            if scan:
+                flags.append(('full scan', scan.group(1)))
+            if POSTGRES_SORT.match(line):
+                flags.append(('sort', 'ORDER BY'))
+    return lines, flags
+
+
+def median_ms(connection, sql, params, runs):
+    samples = []
+    with connection.cursor() as cursor:
+        for _ in range(runs):
+            start = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+class Command(BaseCommand):
+    help = ('Call every GET endpoint of the API, EXPLAIN each SELECT it runs and flag full table scans and '
+            'temporary sorts. Runs in a rolled-back transaction with the shared cache bypassed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of the user to call the endpoints as (default: a throwaway user). '
+                                           'Use one with data for realistic --timings.')
+        parser.add_argument('--timings', type=int, default=0, metavar='RUNS',
+                            help='Also print the median time of each statement over RUNS executions.')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the plan of unflagged statements too.')
+        parser.add_argument('--strict', action='store_true', help='Exit non-zero when anything is flagged.')
+
+    def handle(self, *args, **options):
+        disabled = {'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+                    'ALLOWED_HOSTS': ['testserver'], 'METRICS_ENABLED': False, 'QUERY_BUDGET_CHECKS': False}
+        with override_settings(**disabled), transaction.atomic():
+            flagged = self.audit(options)
+            transaction.set_rollback(True)
+        self.stdout.write(f'\n{flagged} flagged statement(s)')
+        if flagged and options['strict']:
+            raise CommandError('Index audit found full scans or temporary sorts')
+
+    def sample_kwargs(self, user):
+        course = Course.objects.filter(user=user).order_by('-id').values_list('id', flat=True).first()
+        conversation = (Conversation.objects.filter(user=user).order_by('-last_activity')
+                        .values_list('conversation_id', flat=True).first())
+        return {'pk': course or 0, 'conversation_id': conversation or 'default'}
+
+    def audit(self, options):
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f'No user {options["user"]}')
+        else:
+            # Rolled back with everything else; random so it cannot clash with a real account.
+            name = f'index-audit-{uuid.uuid4().hex[:12]}'
+            user = User.objects.create_user(email=f'{name}@example.com', username=name)
+        user.is_staff = True  # in memory only, for the admin endpoints
+        question = KnowledgeBase.objects.values_list('question', flat=True).first()
+        sample = self.sample_kwargs(user)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        flagged = 0
+        for name, kwargs in api_endpoints():
+            path = reverse(name, kwargs={key: sample[key] for key in kwargs})
+            params = dict(QUERY_PARAMS.get(name, {}))
+            if question and name in ('knowledge_answer', 'knowledge_similar'):
+                params['q'] = question
+            statements = []
+
+            def record(execute, sql, params, many, context):
+                statements.append((context['connection'].alias, sql, params))
+                return execute(sql, params, many, context)
+
+            with ExitStack() as stack:
+                for alias in settings.DATABASES:
+                    stack.enter_context(connections[alias].execute_wrapper(record))
+                response = client.get(path, params)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            if response.status_code == 405:
+                continue
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name}  GET {path}  {response.status_code}  '
+                                                         f'{len(statements)} queries'))
+
+            seen = set()
+            for alias, sql, params in statements:
+                if (not sql.lstrip().upper().startswith(('SELECT', 'WITH')) or sql in seen
+                        or any(catalog in sql for catalog in CATALOGS)):
+                    continue
+                seen.add(sql)
+                connection = connections[alias or DEFAULT_DB_ALIAS]
+                lines, flags = explain(connection, sql, params)
+                unexpected = [flag for flag in flags if flag[0] not in EXPECTED.get(name, ())]
+                flagged += bool(unexpected)
+                timing = f'{median_ms(connection, sql, params, options["timings"]):8.2f} ms  ' if options['timings'] else ''
+                label = self.style.ERROR('FLAG') if unexpected else 'ok  '
+                self.stdout.write(f'  {label} {timing}{" ".join(sql.split())[:110]}')
+                for kind, detail in flags:
+                    note = '' if (kind, detail) in unexpected else ' (expected)'
+                    self.stdout.write(f'       {kind} {detail}{note}')
+                if flags or options['verbose_plans']:
+                    for line in lines:
+                        self.stdout.write(f'         {line}')
+        return flagged
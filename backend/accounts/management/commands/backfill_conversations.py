@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from accounts.conversations import backfill_user_conversations
+from accounts.models import ChatMessage, Conversation, ConversationArchive, User
+
+USER_CHUNK = 200
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Conversation rows from ChatMessage and archived chat data (backfill or repair).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the user with this email.')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user_ids = User.objects.filter(email=options['user']).values_list('id', flat=True)
+        else:
+            Conversation.objects.exclude(user_id__in=ChatMessage.objects.values('user_id')).exclude(
+                user_id__in=ConversationArchive.objects.values('user_id')).delete()
+            # UNION also removes the duplicates.
+            user_ids = (ChatMessage.objects.order_by().values_list('user_id', flat=True)
+                        .union(ConversationArchive.objects.order_by().values_list('user_id', flat=True))
+                        .order_by('user_id'))
+
+        rebuilt, chunk = 0, []
+        for user_id in user_ids.iterator(chunk_size=2000):
+            chunk.append(user_id)
+            if len(chunk) == USER_CHUNK:
+                rebuilt += backfill_user_conversations(chunk)
+                chunk = []
+        if chunk:
+            rebuilt += backfill_user_conversations(chunk)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} conversation(s).'))
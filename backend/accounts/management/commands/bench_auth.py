@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.authentication import CachedJWTAuthentication, ClaimsJWTAuthentication, user_cache
+from accounts.models import User
+from accounts.views import CourseViewSet, transcript_view
+
+
+class Command(BaseCommand):
+    help = ('Queries and time per authenticated request with the stock JWTAuthentication versus the '
+            'cached and claims-only classes. Uses a throwaway user that is deleted afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(email='bench-auth@example.invalid', username='bench-auth')
+        try:
+            token = str(RefreshToken.for_user(user).access_token)
+            factory = APIRequestFactory()
+            n = options['requests']
+            self.stdout.write(f'{n} requests per row')
+
+            cases = ((JWTAuthentication, False), (CachedJWTAuthentication, False))
+            # Claims-only auth is for views that only use request.user.id, not CourseViewSet.
+            for label, view, auth_cases in (
+                    ('GET /api/courses/   ', CourseViewSet.as_view({'get': 'list'}), cases),
+                    ('GET /api/transcript/', transcript_view, cases + ((ClaimsJWTAuthentication, True),))):
+                for auth_class, claims_only in auth_cases:
+                    user_cache.clear()
+                    cls = getattr(view, 'cls', None) or view.view_class
+                    original = cls.authentication_classes
+                    cls.authentication_classes = [auth_class]
+                    try:
+                        with override_settings(JWT_CLAIMS_ONLY_READS=claims_only, ALLOWED_HOSTS=['testserver']), \
+                                CaptureQueriesContext(connection) as ctx:
+                            start = time.perf_counter()
+                            for _ in range(n):
+                                response = view(factory.get('/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+                                assert response.status_code == 200, response.status_code
+                            elapsed = time.perf_counter() - start
+                    finally:
+                        cls.authentication_classes = original
+                    self.stdout.write(
+                        f'{label} {auth_class.__name__:26} {len(ctx.captured_queries) / n:5.2f} queries/req '
+                        f'{elapsed / n * 1000:7.3f} ms/req')
+        finally:
+            user.delete()
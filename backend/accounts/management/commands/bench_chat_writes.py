@@ -0,0 +1,68 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from accounts.chat_buffer import ChatWriteBuffer
+from accounts.models import ChatMessage, User
+
+
+class Command(BaseCommand):
+    help = ('Compare ChatMessage insert throughput with concurrent writers: one INSERT/COMMIT per '
+            'message versus the write-behind buffer. Uses a throwaway user that is deleted afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--turns', type=int, default=250, help='Chat turns (2 messages) per writer.')
+        parser.add_argument('--batch', type=int, default=200)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(email='bench-chat@example.invalid', username='bench-chat')
+        try:
+            direct = self.run(user, options, self.direct_writer)
+            buffer = ChatWriteBuffer(max_batch=options['batch'], max_delay=0.05)
+            buffered = self.run(user, options, lambda u, w, n: self.buffered_writer(buffer, u, w, n))
+            buffer.shutdown()
+        finally:
+            user.delete()
+
+        messages = options['writers'] * options['turns'] * 2
+        self.stdout.write(f"{options['writers']} writers x {options['turns']} turns ({messages} messages)")
+        self.stdout.write(f'per-message commits : {messages / direct:9.0f} msg/s ({direct:.2f}s)')
+        self.stdout.write(f'write-behind buffer : {messages / buffered:9.0f} msg/s ({buffered:.2f}s, '
+                          f'{direct / buffered:.1f}x)')
+
+    def run(self, user, options, writer):
+        threads = [
+            threading.Thread(target=self.guarded, args=(writer, user, w, options['turns']))
+            for w in range(options['writers'])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    @staticmethod
+    def guarded(writer, user, w, turns):
+        try:
+            writer(user, w, turns)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def direct_writer(user, w, turns):
+        for i in range(turns):
+            ChatMessage.objects.create(user=user, conversation_id=f'bench-{w}', role='user', content=f'q{i}')
+            ChatMessage.objects.create(user=user, conversation_id=f'bench-{w}', role='ai', content=f'a{i}')
+
+    @staticmethod
+    def buffered_writer(buffer, user, w, turns):
+        for i in range(turns):
+            buffer.add([
+                ChatMessage(user=user, conversation_id=f'bench-{w}', role='user', content=f'q{i}'),
+                ChatMessage(user=user, conversation_id=f'bench-{w}', role='ai', content=f'a{i}'),
+            ])
+        buffer.flush()
@@ -0,0 +1,71 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.gpa import GRADE_POINTS, compute_gpas
+from accounts.models import User
+from accounts.views import calculate_gpa_endpoint
+
+
+def loop_gpa(grades, credits):
+    # The original per-request implementation, kept here as the baseline.
+    grade_points = {'A':5.0,'B':4.0,'C':3.0,'D':2.0,'E':1.0,'F':0.0}
+    total_points = 0
+    total_credits = 0
+    for grade, credit in zip(grades, credits):
+        grade_upper = grade.upper().strip()
+        if grade_upper in grade_points:
+            total_points += grade_points[grade_upper]*float(credit)
+            total_credits += float(credit)
+    return total_points / total_credits if total_credits else None
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark: original per-student GPA loop vs the vectorized batch engine.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--courses', type=int, default=40)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Students sent through the endpoint for the per-request comparison.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        letters = list(GRADE_POINTS)
+        grade_rows = [[rng.choice(letters) for _ in range(options['courses'])] for _ in range(options['students'])]
+        credit_rows = [[rng.choice((1, 2, 3, 4)) for _ in range(options['courses'])] for _ in range(options['students'])]
+
+        def best_of(fn):
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        loop_s = best_of(lambda: [loop_gpa(g, c) for g, c in zip(grade_rows, credit_rows)])
+        batch_s = best_of(lambda: compute_gpas(grade_rows, credit_rows))
+
+        self.stdout.write(f"students={options['students']} courses/student={options['courses']}")
+        self.stdout.write(f'python loop : {loop_s * 1000:8.2f} ms')
+        self.stdout.write(f'batch engine: {batch_s * 1000:8.2f} ms  ({loop_s / batch_s:.1f}x)')
+
+        # End to end: one POST per student versus a single batch POST.
+        factory = APIRequestFactory()
+        user = User(id=1, email='bench@example.com', username='bench')
+        n = min(options['requests'], options['students'])
+
+        def post(payload):
+            request = factory.post('/api/calculate-gpa/', payload, format='json')
+            force_authenticate(request, user=user)
+            return calculate_gpa_endpoint(request)
+
+        single_s = best_of(lambda: [post({'grades': g, 'credits': c}) for g, c in zip(grade_rows[:n], credit_rows[:n])])
+        batch_payload = {'batch': [{'grades': g, 'credits': c} for g, c in zip(grade_rows[:n], credit_rows[:n])]}
+        one_s = best_of(lambda: post(batch_payload))
+
+        self.stdout.write(f'{n} single POSTs : {single_s * 1000:8.2f} ms')
+        self.stdout.write(f'1 batch POST    : {one_s * 1000:8.2f} ms  ({single_s / one_s:.1f}x)')
@@ -0,0 +1,52 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hasher
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ('Time PBKDF2 password hashing at several iteration counts (single and with N threads) and '
+            'suggest the largest count whose p95 fits the latency budget.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=250.0, help='Per-hash p95 latency budget.')
+        parser.add_argument('--iterations', type=int, nargs='+',
+                            default=[100_000, 260_000, 600_000, 870_000, 1_200_000])
+        parser.add_argument('--samples', type=int, default=10)
+        parser.add_argument('--threads', type=int, default=4)
+
+    def handle(self, *args, **options):
+        default = get_hasher()
+        self.stdout.write(f"default hasher: {default.algorithm} ({getattr(default, 'iterations', '?')} iterations)")
+        self.stdout.write(f"{'iterations':>10} {'p50 ms':>8} {'p95 ms':>8} {'hashes/s @' + str(options['threads']):>14}")
+
+        best = None
+        for iterations in sorted(options['iterations']):
+            hasher = type('BenchHasher', (PBKDF2PasswordHasher,), {'iterations': iterations})()
+            salt = hasher.salt()
+            timings = []
+            for _ in range(options['samples']):
+                start = time.perf_counter()
+                hasher.encode('correct horse battery staple', salt)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            p50 = statistics.median(timings)
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+            jobs = options['samples'] * options['threads']
+            with ThreadPoolExecutor(options['threads']) as pool:
+                start = time.perf_counter()
+                list(pool.map(lambda _: hasher.encode('correct horse battery staple', salt), range(jobs)))
+                throughput = jobs / (time.perf_counter() - start)
+
+            self.stdout.write(f'{iterations:>10} {p50:8.1f} {p95:8.1f} {throughput:14.1f}')
+            if p95 <= options['budget_ms']:
+                best = iterations
+
+        if best is None:
+            self.stdout.write(self.style.WARNING(f"No tested count fits {options['budget_ms']} ms."))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Largest count within {options['budget_ms']} ms p95: {best} iterations."))
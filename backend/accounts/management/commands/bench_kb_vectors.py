@@ -0,0 +1,47 @@
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from accounts.vectors import VectorIndex, _files, _write_meta, embed, vector_dim
+
+WORDS = ('gpa course exam credit semester grade library fee hostel register drop add transcript '
+         'advisor lecture lab project deadline scholarship portal password result carryover').split()
+
+
+class Command(BaseCommand):
+    help = 'Measure similar-question query latency on a synthetic index of N entries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        questions = [' '.join(rng.choices(WORDS, k=rng.randint(4, 12))) for _ in range(options['entries'])]
+        dim = vector_dim()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            vec_path, id_path, _ = _files(Path(tmp), 1)
+            embed(questions, dim).tofile(vec_path)
+            np.arange(1, len(questions) + 1, dtype=np.int64).tofile(id_path)
+            _write_meta(Path(tmp), {'dim': dim, 'count': len(questions), 'generation': 1})
+            build_s = time.perf_counter() - start
+
+            index = VectorIndex(tmp)
+            index.query('warm up')
+            timings = []
+            for _ in range(options['queries']):
+                text = ' '.join(rng.choices(WORDS, k=6))
+                start = time.perf_counter()
+                index.query(text, k=5)
+                timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        self.stdout.write(f"entries={options['entries']} dim={dim} build={build_s:.2f}s")
+        self.stdout.write(f'query p50={timings[len(timings) // 2]:.2f}ms '
+                          f'p99={timings[int(len(timings) * 0.99) - 1]:.2f}ms')
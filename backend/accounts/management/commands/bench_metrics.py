@@ -0,0 +1,56 @@
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import resolve
+
+from accounts.metrics import install_query_counter, registry
+from accounts.middleware import MetricsMiddleware
+
+
+def view(request):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return HttpResponse('{"status": "ok"}', content_type='application/json')
+
+
+class Command(BaseCommand):
+    help = ('Per-request cost of MetricsMiddleware around a one-query view, with and without the '
+            'periodic per-worker file flush. Fails when the overhead exceeds --budget-us.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--budget-us', type=float, default=50.0)
+
+    def handle(self, *args, **options):
+        n = options['requests']
+        install_query_counter(connection)
+        request = RequestFactory().get('/api/health/')
+        request.resolver_match = resolve('/api/health/')
+
+        def run(handler):
+            handler(request)
+            start = time.perf_counter()
+            for _ in range(n):
+                handler(request)
+            return (time.perf_counter() - start) / n * 1e6
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with override_settings(METRICS_DIR=tmp, METRICS_FLUSH_SECONDS=3600):
+                bare = run(view)
+                recorded = run(MetricsMiddleware(view))
+            with override_settings(METRICS_DIR=tmp, METRICS_FLUSH_SECONDS=0):
+                flushing = run(MetricsMiddleware(view))
+        registry.reset()
+
+        overhead = recorded - bare
+        self.stdout.write(f'{n} requests per row')
+        self.stdout.write(f'bare view            {bare:8.1f} us/req')
+        self.stdout.write(f'with metrics         {recorded:8.1f} us/req  (+{overhead:.1f} us)')
+        self.stdout.write(f'flush every request  {flushing:8.1f} us/req  (+{flushing - bare:.1f} us, worst case)')
+        if overhead > options['budget_us']:
+            raise CommandError(f'Metrics overhead {overhead:.1f} us exceeds the {options["budget_us"]:.0f} us budget')
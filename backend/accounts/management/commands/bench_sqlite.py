@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from backend.database import SQLITE_PRAGMAS
+
+SCHEMA = ('CREATE TABLE msg (id INTEGER PRIMARY KEY, user_id INTEGER, conversation_id TEXT, '
+          'content TEXT, created_at REAL)')
+INDEX = 'CREATE INDEX msg_user_conv ON msg (user_id, conversation_id, created_at)'
+
+
+def connect(path, tuned):
+    # Untuned is what Django gets out of the box: rollback journal, synchronous=FULL.
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+    if tuned:
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+    return conn
+
+
+class Command(BaseCommand):
+    help = ('Compare the tuned SQLite profile (backend/database.py) with SQLite defaults on a throwaway '
+            'database: committed single-row inserts, indexed reads, and concurrent readers + writers.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inserts', type=int, default=2000)
+        parser.add_argument('--reads', type=int, default=20000)
+        parser.add_argument('--threads', type=int, default=4, help='Writer and reader threads each.')
+        parser.add_argument('--seconds', type=float, default=3.0)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'profile':8} {'insert/s':>10} {'read/s':>10} {'mixed w/s':>10} {'mixed r/s':>10} {'busy':>5}")
+        for tuned in (False, True):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'bench.sqlite3')
+                setup = connect(path, tuned)
+                setup.execute(SCHEMA)
+                setup.execute(INDEX)
+                setup.close()
+                row = self.run(path, tuned, options)
+            self.stdout.write(f"{'tuned' if tuned else 'default':8} " + ' '.join(f'{v:>10.0f}' for v in row[:4])
+                              + f' {row[4]:>5}')
+
+    def run(self, path, tuned, options):
+        conn = connect(path, tuned)
+        payload = 'x' * 400
+
+        start = time.perf_counter()
+        for i in range(options['inserts']):
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT INTO msg (user_id, conversation_id, content, created_at) VALUES (?, ?, ?, ?)',
+                         (i % 50, f'c{i % 7}', payload, time.time()))
+            conn.execute('COMMIT')
+        insert_rate = options['inserts'] / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(options['reads']):
+            conn.execute('SELECT id, content FROM msg WHERE user_id = ? AND conversation_id = ? '
+                         'ORDER BY created_at DESC LIMIT 20', (i % 50, f'c{i % 7}')).fetchall()
+        read_rate = options['reads'] / (time.perf_counter() - start)
+        conn.close()
+
+        counts = {'w': 0, 'r': 0, 'busy': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['seconds']
+
+        def writer(n):
+            c = connect(path, tuned)
+            while time.perf_counter() < deadline:
+                try:
+                    c.execute('BEGIN IMMEDIATE')
+                    c.execute('INSERT INTO msg (user_id, conversation_id, content, created_at) VALUES (?, ?, ?, ?)',
+                              (n, 'mixed', payload, time.time()))
+                    c.execute('COMMIT')
+                    key = 'w'
+                except sqlite3.OperationalError:
+                    if c.in_transaction:
+                        c.execute('ROLLBACK')
+                    key = 'busy'
+                with lock:
+                    counts[key] += 1
+            c.close()
+
+        def reader(n):
+            c = connect(path, tuned)
+            while time.perf_counter() < deadline:
+                try:
+                    c.execute('SELECT id, content FROM msg WHERE user_id = ? AND conversation_id = ? '
+                              'ORDER BY created_at DESC LIMIT 20', (n % 50, f'c{n % 7}')).fetchall()
+                    key = 'r'
+                except sqlite3.OperationalError:
+                    key = 'busy'
+                with lock:
+                    counts[key] += 1
+            c.close()
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(options['threads'])]
+        threads += [threading.Thread(target=reader, args=(n,)) for n in range(options['threads'])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return (insert_rate, read_rate, counts['w'] / options['seconds'], counts['r'] / options['seconds'],
+                counts['busy'])
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.vectors import build_index, index_dir
+
+
+class Command(BaseCommand):
+    help = 'Embed new and edited KnowledgeBase questions into the memory-mapped similarity index (all with --full).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Re-embed every entry (compacts the index after many edits or deletes).')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        added = build_index(full=options['full'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {added} question(s) into {index_dir()} in {elapsed:.2f}s.'))
@@ -0,0 +1,39 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.archive import CODECS, DEFAULT_CODEC, compact
+
+
+class Command(BaseCommand):
+    help = ('Move conversations idle for more than --days into compressed ConversationArchive rows '
+            'and delete their ChatMessage rows. Reports the bytes reclaimed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--codec', choices=sorted(CODECS), default=DEFAULT_CODEC)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the idle conversations.')
+        parser.add_argument('--vacuum', action='store_true',
+                            help='Run VACUUM afterwards so SQLite returns freed pages to the filesystem.')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        totals = compact(options['days'], options['codec'], options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f"{totals['conversations']} conversation(s) idle for more than {options['days']} days.")
+            return
+
+        self.stdout.write(
+            f"Archived {totals['conversations']} conversation(s), {totals['messages']} message(s) "
+            f"with {options['codec']}: {totals['hot_bytes']} bytes of message data stored in "
+            f"{totals['archive_bytes']} bytes, {totals['reclaimed_bytes']} bytes reclaimed."
+        )
+        if options['vacuum'] and connection.vendor == 'sqlite':
+            path = connection.settings_dict['NAME']
+            before = os.path.getsize(path)
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+            self.stdout.write(f'VACUUM: database file {before} -> {os.path.getsize(path)} bytes.')
+        self.stdout.write(self.style.SUCCESS('Done.'))
@@ -0,0 +1,112 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter: the current process has already paid for boot.
+CHILD = r'''
+import json, sys, time
+start = time.perf_counter()
+phases, apps_ = {}, {}
+
+def mark(name):
+    phases[name] = time.perf_counter() - start
+
+import django
+from django.apps import AppConfig
+mark('import django')
+
+original_create = AppConfig.create.__func__
+
+def create(cls, entry):
+    t = time.perf_counter()
+    config = original_create(cls, entry)
+    row = apps_.setdefault(config.label, {'import': 0.0, 'models': 0.0, 'ready': 0.0})
+    row['import'] = time.perf_counter() - t
+    for step, name in (('models', 'import_models'), ('ready', 'ready')):
+        def timed(method=getattr(config, name), step=step):
+            t = time.perf_counter()
+            method()
+            row[step] = time.perf_counter() - t
+        setattr(config, name, timed)
+    return config
+
+AppConfig.create = classmethod(create)
+
+from django.conf import settings
+settings.INSTALLED_APPS
+mark('settings')
+django.setup(set_prefix=False)
+mark('apps ready')
+from django.core.handlers.wsgi import WSGIHandler
+handler = WSGIHandler()
+mark('middleware')
+from django.urls import get_resolver
+get_resolver().url_patterns
+mark('urlconf')
+print(json.dumps({'phases': phases, 'apps': apps_, 'modules': len(sys.modules)}))
+'''
+
+
+class Command(BaseCommand):
+    help = ('Boot-time profile in fresh interpreters: settings, per-app import/models/ready, middleware and '
+            'URLconf, plus the slowest top-level imports. --compare times the full and API-only profiles.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Boots to take the median of.')
+        parser.add_argument('--profile', choices=['full', 'api'], help='DJANGO_PROFILE for the child processes.')
+        parser.add_argument('--compare', action='store_true', help='Only print total boot time per profile.')
+        parser.add_argument('--top', type=int, default=12, help='Slowest top-level imports to list.')
+
+    def boot(self, profile, importtime=False):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings')}
+        if profile:
+            env['DJANGO_PROFILE'] = profile
+        args = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CHILD]
+        result = subprocess.run(args, env=env, cwd=settings.BASE_DIR if (settings.BASE_DIR / 'manage.py').exists()
+                                else os.getcwd(), capture_output=True, text=True, check=True)
+        return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+    def median_boot(self, profile, runs):
+        samples = [self.boot(profile)[0] for _ in range(runs)]
+        return samples, statistics.median(s['phases']['urlconf'] for s in samples)
+
+    def handle(self, *args, **options):
+        runs = options['runs']
+        if options['compare']:
+            for profile in ('full', 'api'):
+                samples, total = self.median_boot(profile, runs)
+                self.stdout.write(f'{profile:5} {total * 1000:7.1f} ms  {samples[-1]["modules"]} modules '
+                                  f'(median of {runs})')
+            return
+
+        samples, total = self.median_boot(options['profile'], runs)
+        phases = samples[-1]['phases']
+        self.stdout.write(f'Boot to a loaded URLconf: {total * 1000:.1f} ms (median of {runs}), '
+                          f'{samples[-1]["modules"]} modules')
+        previous = 0.0
+        for name, at in phases.items():
+            self.stdout.write(f'  {name:16} {(at - previous) * 1000:7.1f} ms')
+            previous = at
+
+        self.stdout.write(f"\n{'app':20} {'import':>8} {'models':>8} {'ready':>8}  (ms)")
+        for label, row in sorted(samples[-1]['apps'].items(), key=lambda item: -sum(item[1].values())):
+            self.stdout.write(f"{label:20} {row['import'] * 1000:8.1f} {row['models'] * 1000:8.1f} "
+                              f"{row['ready'] * 1000:8.1f}")
+
+        # -X importtime lines: "import time: self [us] | cumulative | name"; top level has no indent.
+        _, stderr = self.boot(options['profile'], importtime=True)
+        imports = []
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit() and not name.startswith('  '):
+                imports.append((int(cumulative), name.strip()))
+        self.stdout.write(f"\n{'top-level import':40} {'ms':>8}")
+        for cumulative, name in sorted(imports, reverse=True)[:options['top']]:
+            self.stdout.write(f'{name:40} {cumulative / 1000:8.1f}')
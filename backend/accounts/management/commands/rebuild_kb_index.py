@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from accounts.search import FTS_TABLE, engine_for
+
+
+class Command(BaseCommand):
+    help = 'Rebuild and optimize the KnowledgeBase full-text index (SQLite FTS5 only).'
+
+    def handle(self, *args, **options):
+        engine = engine_for()
+        if engine != 'sqlite-fts5':
+            self.stdout.write(f'Search engine is {engine!r}; nothing to rebuild.')
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        self.stdout.write(self.style.SUCCESS('KnowledgeBase search index rebuilt.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Course, TranscriptSummary, User
+from accounts.transcript import rebuild_for_user
+
+
+class Command(BaseCommand):
+    help = 'Rebuild TranscriptSummary rows from Course data (backfill or repair).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the user with this email.')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user_ids = User.objects.filter(email=options['user']).values_list('id', flat=True)
+        else:
+            TranscriptSummary.objects.exclude(user_id__in=Course.objects.values('user_id')).delete()
+            user_ids = Course.objects.order_by('user_id').values_list('user_id', flat=True).distinct()
+
+        rebuilt = 0
+        for user_id in user_ids.iterator(chunk_size=2000):
+            rebuild_for_user(user_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt transcripts for {rebuilt} user(s).'))
@@ -0,0 +1,30 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Copy the SQLite primary into each SQLite replica with the online backup API. '
+            'Stands in for replication when trying DATABASE_REPLICA_URLS locally.')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('The primary is not SQLite; use the database\'s own replication.')
+        replicas = [alias for alias in settings.DATABASE_REPLICAS
+                    if settings.DATABASES[alias]['ENGINE'] == 'django.db.backends.sqlite3']
+        if not replicas:
+            raise CommandError('No SQLite replicas configured (DATABASE_REPLICA_URLS).')
+
+        source = sqlite3.connect(str(primary['NAME']))
+        try:
+            for alias in replicas:
+                target = sqlite3.connect(str(settings.DATABASES[alias]['NAME']))
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'{alias}: copied from {primary["NAME"]}')
+        finally:
+            source.close()
@@ -0,0 +1,196 @@
+"""Per-route request metrics in the Prometheus text format.
+
+Every worker process counts requests in memory (:data:`registry`, filled by
+:class:`accounts.middleware.MetricsMiddleware`) and writes its counters to
+``METRICS_DIR/<pid>.json`` at most every ``METRICS_FLUSH_SECONDS``.
+``/api/metrics/`` merges the files of the live workers, so one scrape covers
+all gunicorn workers on the host. The counters of a worker that exited are
+folded into ``METRICS_DIR/dead.json`` before its file is removed, so totals
+never drop when gunicorn recycles workers.
+
+Queries are counted by :func:`count_queries`, an execute wrapper installed on
+every database connection; it adds to the stats of the request in progress.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Per-series row: one count per bucket (+Inf last), then these totals.
+COUNT, SECONDS, QUERIES, QUERY_SECONDS, BYTES = range(len(BUCKETS) + 1, len(BUCKETS) + 6)
+ROW_SIZE = len(BUCKETS) + 6
+LABELS = ('route', 'method', 'status')
+
+# [queries, query seconds] of the request being served; None outside requests.
+current_request = ContextVar('metrics_current_request', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - start
+
+
+def install_query_counter(connection):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.series = {}
+        self.last_flush = time.monotonic()
+
+    def observe(self, route, method, status, seconds, queries, query_seconds, size):
+        key = (route, method, str(status))
+        with self.lock:
+            row = self.series.get(key)
+            if row is None:
+                row = self.series[key] = [0] * ROW_SIZE
+            row[bisect_left(BUCKETS, seconds)] += 1
+            row[COUNT] += 1
+            row[SECONDS] += seconds
+            row[QUERIES] += queries
+            row[QUERY_SECONDS] += query_seconds
+            row[BYTES] += size
+
+    def flush(self, directory=None):
+        directory = directory or metrics_dir()
+        with self.lock:
+            data = {'\t'.join(key): list(row) for key, row in self.series.items()}
+            self.last_flush = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f)
+        os.replace(path + '.tmp', path)
+
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= getattr(settings, 'METRICS_FLUSH_SECONDS', 5):
+            self.flush()
+
+
+registry = Registry()
+# Workers forked from a preloaded master start from zero.
+os.register_at_fork(after_in_child=registry.reset)
+
+
+def metrics_dir():
+    return str(getattr(settings, 'METRICS_DIR', None) or settings.BASE_DIR / 'var' / 'metrics')
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+DEAD_FILE = 'dead.json'
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _add(totals, data, split=False):
+    for key, row in data.items():
+        total = totals.setdefault(tuple(key.split('\t')) if split else key, [0] * ROW_SIZE)
+        for i, value in enumerate(row):
+            total[i] += value
+
+
+def _retire(directory, dead_paths):
+    """Fold the files of exited workers into DEAD_FILE, then remove them."""
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)  # another worker may be retiring the same files
+        aggregate_path = os.path.join(directory, DEAD_FILE)
+        aggregate = _load(aggregate_path) or {}
+        retired = []
+        for path in dead_paths:
+            data = _load(path)
+            if data is not None:
+                _add(aggregate, data)
+                retired.append(path)
+        if not retired:
+            return
+        with open(aggregate_path + '.tmp', 'w') as f:
+            json.dump(aggregate, f)
+        os.replace(aggregate_path + '.tmp', aggregate_path)
+        for path in retired:
+            os.remove(path)
+
+
+def collect(directory=None):
+    """Counters of every live and exited worker, summed per series (flushes this one first)."""
+    directory = directory or metrics_dir()
+    registry.flush(directory)
+    live, dead = [], []
+    for name in os.listdir(directory):
+        stem, ext = os.path.splitext(name)
+        if ext == '.json' and stem.isdigit():
+            (live if _alive(int(stem)) else dead).append(os.path.join(directory, name))
+    if dead:
+        _retire(directory, dead)
+
+    merged = {}
+    for path in live + [os.path.join(directory, DEAD_FILE)]:
+        data = _load(path)
+        if data is not None:
+            _add(merged, data, split=True)
+    return merged
+
+
+def _labels(key, **extra):
+    pairs = list(zip(LABELS, key)) + list(extra.items())
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def render(series):
+    lines = [
+        '# HELP thinkora_request_duration_seconds Request latency by route.',
+        '# TYPE thinkora_request_duration_seconds histogram',
+    ]
+    for key, row in sorted(series.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), row):
+            cumulative += count
+            lines.append(f'thinkora_request_duration_seconds_bucket{_labels(key, le=bound)} {cumulative}')
+        lines.append(f'thinkora_request_duration_seconds_sum{_labels(key)} {row[SECONDS]:.6f}')
+        lines.append(f'thinkora_request_duration_seconds_count{_labels(key)} {row[COUNT]}')
+    for name, help_text, index in (
+        ('thinkora_db_queries_total', 'Database queries run by requests.', QUERIES),
+        ('thinkora_db_query_seconds_total', 'Time spent in database queries.', QUERY_SECONDS),
+        ('thinkora_response_bytes_total', 'Response body bytes (streamed bodies not counted).', BYTES),
+    ):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for key, row in sorted(series.items()):
+            value = f'{row[index]:.6f}' if isinstance(row[index], float) else row[index]
+            lines.append(f'{name}{_labels(key)} {value}')
+    return '\n'.join(lines) + '\n'
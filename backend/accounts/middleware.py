@@ -0,0 +1,90 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import current_request, registry
+from .routers import pinned_to_primary, wrote_to_primary
+
+PIN_COOKIE = 'pin_primary'
+UNSAFE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+METRICS_METHODS = {'GET', 'HEAD', 'OPTIONS', *UNSAFE_METHODS}
+
+
+class ReplicaPinningMiddleware:
+    """Start each request unpinned (or pinned, see accounts.routers) and keep
+    clients that just wrote on the primary for ``REPLICA_PIN_SECONDS``."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        pinned = request.method in UNSAFE_METHODS or PIN_COOKIE in request.COOKIES
+        return pinned_to_primary.set(pinned), wrote_to_primary.set(False)
+
+    def _finish(self, request, response, tokens):
+        wrote = wrote_to_primary.get()
+        pinned_to_primary.reset(tokens[0])
+        wrote_to_primary.reset(tokens[1])
+        if wrote and getattr(settings, 'DATABASE_REPLICAS', None):
+            response.set_cookie(PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                                httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens = self._start(request)
+        return self._finish(request, self.get_response(request), tokens)
+
+    async def __acall__(self, request):
+        tokens = self._start(request)
+        return self._finish(request, await self.get_response(request), tokens)
+
+
+class MetricsMiddleware:
+    """Record latency, query count/time, status and body size per route
+    (accounts.metrics). Goes first in MIDDLEWARE so it times the whole stack."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self):
+        stats = [0, 0.0]
+        return stats, current_request.set(stats), time.perf_counter()
+
+    def _finish(self, request, response, state):
+        stats, token, start = state
+        seconds = time.perf_counter() - start
+        current_request.reset(token)
+        # The route pattern, not the path, keeps the number of series bounded.
+        match = request.resolver_match
+        route = match.route if match else 'unmatched'
+        method = request.method if request.method in METRICS_METHODS else 'other'
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(route, method, response.status_code, seconds, stats[0], stats[1], size)
+        registry.maybe_flush()
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self._start()
+        return self._finish(request, self.get_response(request), state)
+
+    async def __acall__(self, request):
+        state = self._start()
+        return self._finish(request, await self.get_response(request), state)
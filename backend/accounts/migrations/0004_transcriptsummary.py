@@ -0,0 +1,33 @@
+# Generated by Django 6.1.2 on 2026-10-17 18:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_knowledgebase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semester_year', models.CharField(blank=True, default='', max_length=50)),
+                ('course_count', models.PositiveIntegerField(default=0)),
+                ('total_credits', models.DecimalField(decimal_places=1, default=0, max_digits=8)),
+                ('quality_points', models.DecimalField(decimal_places=1, default=0, max_digits=10)),
+                ('semester_gpa', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('cumulative_gpa', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transcript_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['semester_year'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'semester_year'), name='unique_transcript_semester')],
+            },
+        ),
+    ]
@@ -0,0 +1,90 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+# SQLite: an external-content FTS5 table over accounts_knowledgebase, kept in
+# sync by triggers (so saves, deletes, queryset.update() and bulk_create all
+# reach the index). PostgreSQL: a GIN index on the same tsvector expression
+# that accounts.search queries. Other backends fall back to LIKE search.
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE accounts_knowledgebase_fts USING fts5(
+        question, answer,
+        content='accounts_knowledgebase', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER accounts_knowledgebase_fts_ai AFTER INSERT ON accounts_knowledgebase BEGIN
+        INSERT INTO accounts_knowledgebase_fts(rowid, question, answer)
+        VALUES (new.id, new.question, new.answer);
+    END
+    """,
+    """
+    CREATE TRIGGER accounts_knowledgebase_fts_ad AFTER DELETE ON accounts_knowledgebase BEGIN
+        INSERT INTO accounts_knowledgebase_fts(accounts_knowledgebase_fts, rowid, question, answer)
+        VALUES ('delete', old.id, old.question, old.answer);
+    END
+    """,
+    """
+    CREATE TRIGGER accounts_knowledgebase_fts_au AFTER UPDATE OF question, answer ON accounts_knowledgebase BEGIN
+        INSERT INTO accounts_knowledgebase_fts(accounts_knowledgebase_fts, rowid, question, answer)
+        VALUES ('delete', old.id, old.question, old.answer);
+        INSERT INTO accounts_knowledgebase_fts(rowid, question, answer)
+        VALUES (new.id, new.question, new.answer);
+    END
+    """,
+    "INSERT INTO accounts_knowledgebase_fts(accounts_knowledgebase_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS accounts_knowledgebase_fts_ai',
+    'DROP TRIGGER IF EXISTS accounts_knowledgebase_fts_ad',
+    'DROP TRIGGER IF EXISTS accounts_knowledgebase_fts_au',
+    'DROP TABLE IF EXISTS accounts_knowledgebase_fts',
+]
+
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX IF NOT EXISTS accounts_knowledgebase_tsv ON accounts_knowledgebase
+    USING GIN (to_tsvector('english', question || ' ' || answer))
+    """,
+]
+
+POSTGRES_BACKWARD = ['DROP INDEX IF EXISTS accounts_knowledgebase_tsv']
+
+
+def forwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            with schema_editor.connection.cursor() as cursor:
+                cursor.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)')
+                cursor.execute('DROP TABLE temp.fts5_probe')
+        except OperationalError:
+            return  # SQLite built without FTS5; accounts.search falls back to LIKE.
+        statements = SQLITE_FORWARD
+    elif vendor == 'postgresql':
+        statements = POSTGRES_FORWARD
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def backwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_transcriptsummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.1.2 on 2026-10-17 18:20
+
+import hashlib
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of accounts.models.normalize_question/hash_question as of this
+# migration, so later changes to the model code cannot alter its result.
+_PUNCTUATION_RE = re.compile(r'[^\w\s]+', re.UNICODE)
+
+
+def hash_question(text):
+    normalized = ' '.join(_PUNCTUATION_RE.sub(' ', text.casefold()).split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def backfill_question_hash(apps, schema_editor):
+    KnowledgeBase = apps.get_model('accounts', 'KnowledgeBase')
+    db = schema_editor.connection.alias
+    batch = []
+    for entry in KnowledgeBase.objects.using(db).only('id', 'question').iterator(chunk_size=1000):
+        entry.question_hash = hash_question(entry.question)
+        batch.append(entry)
+        if len(batch) >= 1000:
+            KnowledgeBase.objects.using(db).bulk_update(batch, ['question_hash'])
+            batch = []
+    KnowledgeBase.objects.using(db).bulk_update(batch, ['question_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_knowledgebase_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='knowledgebase',
+            name='question_hash',
+            field=models.CharField(db_index=True, editable=False, max_length=64, null=True),
+        ),
+        # Nullable on purpose: SQLite can then ADD COLUMN in place instead of
+        # rebuilding the table, which would drop the FTS triggers from 0005.
+        migrations.RunPython(backfill_question_hash, migrations.RunPython.noop),
+    ]
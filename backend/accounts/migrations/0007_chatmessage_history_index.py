@@ -0,0 +1,17 @@
+# Generated by Django 6.1.2 on 2026-10-17 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_knowledgebase_question_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['user', 'conversation_id', '-created_at', '-id'], name='chat_user_conv_created_idx'),
+        ),
+    ]
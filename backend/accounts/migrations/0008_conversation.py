@@ -0,0 +1,33 @@
+# Generated by Django 6.1.2 on 2026-10-17 18:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_chatmessage_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('conversation_id', models.CharField(max_length=50)),
+                ('title', models.CharField(blank=True, default='', max_length=100)),
+                ('last_message_preview', models.CharField(blank=True, default='', max_length=200)),
+                ('last_role', models.CharField(blank=True, default='', max_length=10)),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('last_activity', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-last_activity', '-id'], name='conversation_user_activity_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'conversation_id'), name='unique_user_conversation')],
+            },
+        ),
+    ]
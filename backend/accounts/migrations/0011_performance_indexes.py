@@ -0,0 +1,21 @@
+# Generated by Django 6.1.2 on 2026-10-17 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['user', '-id'], name='course_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='knowledgebase',
+            index=models.Index(condition=models.Q(('is_verified', True)), fields=['-id'], name='kb_verified_id_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 6.1.2 on 2026-10-17 20:29
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of accounts.models.semester_sort_key as of this migration, so
+# later changes to the model code cannot alter its result.
+_YEAR_RE = re.compile(r'(?<!\d)(\d{4})(?!\d)')
+_TERM_WORD_RE = re.compile(r'\b(winter|spring|summer|fall|autumn|first|1st|second|2nd|third|3rd)\b')
+_TERM_NUMBER_RE = re.compile(r'(?<!\d)(\d{1,2})(?!\d)')
+_TERM_RANKS = {'winter': 1, 'spring': 2, 'summer': 3, 'fall': 4, 'autumn': 4,
+               'first': 1, '1st': 1, 'second': 2, '2nd': 2, 'third': 3, '3rd': 3}
+
+
+def semester_sort_key(label):
+    label = label or ''
+    text = label.casefold()
+    year = _YEAR_RE.search(text)
+    if year is None:
+        return f'0000.00.{label}'
+    word = _TERM_WORD_RE.search(text)
+    if word is not None:
+        term = _TERM_RANKS[word.group(1)]
+    else:
+        number = _TERM_NUMBER_RE.search(_YEAR_RE.sub(' ', text))
+        term = int(number.group(1)) if number else 0
+    return f'{year.group(1)}.{term:02d}.{label}'
+
+
+def backfill_semester_key(apps, schema_editor):
+    """Set semester_key and recompute cumulative GPAs in chronological order."""
+    TranscriptSummary = apps.get_model('accounts', 'TranscriptSummary')
+    db = schema_editor.connection.alias
+    rows = list(TranscriptSummary.objects.using(db).order_by('user_id'))
+    for row in rows:
+        row.semester_key = semester_sort_key(row.semester_year)
+    rows.sort(key=lambda row: (row.user_id, row.semester_key))
+    user_id = running_credits = running_points = None
+    for row in rows:
+        if row.user_id != user_id:
+            user_id, running_credits, running_points = row.user_id, 0, 0
+        running_credits += row.total_credits
+        running_points += row.quality_points
+        row.cumulative_gpa = round(running_points / running_credits, 2) if running_credits else None
+    TranscriptSummary.objects.using(db).bulk_update(rows, ['semester_key', 'cumulative_gpa'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='transcriptsummary',
+            options={'ordering': ['semester_key']},
+        ),
+        migrations.AddField(
+            model_name='transcriptsummary',
+            name='semester_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='transcriptsummary',
+            index=models.Index(fields=['user', 'semester_key'], name='transcript_user_semester_idx'),
+        ),
+        migrations.RunPython(backfill_semester_key, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,6 @@
+import hashlib
+import re
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
@@ -20,6 +23,10 @@ class Course(models.Model):
 
     class Meta:
         ordering = ['course_name']
+        indexes = [
+            # Course lists and exports filter by user and order by id (pages walk -id).
+            models.Index(fields=['user', '-id'], name='course_user_id_idx'),
+        ]
 
 # --- Chat History Model ---
 class ChatMessage(models.Model):
@@ -32,16 +39,159 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # History pages walk (user, conversation_id) backwards on (created_at, id).
+            models.Index(fields=['user', 'conversation_id', '-created_at', '-id'],
+                         name='chat_user_conv_created_idx'),
+        ]
+
+    def __str__(self):
+        # The admin changelist defers content and annotates this preview instead.
+        preview = getattr(self, 'preview', None)
+        return f"{self.role}: {self.content[:50] if preview is None else preview}"
+
+# --- Conversation (denormalized per-conversation summary) ---
+class Conversation(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversations')
+    conversation_id = models.CharField(max_length=50)
+    title = models.CharField(max_length=100, blank=True, default='')
+    last_message_preview = models.CharField(max_length=200, blank=True, default='')
+    last_role = models.CharField(max_length=10, blank=True, default='')
+    message_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    last_activity = models.DateTimeField()
+
+    PREVIEW_LENGTH = 200
+    TITLE_LENGTH = 100
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'conversation_id'], name='unique_user_conversation'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_activity', '-id'], name='conversation_user_activity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.conversation_id}: {self.title}"
+
+# --- ConversationArchive (cold storage for idle conversations) ---
+class ConversationArchive(models.Model):
+    """Compressed JSON of every message of a conversation moved out of ChatMessage."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversation_archives')
+    conversation_id = models.CharField(max_length=50)
+    codec = models.CharField(max_length=10, choices=[('zlib', 'zlib'), ('lzma', 'lzma')])
+    data = models.BinaryField()
+    message_count = models.PositiveIntegerField()
+    raw_bytes = models.PositiveIntegerField()
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'conversation_id'], name='unique_user_conversation_archive'),
+        ]
+
+    def __str__(self):
+        return f"{self.conversation_id} ({self.message_count} messages, {self.codec})"
+
+# --- DataVersion (change counters behind ETag / Last-Modified) ---
+class DataVersion(models.Model):
+    """Bumped on every write to the data behind ``key`` (see accounts.versions)."""
+    key = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField()
 
     def __str__(self):
-        return f"{self.role}: {self.content[:50]}"
+        return f"{self.key} v{self.version}"
 
 # --- NEW: Knowledge Base Model ---
+_PUNCTUATION_RE = re.compile(r'[^\w\s]+', re.UNICODE)
+
+def normalize_question(text):
+    """Case-, whitespace- and punctuation-folded form used for exact lookups."""
+    return ' '.join(_PUNCTUATION_RE.sub(' ', text.casefold()).split())
+
+def hash_question(text):
+    return hashlib.sha256(normalize_question(text).encode('utf-8')).hexdigest()
+
 class KnowledgeBase(models.Model):
     question = models.TextField(unique=True)
+    # sha256 of normalize_question(question): a short indexed key instead of
+    # comparing whole TextFields. Set in save(); bulk writers must set it too.
+    question_hash = models.CharField(max_length=64, db_index=True, editable=False, null=True)
     answer = models.TextField()
     is_verified = models.BooleanField(default=False) 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Verified-only reads (search fallback, admin filter) without visiting unverified rows.
+            models.Index(fields=['-id'], condition=models.Q(is_verified=True), name='kb_verified_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.question_hash = hash_question(self.question)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'question' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'question_hash'}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        preview = getattr(self, 'preview', None)
+        return self.question[:50] if preview is None else preview
+
+# --- Transcript Summary (materialized per user/semester) ---
+_YEAR_RE = re.compile(r'(?<!\d)(\d{4})(?!\d)')
+_TERM_WORD_RE = re.compile(r'\b(winter|spring|summer|fall|autumn|first|1st|second|2nd|third|3rd)\b')
+_TERM_NUMBER_RE = re.compile(r'(?<!\d)(\d{1,2})(?!\d)')
+_TERM_RANKS = {'winter': 1, 'spring': 2, 'summer': 3, 'fall': 4, 'autumn': 4,
+               'first': 1, '1st': 1, 'second': 2, '2nd': 2, 'third': 3, '3rd': 3}
+
+def semester_sort_key(label):
+    """Chronological sort key for a free-form semester label.
+
+    ``'Spring 2024'`` -> ``'2024.02.Spring 2024'``, ``'2024/1'`` -> ``'2024.01.2024/1'``:
+    the first four-digit year, then the term (a season/ordinal word or a
+    one- or two-digit number), then the label itself. Labels without a year
+    sort first, by label.
+    """
+    label = label or ''
+    text = label.casefold()
+    year = _YEAR_RE.search(text)
+    if year is None:
+        return f'0000.00.{label}'
+    word = _TERM_WORD_RE.search(text)
+    if word is not None:
+        term = _TERM_RANKS[word.group(1)]
+    else:
+        number = _TERM_NUMBER_RE.search(_YEAR_RE.sub(' ', text))
+        term = int(number.group(1)) if number else 0
+    return f'{year.group(1)}.{term:02d}.{label}'
+
+class TranscriptSummary(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transcript_summaries')
+    semester_year = models.CharField(max_length=50, blank=True, default='')
+    # semester_sort_key(semester_year): string ordering on semester_year would
+    # put "Fall 2024" before "Spring 2024". Set by accounts.transcript.
+    semester_key = models.CharField(max_length=64, blank=True, default='', editable=False)
+    course_count = models.PositiveIntegerField(default=0)
+    total_credits = models.DecimalField(max_digits=8, decimal_places=1, default=0)
+    quality_points = models.DecimalField(max_digits=10, decimal_places=1, default=0)
+    semester_gpa = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    cumulative_gpa = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['semester_key']
+        indexes = [
+            # Per-user transcript reads in semester order without a sort.
+            models.Index(fields=['user', 'semester_key'], name='transcript_user_semester_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'semester_year'], name='unique_transcript_semester'),
+        ]
+
     def __str__(self):
-        return self.question[:50]
+        return f"{self.user_id} {self.semester_year or '-'}: {self.semester_gpa}"
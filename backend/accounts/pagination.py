@@ -0,0 +1,50 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.pagination import CursorPagination
+
+
+class CourseCursorPagination(CursorPagination):
+    # Keyset pagination on the primary key: each page is an `id < cursor`
+    # range scan, so deep pages cost the same as the first one (no OFFSET).
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+def encode_keyset_cursor(value, pk):
+    raw = f'{value.isoformat()}|{pk}'.encode()
+    return urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_keyset_cursor(cursor):
+    """Inverse of encode_keyset_cursor; raises ValueError on a bad cursor."""
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(value), int(pk)
+    except (UnicodeDecodeError, binascii.Error, TypeError) as exc:
+        raise ValueError('Invalid cursor') from exc
+
+
+def keyset_page(queryset, before=None, limit=50, field='created_at', chronological=True):
+    """Newest-first page of ``queryset`` strictly older than the ``before`` cursor.
+
+    Ordering and the cursor are on (``field``, id), matching the composite
+    indexes, so any page is an index range scan. Returns ``(rows, next_cursor)``;
+    rows are put back in chronological order unless ``chronological`` is False.
+    """
+    if before:
+        value, pk = decode_keyset_cursor(before)
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+    rows = list(queryset.order_by(f'-{field}', '-id')[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_keyset_cursor(getattr(rows[-1], field), rows[-1].id)
+    if chronological:
+        rows.reverse()
+    return rows, next_cursor
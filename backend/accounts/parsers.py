@@ -0,0 +1,25 @@
+import codecs
+import csv
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+def read_csv_rows(stream, encoding='utf-8'):
+    """Read a CSV byte stream (with a header row) into a list of dicts."""
+    try:
+        reader = csv.DictReader(codecs.iterdecode(stream, encoding))
+        return [{k.strip(): (v or '').strip() for k, v in row.items() if k} for row in reader]
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise ParseError(f'CSV parse error - {exc}')
+
+
+class CSVParser(BaseParser):
+    """Parses ``text/csv`` request bodies into a list of row dicts."""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return read_csv_rows(stream, encoding)
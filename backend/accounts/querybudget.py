@@ -0,0 +1,191 @@
+"""Query budgets: the most queries a view may run, checked in development.
+
+Views declare a budget with ``@query_budget(n)``; viewsets set
+``query_budget = {'list': n, ...}`` per action. With ``QUERY_BUDGET_CHECKS``
+on (defaults to DEBUG), :class:`QueryBudgetMiddleware` records every query of
+a request and logs
+
+* statements run ``QUERY_REPEAT_THRESHOLD`` or more times (the N+1 signature),
+  with the lines of project code that issued them, and
+* views that exceed their budget; ``QUERY_BUDGET_RAISE`` turns that into a
+  :class:`QueryBudgetExceeded` error (the test suite enables it).
+
+Streaming responses are checked once their body has been iterated, since that
+is when their queries run; they carry no ``X-Query-Count`` header.
+
+Tests assert budgets directly with :func:`assert_max_queries`.
+"""
+import logging
+import os
+import sys
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# QueryRecorder of the request being checked; None outside checked requests.
+current_recorder = ContextVar('querybudget_current_recorder', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    """Declare the most queries a view may run (outermost decorator)."""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def budget_for(view_func, request):
+    budget = getattr(view_func, 'query_budget', None)
+    cls = getattr(view_func, 'cls', None)
+    if budget is None and cls is not None:
+        budget = getattr(cls, 'query_budget', None)
+        if isinstance(budget, dict):
+            action = (getattr(view_func, 'actions', None) or {}).get(request.method.lower())
+            budget = budget.get(action)
+    return budget
+
+
+@contextmanager
+def assert_max_queries(max_queries, using=DEFAULT_DB_ALIAS):
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    if len(context) > max_queries:
+        statements = '\n'.join(f'{i}. {query["sql"]}' for i, query in enumerate(context.captured_queries, 1))
+        raise AssertionError(f'{len(context)} queries, budget {max_queries}:\n{statements}')
+
+
+# Execute wrappers of our own; the origin is whatever called them.
+_WRAPPER_FILES = {__file__, metrics.__file__}
+
+
+def _origin():
+    # First frame in project code (not Django, DRF or our execute wrappers).
+    root = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(root) and 'site-packages' not in filename and filename not in _WRAPPER_FILES:
+            return f'{os.path.relpath(filename, root)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, _origin()))
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        """``[(sql, count, Counter(origin))]`` for statements run ``threshold``+ times."""
+        counts = Counter(sql for sql, _ in self.queries)
+        origins = defaultdict(Counter)
+        for sql, origin in self.queries:
+            if counts[sql] >= threshold:
+                origins[sql][origin] += 1
+        return [(sql, counts[sql], origins[sql]) for sql in origins]
+
+
+def record_queries(execute, sql, params, many, context):
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+class QueryBudgetMiddleware:
+    """Development-only query recording; see the module docstring."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_CHECKS', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self._finish(request, response, recorder)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self._finish(request, response, recorder)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = budget_for(view_func, request)
+
+    def _finish(self, request, response, recorder):
+        if response.streaming:
+            wrap = self._astream if response.is_async else self._stream
+            response.streaming_content = wrap(request, recorder, response.streaming_content)
+            return response
+        response['X-Query-Count'] = str(len(recorder.queries))
+        self._check(request, recorder)
+        return response
+
+    def _stream(self, request, recorder, content):
+        # Iterated by the server after __call__ returned, so set rather than reset.
+        current_recorder.set(recorder)
+        try:
+            yield from content
+        finally:
+            current_recorder.set(None)
+        self._check(request, recorder)
+
+    async def _astream(self, request, recorder, content):
+        current_recorder.set(recorder)
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            current_recorder.set(None)
+        self._check(request, recorder)
+
+    def _check(self, request, recorder):
+        threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 3)
+        for sql, count, origins in recorder.repeated(threshold):
+            logger.warning('%s %s ran %d times (from %s): %s', request.method, request.path, count,
+                           ', '.join(f'{origin} x{n}' for origin, n in origins.most_common()), sql)
+
+        budget = getattr(request, 'query_budget', None)
+        if budget is not None and len(recorder.queries) > budget:
+            message = f'{request.method} {request.path} ran {len(recorder.queries)} queries, budget {budget}'
+            if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+                raise QueryBudgetExceeded(message)
+            logger.error(message)
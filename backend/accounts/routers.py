@@ -0,0 +1,93 @@
+"""Primary/replica routing for the ``accounts`` models.
+
+Reads go to one of the ``DATABASE_REPLICAS`` aliases, writes to ``default``.
+A request is pinned to the primary (read-your-writes) when
+
+* it is a POST/PUT/PATCH/DELETE,
+* it has already written through the ORM, or is inside a transaction on
+  ``default``,
+* the client wrote within the last ``REPLICA_PIN_SECONDS`` (the ``pin_primary``
+  cookie set by :class:`accounts.middleware.ReplicaPinningMiddleware`), which
+  covers replication lag.
+
+A replica that fails to connect is skipped for ``REPLICA_RETRY_SECONDS`` and
+reads fall back to the primary. One that connected is trusted for
+``REPLICA_HEALTH_SECONDS`` before it is checked again.
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+ROUTED_APPS = {'accounts'}
+
+# True once the current request (or task) must read from the primary.
+pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+# True once the current request has written; the middleware then sets the cookie.
+wrote_to_primary = ContextVar('wrote_to_primary', default=False)
+
+_down_until = {}
+_healthy_until = {}
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def mark_replica_down(alias):
+    _healthy_until.pop(alias, None)
+    _down_until[alias] = time.monotonic() + getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+
+
+def _available(alias):
+    now = time.monotonic()
+    if _healthy_until.get(alias, 0) > now:
+        return True
+    if _down_until.get(alias, 0) > now:
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        logger.warning('Replica %s unavailable; reading from the primary', alias)
+        mark_replica_down(alias)
+        return False
+    _healthy_until[alias] = now + getattr(settings, 'REPLICA_HEALTH_SECONDS', 5)
+    return True
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in ROUTED_APPS:
+            return None
+        if pinned_to_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = replica_aliases()
+        for alias in random.sample(replicas, len(replicas)):
+            if _available(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in ROUTED_APPS:
+            return None
+        pinned_to_primary.set(True)
+        wrote_to_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes through replication.
+        if db in replica_aliases():
+            return False
+        return None
@@ -0,0 +1,104 @@
+"""Ranked full-text search over KnowledgeBase.
+
+Engines, picked per database connection:
+
+* ``sqlite-fts5``  - FTS5 external-content index, BM25 ranking.
+* ``postgres-fts`` - GIN-indexed tsvector, ts_rank_cd ranking.
+* ``like``         - the old ``icontains`` scan, used when neither is available.
+
+The index itself is created and kept in sync by migration 0005 (triggers on
+SQLite, an expression index on PostgreSQL), so there is nothing to update from
+Python on save or delete.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+from .models import KnowledgeBase
+
+FTS_TABLE = 'accounts_knowledgebase_fts'
+MAX_RESULTS = 50
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_engine_cache = {}
+
+
+def tokenize(query):
+    return _TOKEN_RE.findall(query.lower())
+
+
+def engine_for(using='default'):
+    """Name of the search engine available on the ``using`` connection."""
+    connection = connections[using]
+    key = (using, connection.settings_dict['NAME'])
+    if key not in _engine_cache:
+        engine = 'like'
+        if connection.vendor == 'sqlite':
+            if FTS_TABLE in connection.introspection.table_names():
+                engine = 'sqlite-fts5'
+        elif connection.vendor == 'postgresql':
+            engine = 'postgres-fts'
+        _engine_cache[key] = engine
+    return _engine_cache[key]
+
+
+def _sqlite_search(connection, tokens, verified_only, limit):
+    # Every token is quoted so user input can never be parsed as FTS syntax.
+    match = ' OR '.join('"%s"' % token.replace('"', '') for token in tokens)
+    sql = (
+        f'SELECT kb.id, -bm25({FTS_TABLE}, 2.0, 1.0) AS score '
+        f'FROM {FTS_TABLE} JOIN accounts_knowledgebase kb ON kb.id = {FTS_TABLE}.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s'
+    )
+    if verified_only:
+        sql += ' AND kb.is_verified'
+    sql += ' ORDER BY score DESC LIMIT %s'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, limit])
+        return cursor.fetchall()
+
+
+def _postgres_search(connection, tokens, verified_only, limit):
+    # Same expression as the GIN index in migration 0005 so the index is used.
+    sql = (
+        "SELECT id, ts_rank_cd(to_tsvector('english', question || ' ' || answer), q) AS score "
+        "FROM accounts_knowledgebase, to_tsquery('english', %s) q "
+        "WHERE to_tsvector('english', question || ' ' || answer) @@ q"
+    )
+    if verified_only:
+        sql += ' AND is_verified'
+    sql += ' ORDER BY score DESC LIMIT %s'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [' | '.join(tokens), limit])
+        return cursor.fetchall()
+
+
+def _like_search(tokens, verified_only, limit):
+    condition = Q()
+    for token in tokens:
+        condition |= Q(question__icontains=token) | Q(answer__icontains=token)
+    queryset = KnowledgeBase.objects.filter(condition)
+    if verified_only:
+        queryset = queryset.filter(is_verified=True)
+    return [(pk, 0.0) for pk in queryset.order_by('-id').values_list('id', flat=True)[:limit]]
+
+
+def search_ids(query, verified_only=False, limit=20, using='default'):
+    """Return ``[(id, score), ...]`` best match first (higher score is better)."""
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    engine = engine_for(using)
+    if engine == 'sqlite-fts5':
+        return _sqlite_search(connections[using], tokens, verified_only, limit)
+    if engine == 'postgres-fts':
+        return _postgres_search(connections[using], tokens, verified_only, limit)
+    return _like_search(tokens, verified_only, limit)
+
+
+def search(query, verified_only=False, limit=20, using='default'):
+    """Return ``[(KnowledgeBase, score), ...]`` best match first."""
+    ranked = search_ids(query, verified_only, limit, using)
+    entries = KnowledgeBase.objects.using(using).in_bulk([pk for pk, _ in ranked])
+    return [(entries[pk], score) for pk, score in ranked if pk in entries]
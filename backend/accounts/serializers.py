@@ -1,18 +1,59 @@
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from .models import User, Course
+from .models import User, ChatMessage, Conversation, Course, KnowledgeBase, TranscriptSummary
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
         attrs['username'] = attrs.get('email')
         return super().validate(attrs)
 
-class CourseSerializer(serializers.ModelSerializer):
+def requested_fields(request):
+    """Field names from ``?fields=a,b`` on GET requests, or None."""
+    if request is None or request.method != 'GET':
+        return None
+    raw = request.query_params.get('fields')
+    if not raw:
+        return None
+    return {name.strip() for name in raw.split(',') if name.strip()}
+
+class SparseFieldsMixin:
+    """Drop fields not listed in ``?fields=`` (unknown names are ignored)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get('request'))
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+class CourseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = ['id', 'user', 'course_name', 'credits', 'letter_grade', 'semester_year']
         read_only_fields = ['user']
 
+class TranscriptSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TranscriptSummary
+        fields = ['semester_year', 'course_count', 'total_credits', 'quality_points',
+                  'semester_gpa', 'cumulative_gpa']
+
+class KnowledgeBaseSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = KnowledgeBase
+        fields = ['id', 'question', 'answer', 'is_verified', 'created_at']
+
+class ChatMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatMessage
+        fields = ['id', 'conversation_id', 'role', 'content', 'context', 'created_at']
+
+class ConversationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Conversation
+        fields = ['conversation_id', 'title', 'last_message_preview', 'last_role', 'message_count',
+                  'created_at', 'last_activity']
+
 # ADD THIS PART:
 class UserRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,43 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .conversations import record_messages
+from .kb_cache import invalidate_entry
+from .metrics import install_query_counter
+from .models import ChatMessage, Course, KnowledgeBase, User
+from .querybudget import install_query_recorder
+from .versions import KNOWLEDGE_BASE, bump_version, course_key
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    install_query_counter(connection)
+    install_query_recorder(connection)
+
+
+@receiver([post_save, post_delete], sender=KnowledgeBase)
+def knowledge_base_changed(sender, instance, **kwargs):
+    invalidate_entry(instance)
+    bump_version(KNOWLEDGE_BASE)
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, **kwargs):
+    # ETag version for the owner's course list/detail and transcript; bulk
+    # writes (CourseViewSet.bulk_import) bump it themselves.
+    bump_version(course_key(instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=ChatMessage)
+def chat_message_created(sender, instance, created, **kwargs):
+    # bulk_create paths (accounts.chat, the write-behind buffer) call
+    # record_messages themselves; this covers single .save()/.create() calls.
+    if created:
+        record_messages([instance])
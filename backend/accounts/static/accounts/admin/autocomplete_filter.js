@@ -0,0 +1,12 @@
+'use strict';
+{
+    // AutocompleteFilter: reload the changelist when a row is picked or cleared.
+    // data-query-string holds the other active filters ("?..." or "?").
+    window.addEventListener('load', function() {
+        django.jQuery('select.autocomplete-filter').on('change', function() {
+            const query = this.dataset.queryString;
+            const param = this.dataset.lookup + '=' + encodeURIComponent(this.value);
+            window.location.search = this.value ? query + (query === '?' ? '' : '&') + param : query;
+        });
+    });
+}
@@ -0,0 +1,39 @@
+import copy
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+# Second alias for the replica routing tests: a test mirror of the primary, so
+# it needs no schema of its own. Reads only go to it under
+# override_settings(DATABASE_REPLICAS=[TEST_REPLICA]).
+TEST_REPLICA = 'replica_1'
+
+
+class TestRunner(DiscoverRunner):
+    """Runs the suite with its own cache file, a ``replica_1`` database alias
+    and without the collectstatic manifest the production storage needs."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        if TEST_REPLICA not in settings.DATABASES:
+            # The same dict as connections.settings, already filled with defaults.
+            replica = copy.deepcopy(settings.DATABASES['default'])
+            replica['TEST']['MIRROR'] = 'default'
+            settings.DATABASES[TEST_REPLICA] = replica
+        self.cache_dir = tempfile.mkdtemp(prefix='thinkora-test-cache-')
+        caches = {alias: dict(config) for alias, config in settings.CACHES.items()}
+        caches['default']['LOCATION'] = f'{self.cache_dir}/cache.sqlite3'
+        self.test_settings = override_settings(CACHES=caches, STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,1211 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend.database import database_config, replica_configs
+
+from .admin import ChatMessageAdmin
+from .admin_scaling import EstimatedCountPaginator
+from .management.commands.audit_indexes import explain
+from .gpa import GPAError, compute_gpa, compute_gpas
+from .archive import archive_cache
+from .async_views import chat_stream
+from .authentication import invalidate_user, user_cache
+from .cache_backends import TwoTierCache
+from .caching import get_or_compute, invalidate_namespace
+from .chat import save_turn
+from .chat_buffer import ChatWriteBuffer, flush_pending, pending_key
+from .hashing import HashingPool
+from .kb_cache import answer_cache
+from .metrics import COUNT, QUERIES, ROW_SIZE, collect, registry
+from .querybudget import QueryBudgetExceeded, QueryBudgetMiddleware, QueryRecorder, assert_max_queries
+from .middleware import PIN_COOKIE, ReplicaPinningMiddleware
+from .routers import PrimaryReplicaRouter, pinned_to_primary
+from .vectors import build_index
+from .versions import KNOWLEDGE_BASE, version_cache
+from .views import CourseViewSet, transcript_export
+from .models import (
+    ChatMessage, Conversation, ConversationArchive, Course, DataVersion, KnowledgeBase, User, hash_question,
+    semester_sort_key,
+)
+
+
+# --- GPA engine ---
+class GPAEngineTests(TestCase):
+    def test_single_matches_original_loop(self):
+        gpa, total = compute_gpa(['a', ' B', 'x', 'F'], [3, 2, 4, '1'])
+        self.assertAlmostEqual(gpa, (15 + 8 + 0) / 6)
+        self.assertEqual(total, 6.0)
+
+    def test_ragged_batch(self):
+        gpas, totals = compute_gpas([['A'], ['B', 'C'], ['Z']], [[3], [1, 1], [2]])
+        self.assertEqual(gpas[0], 5.0)
+        self.assertEqual(gpas[1], 3.5)
+        self.assertEqual(totals[2], 0.0)
+
+    def test_invalid_shapes(self):
+        with self.assertRaises(GPAError):
+            compute_gpa(['A', 'B'], [3])
+        with self.assertRaises(GPAError):
+            compute_gpa(['Z'], [3])
+
+
+class CalculateGPAEndpointTests(APITestCase):
+    url = reverse('calculate_gpa')
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='gpa@example.com', username='gpa', password='pass12345')
+        self.client.force_authenticate(self.user)
+
+    def test_single(self):
+        response = self.client.post(self.url, {'grades': ['A', 'B'], 'credits': [3, 3]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'success': True, 'gpa': 4.5, 'total_credits': 6.0})
+
+    def test_batch_and_matrix(self):
+        batch = {'batch': [{'grades': ['A'], 'credits': [3]}, {'grades': ['Q'], 'credits': [3]}]}
+        response = self.client.post(self.url, batch, format='json')
+        self.assertEqual(response.data['results'][0], {'gpa': 5.0, 'total_credits': 3.0})
+        self.assertIsNone(response.data['results'][1]['gpa'])
+
+        matrix = {'grades': [['A', 'C'], ['B', 'B']], 'credits': [[1, 1], [2, 2]]}
+        response = self.client.post(self.url, matrix, format='json')
+        self.assertEqual([r['gpa'] for r in response.data['results']], [4.0, 4.0])
+
+    def test_invalid(self):
+        response = self.client.post(self.url, {'grades': ['A'], 'credits': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+        for malformed in ({'grades': [['A']], 'credits': [3]}, {'grades': [['A']], 'credits': [['x']]},
+                          {'batch': [{'grades': 'A', 'credits': 3}]}):
+            response = self.client.post(self.url, malformed, format='json')
+            self.assertEqual(response.status_code, 400, malformed)
+
+    def test_negative_or_non_finite_credits(self):
+        for credits in ([-3], ['nan'], ['inf'], [3, -3]):
+            response = self.client.post(self.url, {'grades': ['A'] * len(credits), 'credits': credits}, format='json')
+            self.assertEqual(response.status_code, 400, credits)
+            response = self.client.post(self.url, {'batch': [{'grades': ['A'] * len(credits), 'credits': credits}]},
+                                        format='json')
+            self.assertEqual(response.status_code, 400, credits)
+
+    def test_open_without_login(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(self.url, {'grades': ['A'], 'credits': [3]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse('health_check')).status_code, 200)
+
+
+# --- Transcript summaries ---
+class TranscriptSummaryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='t@example.com', username='t', password='pass12345')
+        self.client.force_authenticate(self.user)
+
+    def add(self, name, grade, credits, semester):
+        data = {'course_name': name, 'letter_grade': grade, 'credits': credits, 'semester_year': semester}
+        response = self.client.post('/api/courses/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_incremental_updates_match_rebuild(self):
+        first = self.add('Math', 'A', 3, '2023/1')
+        self.add('Physics', 'C', 2, '2023/1')
+        second = self.add('Chem', 'B', 4, '2023/2')
+
+        data = self.client.get(reverse('transcript')).data
+        self.assertEqual([s['semester_gpa'] for s in data['semesters']], ['4.20', '4.00'])
+        self.assertEqual(data['cumulative_gpa'], '4.11')
+
+        self.client.patch(f'/api/courses/{first}/', {'letter_grade': 'B', 'semester_year': '2023/2'}, format='json')
+        self.client.delete(f'/api/courses/{second}/')
+        incremental = self.client.get(reverse('transcript')).data
+
+        from .transcript import rebuild_for_user
+        rebuild_for_user(self.user.id)
+        self.assertEqual(self.client.get(reverse('transcript')).data, incremental)
+        self.assertEqual([s['semester_year'] for s in incremental['semesters']], ['2023/1', '2023/2'])
+        self.assertEqual(incremental['cumulative_gpa'], '3.60')
+
+    def test_semesters_in_chronological_order(self):
+        self.add('Art', 'A', 3, 'Fall 2024')
+        self.add('Math', 'C', 3, 'Spring 2024')
+        self.add('Chem', 'B', 2, 'Spring 2025')
+        data = self.client.get(reverse('transcript')).data
+        self.assertEqual([s['semester_year'] for s in data['semesters']], ['Spring 2024', 'Fall 2024', 'Spring 2025'])
+        self.assertEqual([s['cumulative_gpa'] for s in data['semesters']], ['3.00', '4.00', '4.00'])
+
+        from .transcript import rebuild_for_user
+        rebuild_for_user(self.user.id)
+        self.assertEqual(self.client.get(reverse('transcript')).data, data)
+
+        labels = ['2024/2', '', '2023/2024 Second Semester', 'Y1', '2024/1', '2023/2024 First Semester']
+        self.assertEqual(sorted(labels, key=semester_sort_key), [
+            '', 'Y1', '2023/2024 First Semester', '2023/2024 Second Semester', '2024/1', '2024/2'])
+
+
+# --- Course pagination & sparse fieldsets ---
+class CourseListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='c@example.com', username='c', password='pass12345')
+        self.client.force_authenticate(self.user)
+        Course.objects.bulk_create([
+            Course(user=self.user, course_name=f'Course {i}', credits=3, letter_grade='A', semester_year='2024/1')
+            for i in range(120)
+        ])
+
+    def test_cursor_pages_cover_every_course_once(self):
+        seen = []
+        url = '/api/courses/?page_size=50'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), 120)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_sparse_fields(self):
+        response = self.client.get('/api/courses/?fields=course_name,letter_grade')
+        self.assertEqual(set(response.data['results'][0]), {'course_name', 'letter_grade'})
+
+
+# --- Conditional GET (ETag / Last-Modified) ---
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='etag@example.com', username='etag', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.course = Course.objects.create(user=self.user, course_name='Math', credits=3, letter_grade='A')
+
+    def test_course_list_304_without_running_the_queryset(self):
+        first = self.client.get('/api/courses/')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Last-Modified', first)
+        with self.assertNumQueries(1):  # the DataVersion row only
+            again = self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+
+        self.assertNotEqual(self.client.get('/api/courses/?page_size=5')['ETag'], first['ETag'])
+        self.client.patch(f'/api/courses/{self.course.id}/', {'letter_grade': 'B'}, format='json')
+        changed = self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_course_detail_and_transcript_follow_course_writes(self):
+        detail = self.client.get(f'/api/courses/{self.course.id}/')
+        transcript = self.client.get('/api/transcript/')
+        self.assertEqual(self.client.get(f'/api/courses/{self.course.id}/',
+                                         HTTP_IF_NONE_MATCH=detail['ETag']).status_code, 304)
+        self.client.post('/api/courses/bulk/', [{'course_name': 'Physics', 'credits': 2, 'letter_grade': 'C'}],
+                         format='json')
+        self.assertEqual(self.client.get('/api/transcript/', HTTP_IF_NONE_MATCH=transcript['ETag']).status_code, 200)
+
+    def test_knowledge_base_reads(self):
+        version_cache.clear()
+        KnowledgeBase.objects.create(question='What is a GPA?', answer='An average.', is_verified=True)
+        first = self.client.get('/api/knowledge/search/?q=gpa')
+        self.assertEqual(self.client.get('/api/knowledge/search/?q=gpa', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        KnowledgeBase.objects.create(question='What is a credit?', answer='A unit.', is_verified=True)
+        self.assertEqual(self.client.get('/api/knowledge/search/?q=gpa', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+
+# --- DATABASES from the environment ---
+class DatabaseConfigTests(TestCase):
+    def test_postgres_url_with_persistent_connections_or_pool(self):
+        url = 'postgres://u:p@db.example.com:5432/thinkora'
+        config = database_config(Path('/srv'), {'DATABASE_URL': url})
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((config['CONN_MAX_AGE'], config['CONN_HEALTH_CHECKS']), (600, True))
+
+        pooled = database_config(Path('/srv'), {'DATABASE_URL': url, 'DB_POOL': 'native', 'DB_POOL_MAX_SIZE': '20'})
+        self.assertEqual(pooled['OPTIONS']['pool']['max_size'], 20)
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+
+    def test_sqlite_profile(self):
+        tuned = database_config(Path('/srv'), {})
+        self.assertEqual(str(tuned['NAME']), '/srv/db.sqlite3')
+        self.assertIn('journal_mode=WAL', tuned['OPTIONS']['init_command'])
+        self.assertEqual(tuned['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertNotIn('init_command', database_config(Path('/srv'), {'SQLITE_PROFILE': 'default'})['OPTIONS'])
+
+
+# --- Index audit ---
+class IndexAuditTests(APITestCase):
+    def test_endpoints_have_no_unexpected_scans(self):
+        user = User.objects.create_user(email='a@example.com', username='a', password='pass12345')
+        Course.objects.create(user=user, course_name='Math', credits=3, letter_grade='A')
+        out = StringIO()
+        call_command('audit_indexes', '--user', 'a@example.com', '--strict', stdout=out)
+        self.assertIn('course-list  GET /api/courses/  200', out.getvalue())
+        self.assertIn('0 flagged', out.getvalue())
+
+    def test_throwaway_user_is_rolled_back(self):
+        User.objects.create_user(email='index-audit@example.com', username='index-audit')
+        for _ in range(2):
+            call_command('audit_indexes', stdout=StringIO())
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_explain_flags_scans_and_uses_partial_index(self):
+        _, flags = explain(connection, *KnowledgeBase.objects.filter(answer='x').order_by('created_at').query.sql_with_params())
+        self.assertEqual([kind for kind, _ in flags], ['full scan', 'sort'])
+        lines, flags = explain(connection, *KnowledgeBase.objects.filter(is_verified=True).order_by('-id')
+                               .values('id').query.sql_with_params())
+        self.assertEqual(flags, [])
+        self.assertIn('kb_verified_id_idx', ' '.join(lines))
+
+
+# --- Admin at scale (estimated counts, keyset pages) ---
+class LargeTableAdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='root@example.com', username='root', password='pass12345')
+        self.other = User.objects.create_user(email='other@example.com', username='other', password='pass12345')
+        self.client.force_login(self.admin)
+        ChatMessage.objects.bulk_create(
+            [ChatMessage(user=self.admin, conversation_id='c', role='user', content=f'{i:03d}' + 'x' * 5000)
+             for i in range(12)])
+        self.ids = list(ChatMessage.objects.order_by('-id').values_list('id', flat=True))
+
+    def test_changelist_without_count_or_content(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/admin/accounts/chatmessage/')
+        self.assertEqual(response.status_code, 200)
+        sql = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertNotIn('COUNT(', sql)
+        self.assertIn('SUBSTR', sql.upper())
+        # The user filter does not list every user.
+        self.assertNotContains(response, 'other@example.com')
+        row = response.context['cl'].result_list[0]
+        self.assertIn('content', row.get_deferred_fields())
+        self.assertEqual(row.preview, '011' + 'x' * 47)
+
+    def test_cursor_pages(self):
+        seen = []
+        url = '/admin/accounts/chatmessage/?role=user'
+        with patch.object(ChatMessageAdmin, 'list_per_page', 5):
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                cl = response.context['cl']
+                seen += [row.id for row in cl.result_list]
+                url = cl.next_cursor and '/admin/accounts/chatmessage/' + cl.next_page_url
+        self.assertEqual(seen, self.ids)
+        self.assertEqual(cl.first_page_url, '?role=user')
+
+    def test_selected_user_filter(self):
+        response = self.client.get(f'/admin/accounts/chatmessage/?user__id__exact={self.admin.id}')
+        self.assertContains(response, 'root@example.com')
+        self.assertContains(response, 'data-query-string="?"')
+        self.assertEqual(len(response.context['cl'].result_list), 12)
+
+    def test_estimated_and_bounded_counts(self):
+        paginator = EstimatedCountPaginator(ChatMessage.objects.all(), 5)
+        self.assertEqual(paginator.count, self.ids[0])
+        self.assertEqual(paginator.count_label, f'about {self.ids[0]}')
+        with override_settings(ADMIN_COUNT_LIMIT=10):
+            paginator = EstimatedCountPaginator(ChatMessage.objects.filter(role='user'), 5)
+            self.assertEqual(paginator.count_label, '10+')
+        self.assertEqual(EstimatedCountPaginator(ChatMessage.objects.filter(role='ai'), 5).count_label, '0')
+
+
+# --- Startup profile ---
+class ProfileStartupTests(TestCase):
+    def test_compares_full_and_api_profiles(self):
+        out = StringIO()
+        call_command('profile_startup', '--compare', '--runs', '1', stdout=out)
+        full, api = out.getvalue().splitlines()
+        self.assertTrue(full.startswith('full') and api.startswith('api'))
+        # The API-only profile loads fewer modules (no admin, sessions, messages ...).
+        self.assertLess(int(api.split()[3]), int(full.split()[3]))
+
+
+# --- Primary/replica routing ---
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        token = pinned_to_primary.set(False)
+        self.addCleanup(pinned_to_primary.reset, token)
+
+    def test_replica_configs(self):
+        replicas = replica_configs({'DATABASE_REPLICA_URLS': 'sqlite:////srv/r1.sqlite3, sqlite:////srv/r2.sqlite3'})
+        self.assertEqual(list(replicas), ['replica_1', 'replica_2'])
+        self.assertEqual(replicas['replica_2']['NAME'], '/srv/r2.sqlite3')
+        self.assertEqual(replicas['replica_1']['TEST'], {'MIRROR': 'default'})
+
+    def test_reads_use_replica_until_a_write(self):
+        with patch('accounts.routers._available', return_value=True), \
+                patch.object(connection, 'in_atomic_block', False):
+            self.assertEqual(self.router.db_for_read(Course), 'replica_1')
+            self.assertEqual(self.router.db_for_write(Course), 'default')
+            self.assertEqual(self.router.db_for_read(Course), 'default')
+        self.assertIsNone(self.router.db_for_read(User._meta.get_field('groups').related_model))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'accounts'))
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        with patch('accounts.routers._available', return_value=False), \
+                patch.object(connection, 'in_atomic_block', False):
+            self.assertEqual(self.router.db_for_read(Course), 'default')
+
+    def test_middleware_pins_clients_that_wrote(self):
+        factory = RequestFactory()
+
+        def view(request):
+            if request.method == 'POST':
+                self.router.db_for_write(Course)
+            return HttpResponse(str(pinned_to_primary.get()))
+
+        middleware = ReplicaPinningMiddleware(view)
+        response = middleware(factory.post('/'))
+        self.assertEqual(response.content, b'True')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+        response = middleware(factory.get('/'))
+        self.assertEqual(response.content, b'False')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        request = factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(middleware(request).content, b'True')
+        self.assertFalse(pinned_to_primary.get())
+
+
+# --- Query budgets / N+1 detection ---
+@override_settings(QUERY_BUDGET_CHECKS=True, QUERY_BUDGET_RAISE=True)
+class QueryBudgetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        version_cache.clear()
+        self.user = User.objects.create_user(email='budget@example.com', username='budget', password='pass12345')
+        for i in range(10):
+            Course.objects.create(user=self.user, course_name=f'C{i}', credits=3, letter_grade='A',
+                                  semester_year=f'2024-{i % 3}')
+            KnowledgeBase.objects.create(question=f'What is topic {i}?', answer='An answer.', is_verified=True)
+            save_turn(self.user, 'conv', '', f'question {i}', f'answer {i}')
+        from .transcript import rebuild_for_user
+        rebuild_for_user(self.user.id)
+
+    def test_views_stay_within_budget(self):
+        self.client.force_authenticate(self.user)
+        course = Course.objects.filter(user=self.user).first()
+        for url in ('/api/courses/', f'/api/courses/{course.id}/', '/api/transcript/', '/api/chat/conversations/',
+                    '/api/chat/conversations/conv/messages/', '/api/knowledge/search/?q=topic',
+                    '/api/knowledge/answer/?q=What is topic 1?', '/api/knowledge/similar/?q=topic'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertIn('X-Query-Count', response)
+        self.client.patch(f'/api/courses/{course.id}/', {'letter_grade': 'B', 'semester_year': '2025-1'}, format='json')
+        self.client.post('/api/courses/bulk/', [{'course_name': f'N{i}', 'credits': 3, 'letter_grade': 'B'}
+                                               for i in range(20)], format='json')
+
+    def test_budget_exceeded_raises(self):
+        self.client.force_authenticate(self.user)
+        with patch.dict(CourseViewSet.query_budget, {'list': 0}), self.assertRaises(QueryBudgetExceeded):
+            self.client.get('/api/courses/')
+
+    async def test_async_requests_are_recorded(self):
+        async def view(request):
+            await Course.objects.acount()
+            return HttpResponse()
+
+        middleware = QueryBudgetMiddleware(view)
+        request = AsyncRequestFactory().get('/')
+        request.query_budget = 0
+        with self.assertRaises(QueryBudgetExceeded):
+            await middleware(request)
+
+    def test_streamed_body_counts_against_budget(self):
+        self.user.is_staff = True
+        self.client.force_authenticate(self.user)
+        for url in ('/api/courses/export/', '/api/transcript/export/', '/api/admin/courses/export/'):
+            self.assertTrue(b''.join(self.client.get(url).streaming_content), url)
+        with patch.object(transcript_export, 'query_budget', 0):
+            response = self.client.get('/api/transcript/export/')
+            self.assertNotIn('X-Query-Count', response)
+            with self.assertRaises(QueryBudgetExceeded):
+                b''.join(response.streaming_content)
+
+    def test_admin_changelists_do_not_grow_with_rows(self):
+        admin = User.objects.create_superuser(email='root@example.com', username='root', password='pass12345')
+        self.client.force_login(admin)
+        urls = ('/admin/accounts/course/', '/admin/accounts/chatmessage/', '/admin/accounts/conversation/')
+        before = {}
+        for url in urls:
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            before[url] = len(ctx)
+
+        for i in range(10):
+            other = User.objects.create_user(email=f'u{i}@example.com', username=f'u{i}', password='pass12345')
+            Course.objects.create(user=other, course_name='Extra', credits=3, letter_grade='B')
+            save_turn(other, f'c{i}', '', 'hi', 'hello')
+        for url in urls:
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(url)
+            self.assertEqual(len(ctx), before[url], url)
+
+    def test_recorder_reports_repeated_statements(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            names = [str(course) for course in Course.objects.all()]
+        self.assertEqual(len(names), 10)
+        (sql, count, origins), = recorder.repeated(3)
+        self.assertEqual(count, 10)
+        self.assertIn('accounts_user', sql)
+        self.assertTrue(all('models.py' in origin for origin in origins))
+
+        with assert_max_queries(1):
+            list(Course.objects.select_related('user'))
+        with self.assertRaises(AssertionError), assert_max_queries(1):
+            [str(course) for course in Course.objects.all()]
+
+
+# --- Request metrics (/api/metrics/) ---
+class MetricsTests(APITestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        overrides = override_settings(METRICS_DIR=self.dir, METRICS_FLUSH_SECONDS=3600, METRICS_TOKEN='')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        registry.reset()
+        self.user = User.objects.create_user(email='metrics@example.com', username='metrics', password='pass12345')
+        self.client.force_authenticate(self.user)
+
+    def test_records_route_status_and_queries(self):
+        self.client.get('/api/transcript/')
+        self.client.get('/api/transcript/')
+        self.client.get('/api/no-such-route/')
+        series = collect(self.dir)
+        row = series[('api/transcript/', 'GET', '200')]
+        self.assertEqual(row[COUNT], 2)
+        self.assertGreater(row[QUERIES], 0)
+        self.assertIn(('unmatched', 'GET', '404'), series)
+
+        with override_settings(DEBUG=True):  # no METRICS_TOKEN
+            body = self.client.get('/api/metrics/').content.decode()
+        self.assertIn('thinkora_request_duration_seconds_count{route="api/transcript/",method="GET",status="200"} 2',
+                      body)
+        self.assertIn('le="+Inf"', body)
+
+    def test_sums_live_workers_and_keeps_dead_ones(self):
+        self.client.get('/api/transcript/')
+        key = 'api/transcript/\tGET\t200'
+        with open(os.path.join(self.dir, f'{os.getppid()}.json'), 'w') as f:
+            json.dump({key: collect(self.dir)[('api/transcript/', 'GET', '200')]}, f)
+        dead = os.path.join(self.dir, '999999999.json')
+        row = [0] * ROW_SIZE
+        row[COUNT] = 5
+        with open(dead, 'w') as f:
+            json.dump({key: row}, f)
+        self.assertEqual(collect(self.dir)[('api/transcript/', 'GET', '200')][COUNT], 7)
+        self.assertFalse(os.path.exists(dead))
+        # The retired worker's counts stay in the total.
+        self.assertEqual(collect(self.dir)[('api/transcript/', 'GET', '200')][COUNT], 7)
+
+    def test_token(self):
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+            self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+        with override_settings(DEBUG=False):
+            self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+
+# --- Two-tier shared cache ---
+class TwoTierCacheTests(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp() + '/cache.sqlite3'
+
+    def backend(self, **options):
+        return TwoTierCache(self.path, {'OPTIONS': {'LOCAL_TIMEOUT': 60, **options}})
+
+    def test_workers_share_the_file_tier(self):
+        a, b = self.backend(), self.backend()
+        a.set('k', {'v': 1})
+        self.assertEqual(b.get('k'), {'v': 1})
+        self.assertTrue(a.add('lease', 1, 30))
+        self.assertFalse(b.add('lease', 1, 30))
+        a.set('gone', 1, timeout=-1)
+        self.assertIsNone(b.get('gone'))
+
+    def test_local_tier_is_bounded_by_local_timeout(self):
+        a, b = self.backend(), self.backend(LOCAL_TIMEOUT=0)
+        a.set('k', 1)
+        b.get('k')
+        a.set('k', 2)
+        self.assertEqual(b.get('k'), 2)  # b keeps nothing locally
+        self.assertEqual(a.get('k'), 2)
+
+    def test_single_flight_and_namespace_invalidation(self):
+        calls = []
+        barrier = threading.Barrier(4)
+
+        def compute():
+            calls.append(1)
+            return 'value'
+
+        def worker():
+            barrier.wait()
+            get_or_compute('ns-test', 'key', compute)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        invalidate_namespace('ns-test')
+        self.assertEqual(get_or_compute('ns-test', 'key', compute), 'value')
+        self.assertEqual(len(calls), 2)
+
+
+# --- Bulk transcript import ---
+class CourseBulkImportTests(APITestCase):
+    url = '/api/courses/bulk/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='b@example.com', username='b', password='pass12345')
+        self.client.force_authenticate(self.user)
+
+    def rows(self, n, grade='A'):
+        return [{'course_name': f'C{i}', 'credits': '3', 'letter_grade': grade, 'semester_year': f'Y{i % 8}'}
+                for i in range(n)]
+
+    def test_upsert_with_fixed_query_count(self):
+        self.client.post(self.url, self.rows(5), format='json')
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.post(self.url, self.rows(10), format='json')
+        self.assertEqual((response.data['created'], response.data['updated']), (5, 5))
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(self.url, {'courses': self.rows(500, grade='B')}, format='json')
+        self.assertEqual((response.data['created'], response.data['updated']), (490, 10))
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(Course.objects.filter(user=self.user).count(), 500)
+        self.assertEqual(self.client.get(reverse('transcript')).data['cumulative_gpa'], '4.00')
+
+    def test_csv_body(self):
+        body = 'course_name,credits,letter_grade,semester_year\nMath,3,A,2024/1\nArt,2,C,\n'
+        response = self.client.post(self.url, body, content_type='text/csv')
+        self.assertEqual(response.data['created'], 2)
+        self.assertTrue(Course.objects.filter(course_name='Art', semester_year=None).exists())
+
+    def test_reimport_blank_semester_updates(self):
+        Course.objects.create(user=self.user, course_name='Art', credits=2, letter_grade='C', semester_year='')
+        Course.objects.create(user=self.user, course_name='Math', credits=3, letter_grade='C')
+        rows = [{'course_name': 'Art', 'credits': '2', 'letter_grade': 'A', 'semester_year': None},
+                {'course_name': 'Math', 'credits': '3', 'letter_grade': 'A', 'semester_year': ''}]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 2))
+        self.assertEqual(Course.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(set(Course.objects.values_list('letter_grade', flat=True)), {'A'})
+
+    def test_per_row_errors_write_nothing(self):
+        rows = self.rows(3)
+        rows[1]['credits'] = 'lots'
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['row'] for e in response.data['errors']], [1])
+        self.assertFalse(Course.objects.exists())
+
+
+# --- Streaming exports ---
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='e@example.com', username='e', password='pass12345')
+        other = User.objects.create_user(email='o@example.com', username='o', password='pass12345')
+        Course.objects.create(user=self.user, course_name='Math', credits=3, letter_grade='A', semester_year='2024/1')
+        Course.objects.create(user=other, course_name='Art', credits=2, letter_grade='B')
+
+    def test_csv_and_ndjson(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/courses/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,course_name,credits,letter_grade,semester_year')
+        self.assertEqual(len(lines), 2)
+
+        response = self.client.get('/api/courses/export/?format=ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(rows[0]['course_name'], 'Math')
+        self.assertEqual(rows[0]['credits'], '3.0')
+
+    def test_staff_export_requires_staff(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/admin/courses/export/').status_code, 403)
+        self.user.is_staff = True
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/admin/courses/export/')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 3)
+
+    def test_errors_are_json(self):
+        for url in ('/api/courses/export/', '/api/transcript/export/'):
+            response = self.client.get(url, HTTP_ACCEPT='text/csv')
+            self.assertEqual((response.status_code, response['Content-Type']), (401, 'application/json'))
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/admin/courses/export/?format=ndjson')
+        self.assertEqual((response.status_code, response['Content-Type']), (403, 'application/json'))
+        self.assertIn('detail', response.json())
+        response = self.client.get('/api/courses/export/', HTTP_ACCEPT='application/xml')
+        self.assertEqual((response.status_code, response['Content-Type']), (406, 'application/json'))
+
+
+# --- Knowledge base search ---
+class KnowledgeSearchTests(APITestCase):
+    url = '/api/knowledge/search/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='k@example.com', username='k', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.gpa = KnowledgeBase.objects.create(
+            question='How is my GPA calculated?', answer='Quality points divided by credits.', is_verified=True)
+        self.cgpa = KnowledgeBase.objects.create(
+            question='What is a CGPA?', answer='Your cumulative GPA across semesters.')
+        KnowledgeBase.objects.create(question='Where is the library?', answer='Next to the main gate.')
+
+    def test_ranked_and_verified_filter(self):
+        response = self.client.get(self.url, {'q': 'gpa calculated'})
+        self.assertEqual(response.data['engine'], 'sqlite-fts5')
+        self.assertEqual([r['id'] for r in response.data['results']], [self.gpa.id, self.cgpa.id])
+
+        response = self.client.get(self.url, {'q': 'cumulative', 'verified': 'true'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.cgpa.question = 'What does semester mean?'
+        self.cgpa.answer = 'An academic term.'
+        self.cgpa.save()
+        KnowledgeBase.objects.filter(pk=self.gpa.pk).update(answer='Ask the registrar.')
+        self.assertEqual(self.client.get(self.url, {'q': 'term'}).data['results'][0]['id'], self.cgpa.id)
+        self.assertEqual(self.client.get(self.url, {'q': 'cumulative'}).data['results'], [])
+        self.assertEqual(len(self.client.get(self.url, {'q': 'registrar'}).data['results']), 1)
+
+        self.gpa.delete()
+        self.assertEqual(self.client.get(self.url, {'q': 'registrar'}).data['results'], [])
+
+
+# --- Knowledge base exact answers ---
+class KnowledgeAnswerCacheTests(APITestCase):
+    url = '/api/knowledge/answer/'
+
+    def setUp(self):
+        answer_cache.clear()
+        version_cache.clear()
+        self.user = User.objects.create_user(email='a@example.com', username='a', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.entry = KnowledgeBase.objects.create(
+            question='How do I drop a course?', answer='Use the portal.', is_verified=True)
+
+    def test_normalized_hit_then_cached(self):
+        self.assertEqual(hash_question('  how DO i drop a course '), self.entry.question_hash)
+        first = self.client.get(self.url, {'q': 'how do I drop a course'}).data
+        self.assertEqual((first['found'], first['cached']), (True, False))
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, {'q': 'How do I DROP a course??'}).data
+        self.assertEqual((second['entry']['answer'], second['cached']), ('Use the portal.', True))
+        self.assertEqual(answer_cache.stats()['hits'], 1)
+
+    def test_edit_and_unverify_invalidate(self):
+        self.client.get(self.url, {'q': 'How do I drop a course?'})
+        self.entry.answer = 'Ask your advisor.'
+        self.entry.save()
+        data = self.client.get(self.url, {'q': 'How do I drop a course?'}).data
+        self.assertEqual((data['entry']['answer'], data['cached']), ('Ask your advisor.', False))
+
+        self.entry.is_verified = False
+        self.entry.save()
+        self.assertFalse(self.client.get(self.url, {'q': 'How do I drop a course?'}).data['found'])
+
+    def test_edit_in_another_worker(self):
+        self.client.get(self.url, {'q': 'How do I drop a course?'})
+        # Another worker's save: rows and DataVersion change, but no signal
+        # runs here, so this process keeps its cached answer.
+        KnowledgeBase.objects.filter(pk=self.entry.pk).update(answer='Ask your advisor.')
+        DataVersion.objects.filter(key=KNOWLEDGE_BASE).update(version=F('version') + 1)
+        self.assertEqual(self.client.get(self.url, {'q': 'How do I drop a course?'}).data['cached'], True)
+
+        version_cache.clear()  # KB_VERSION_CACHE_TTL expired
+        data = self.client.get(self.url, {'q': 'How do I drop a course?'}).data
+        self.assertEqual((data['entry']['answer'], data['cached']), ('Ask your advisor.', False))
+
+
+# --- Similar questions ---
+class SimilarQuestionTests(APITestCase):
+    url = '/api/knowledge/similar/'
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings_override = override_settings(KB_VECTOR_DIR=self.tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(email='s@example.com', username='s', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.fee = KnowledgeBase.objects.create(question='When is the school fee deadline?', answer='Friday.')
+        KnowledgeBase.objects.create(question='How do I reset my portal password?', answer='Use the link.')
+
+    def test_incremental_build_and_query(self):
+        self.assertEqual(build_index(), 2)
+        results = self.client.get(self.url, {'q': 'deadline for school fees', 'k': 1}).data['results']
+        self.assertEqual(results[0]['id'], self.fee.id)
+
+        exam = KnowledgeBase.objects.create(question='Where can I see my exam timetable?', answer='Notice board.')
+        self.assertEqual(build_index(), 1)
+        results = self.client.get(self.url, {'q': 'exam timetable', 'k': 1}).data['results']
+        self.assertEqual(results[0]['id'], exam.id)
+
+        exam.delete()
+        ids = [r['id'] for r in self.client.get(self.url, {'q': 'exam timetable'}).data['results']]
+        self.assertNotIn(exam.id, ids)
+        self.assertEqual(build_index(full=True), 2)
+
+    def test_edited_question_is_re_embedded(self):
+        build_index()
+        self.fee.question = 'Where do I collect my ID card?'
+        self.fee.save()
+        self.assertEqual(build_index(), 1)
+        self.assertEqual(build_index(), 0)
+        results = self.client.get(self.url, {'q': 'collect ID card', 'k': 1}).data['results']
+        self.assertEqual(results[0]['id'], self.fee.id)
+        results = self.client.get(self.url, {'q': 'When is the school fee deadline?'}).data['results']
+        self.assertEqual([r['id'] for r in results].count(self.fee.id), 1)
+        self.assertLess([r['score'] for r in results if r['id'] == self.fee.id][0], 0.5)
+
+    def test_replaced_generation_kept_until_the_next(self):
+        build_index()
+        build_index(full=True)
+        names = set(os.listdir(self.tmp.name))
+        self.assertTrue({'vectors.1.f32', 'vectors.2.f32'} <= names)
+        build_index(full=True)
+        names = set(os.listdir(self.tmp.name))
+        self.assertNotIn('ids.1.i64', names)
+        self.assertTrue({'vectors.2.f32', 'vectors.3.f32', 'hashes.3.i64'} <= names)
+
+
+# --- Chat history ---
+class ChatHistoryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='h@example.com', username='h', password='pass12345')
+        self.client.force_authenticate(self.user)
+        ChatMessage.objects.bulk_create([
+            ChatMessage(user=self.user, conversation_id='c1', role='user' if i % 2 == 0 else 'ai', content=f'm{i}')
+            for i in range(25)
+        ])
+        ChatMessage.objects.create(user=self.user, conversation_id='c2', role='user', content='other')
+
+    def test_pages_backwards_from_newest(self):
+        url = '/api/chat/conversations/c1/messages/?limit=10'
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([m['content'] for m in response.data['results']])
+            url = response.data['next']
+        self.assertEqual(pages[0], [f'm{i}' for i in range(15, 25)])
+        self.assertEqual(pages[-1], [f'm{i}' for i in range(5)])
+        self.assertEqual(sum(len(p) for p in pages), 25)
+
+    def test_bad_cursor(self):
+        response = self.client.get('/api/chat/conversations/c1/messages/?before=nope')
+        self.assertEqual(response.status_code, 400)
+
+    def test_last_page_uses_composite_index(self):
+        plan = ChatMessage.objects.filter(user=self.user, conversation_id='c1').order_by('-created_at', '-id')[:50].explain()
+        self.assertIn('chat_user_conv_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+# --- Conversation list ---
+class ConversationListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='cl@example.com', username='cl', password='pass12345')
+        self.client.force_authenticate(self.user)
+
+    def test_counts_and_preview_track_inserts(self):
+        save_turn(self.user, 'a', 'general', 'first question', 'first answer')
+        save_turn(self.user, 'b', 'general', 'other question', 'other answer')
+        save_turn(self.user, 'a', 'general', 'second question', 'second answer')
+        ChatMessage.objects.create(user=self.user, conversation_id='c', role='user', content='single')
+
+        response = self.client.get('/api/chat/conversations/?limit=2')
+        self.assertEqual(response.status_code, 200)
+        first = response.data['results']
+        self.assertEqual([c['conversation_id'] for c in first], ['c', 'a'])
+        self.assertEqual(first[1]['message_count'], 4)
+        self.assertEqual(first[1]['title'], 'first question')
+        self.assertEqual(first[1]['last_message_preview'], 'second answer')
+        rest = self.client.get(response.data['next']).data
+        self.assertEqual([c['conversation_id'] for c in rest['results']], ['b'])
+        self.assertIsNone(rest['next'])
+
+    def test_backfill_matches_incremental(self):
+        save_turn(self.user, 'a', 'general', 'q1', 'a1')
+        save_turn(self.user, 'a', 'general', 'q2', 'a2')
+        expected = list(Conversation.objects.values('conversation_id', 'title', 'message_count',
+                                                    'last_message_preview', 'last_role'))
+        Conversation.objects.all().delete()
+        call_command('backfill_conversations', stdout=StringIO())
+        self.assertEqual(list(Conversation.objects.values('conversation_id', 'title', 'message_count',
+                                                          'last_message_preview', 'last_role')), expected)
+
+    def test_list_is_an_index_scan(self):
+        plan = Conversation.objects.filter(user=self.user).order_by('-last_activity', '-id')[:50].explain()
+        self.assertIn('conversation_user_activity_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+# --- Chat archive (cold storage) ---
+class ChatArchiveTests(APITestCase):
+    def setUp(self):
+        archive_cache.clear()
+        self.user = User.objects.create_user(email='ar@example.com', username='ar', password='pass12345')
+        self.client.force_authenticate(self.user)
+        ChatMessage.objects.bulk_create([
+            ChatMessage(user=self.user, conversation_id='old', role='user' if i % 2 == 0 else 'ai',
+                        content=f'message number {i} ' * 20)
+            for i in range(25)
+        ])
+        ChatMessage.objects.update(created_at=timezone.now() - timedelta(days=100))
+        save_turn(self.user, 'fresh', 'general', 'hello', 'hi')
+
+    def walk(self, conversation_id):
+        url = f'/api/chat/conversations/{conversation_id}/messages/?limit=10'
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([(m['id'], m['content']) for m in response.data['results']])
+            url = response.data['next']
+        return pages
+
+    def test_compaction_is_transparent_to_history(self):
+        before = self.walk('old')
+        out = StringIO()
+        call_command('compact_chat', days=30, codec='lzma', stdout=out)
+        self.assertIn('bytes reclaimed', out.getvalue())
+        self.assertFalse(ChatMessage.objects.filter(conversation_id='old').exists())
+        self.assertTrue(ChatMessage.objects.filter(conversation_id='fresh').exists())
+        archive = ConversationArchive.objects.get()
+        self.assertEqual(archive.message_count, 25)
+        self.assertLess(len(archive.data), archive.raw_bytes)
+        self.assertEqual(self.walk('old'), before)
+
+    def test_resumed_conversation_pages_across_hot_and_archive(self):
+        call_command('compact_chat', days=30, stdout=StringIO())
+        save_turn(self.user, 'old', 'general', 'back again', 'welcome back')
+        pages = self.walk('old')
+        self.assertEqual(pages[0][-2:], [(pages[0][-2][0], 'back again'), (pages[0][-1][0], 'welcome back')])
+        flat = [m for page in reversed(pages) for m in page]
+        self.assertEqual(len(flat), 27)
+        self.assertEqual(len({pk for pk, _ in flat}), 27)
+
+        # Compacting again merges the new rows into the same archive.
+        ChatMessage.objects.filter(conversation_id='old').update(created_at=timezone.now() - timedelta(days=40))
+        call_command('compact_chat', days=30, stdout=StringIO())
+        self.assertEqual(ConversationArchive.objects.get().message_count, 27)
+        self.assertEqual(len([m for page in self.walk('old') for m in page]), 27)
+
+    def test_backfill_after_compaction_counts_archived_messages(self):
+        other = User.objects.create_user(email='ar2@example.com', username='ar2', password='pass12345')
+        save_turn(other, 'idle', 'general', 'only question', 'only answer')
+        ChatMessage.objects.filter(user=other).update(created_at=timezone.now() - timedelta(days=100))
+        save_turn(self.user, 'old', 'general', 'back again', 'welcome back')
+        ChatMessage.objects.filter(conversation_id='old').update(created_at=timezone.now() - timedelta(days=100))
+        call_command('compact_chat', days=30, stdout=StringIO())
+        save_turn(self.user, 'old', 'general', 'resumed', 'indeed')
+
+        call_command('backfill_conversations', stdout=StringIO())
+        rebuilt = {(c.user_id, c.conversation_id): (c.message_count, c.title[:16], c.last_message_preview)
+                   for c in Conversation.objects.all()}
+        self.assertEqual(rebuilt[(self.user.id, 'old')], (29, 'message number 0', 'indeed'))
+        self.assertEqual(rebuilt[(self.user.id, 'fresh')], (2, 'hello', 'hi'))
+        archive = ConversationArchive.objects.get(user=other)
+        self.assertEqual(Conversation.objects.get(user=other).last_activity, archive.last_created_at)
+        self.assertEqual(rebuilt[(other.id, 'idle')], (2, 'only question', 'only answer'))
+
+    def test_decompressed_archive_is_cached(self):
+        call_command('compact_chat', days=30, stdout=StringIO())
+        self.client.get('/api/chat/conversations/old/messages/')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/chat/conversations/old/messages/')
+        self.assertFalse(any('"data"' in q['sql'] for q in ctx.captured_queries))
+
+
+# --- Replica routing against a second SQLite connection ---
+# TransactionTestCase: replica_1 is a separate connection to the test
+# database, so it only sees committed rows.
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaDatabaseTests(APITransactionTestCase):
+    databases = {'default', 'replica_1'}
+
+    def setUp(self):
+        cache.clear()  # ids restart after each flush; drop responses cached for an earlier user 1
+        for name in ('_healthy_until', '_down_until'):
+            patcher = patch.dict(f'accounts.routers.{name}', clear=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(email='r@example.com', username='r', password='pass12345')
+        Course.objects.create(user=self.user, course_name='Math', credits=3, letter_grade='A')
+        token = pinned_to_primary.set(False)
+        self.addCleanup(pinned_to_primary.reset, token)
+
+    def capture(self):
+        return CaptureQueriesContext(connections['default']), CaptureQueriesContext(connections['replica_1'])
+
+    def test_reads_go_to_the_replica(self):
+        self.client.force_authenticate(self.user)
+        primary, replica = self.capture()
+        with primary, replica:
+            response = self.client.get('/api/courses/')
+        self.assertEqual([c['course_name'] for c in response.data['results']], ['Math'])
+        self.assertTrue(any('"accounts_course"' in q['sql'] for q in replica.captured_queries))
+        self.assertEqual(len(primary), 0)
+
+    def test_write_pins_the_rest_of_the_request(self):
+        def view(request):
+            list(Course.objects.all())
+            Course.objects.create(user=self.user, course_name='Art', credits=2, letter_grade='B')
+            return HttpResponse(str(Course.objects.count()))
+
+        primary, replica = self.capture()
+        with primary, replica:
+            response = ReplicaPinningMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(response.content, b'2')
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual([q['sql'].split()[0] for q in replica.captured_queries], ['SELECT'])
+        primary_sql = [q['sql'] for q in primary.captured_queries]
+        self.assertTrue(primary_sql[-1].startswith('SELECT COUNT(*)'))
+        self.assertTrue(any(sql.startswith('INSERT INTO "accounts_course"') for sql in primary_sql))
+
+    def test_replica_health_check_is_cached(self):
+        replica = connections['replica_1']
+        router = PrimaryReplicaRouter()
+        with patch.object(replica, 'ensure_connection', wraps=replica.ensure_connection) as ensure:
+            self.assertEqual([router.db_for_read(Course) for _ in range(3)], ['replica_1'] * 3)
+        self.assertEqual(ensure.call_count, 1)
+
+
+# --- Cached JWT user resolution ---
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()  # the query counts below need a cold transcript cache
+        user_cache.clear()
+        self.user = User.objects.create_user(email='jwt@example.com', username='jwt', password='pass12345')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_user_query_only_on_first_request(self):
+        with self.assertNumQueries(3):  # user + ETag version + transcript rows
+            self.assertEqual(self.client.get('/api/transcript/').status_code, 200)
+        with self.assertNumQueries(1):  # ETag version; response data comes from the shared cache
+            self.assertEqual(self.client.get('/api/transcript/').status_code, 200)
+
+    def test_deactivation_takes_effect_immediately(self):
+        self.assertEqual(self.client.get('/api/courses/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/courses/').status_code, 401)
+
+    def test_deactivation_in_another_worker(self):
+        self.assertEqual(self.client.get('/api/courses/').status_code, 200)
+        # Another process deactivates the user: only the shared cache sees the bump.
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        with patch.object(user_cache, 'delete'):
+            invalidate_user(self.user.id)
+        self.assertIsNotNone(user_cache.get(str(self.user.id)))
+        self.assertEqual(self.client.get('/api/courses/').status_code, 401)
+
+    def test_inactive_cached_user_is_rejected(self):
+        self.assertEqual(self.client.get('/api/courses/').status_code, 200)
+        _, user = user_cache.get(str(self.user.id))
+        user.is_active = False
+        self.assertEqual(self.client.get('/api/courses/').status_code, 401)
+
+    @override_settings(JWT_CLAIMS_ONLY_READS=True)
+    def test_claims_only_reads_skip_the_lookup(self):
+        with self.assertNumQueries(2):  # ETag version + transcript rows
+            response = self.client.get('/api/transcript/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_cache.stats()['size'], 0)
+
+    @override_settings(JWT_CLAIMS_ONLY_READS=True, CHAT_WRITE_BEHIND=True)
+    def test_claims_only_reads_see_queued_messages(self):
+        buffer = ChatWriteBuffer(max_batch=100, autostart=False)
+        with patch('accounts.chat_buffer.chat_buffer', buffer):
+            save_turn(self.user, 'c1', 'general', 'hello', 'hi there')
+            response = self.client.get('/api/chat/conversations/c1/messages/')
+        self.assertEqual([m['content'] for m in response.data['results']], ['hello', 'hi there'])
+        self.assertEqual(len(buffer), 0)
+
+
+# --- Streaming chat (SSE) ---
+class ChatStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='sse@example.com', username='sse', password='pass12345')
+        self.auth = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    async def test_streams_tokens_then_persists_turn(self):
+        response = await self.async_client.post(
+            '/api/chat/stream/', {'message': 'what is a credit unit', 'conversation_id': 'c9'},
+            content_type='application/json', headers=self.auth)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+
+        events = [block.split('\n') for block in body.strip().split('\n\n')]
+        tokens = [json.loads(e[1][len('data: '):])['token'] for e in events if e[0] == 'event: token']
+        self.assertEqual(events[-1][0], 'event: done')
+        self.assertEqual(''.join(tokens), 'You asked (general): what is a credit unit')
+
+        stored = [(m.role, m.content) async for m in ChatMessage.objects.filter(conversation_id='c9').order_by('id')]
+        self.assertEqual(stored, [('user', 'what is a credit unit'), ('ai', ''.join(tokens))])
+
+    async def test_disconnect_keeps_partial_reply(self):
+        request = AsyncRequestFactory().post(
+            '/api/chat/stream/', {'message': 'what is a credit unit', 'conversation_id': 'c10'},
+            content_type='application/json', headers=self.auth)
+        events = (await chat_stream(request))._iterator  # the view's generator, without middleware wrappers
+        first = json.loads((await anext(events)).split('data: ')[1])['token']
+        await events.aclose()  # GeneratorExit at the yield, as when the client disconnects
+
+        stored = [(m.role, m.content) async for m in ChatMessage.objects.filter(conversation_id='c10').order_by('id')]
+        self.assertEqual(stored, [('user', 'what is a credit unit'), ('ai', first)])
+
+    @override_settings(CHAT_WRITE_BEHIND=True)
+    async def test_done_omits_id_of_queued_reply(self):
+        buffer = ChatWriteBuffer(max_batch=100, autostart=False)
+        with patch('accounts.chat_buffer.chat_buffer', buffer):
+            response = await self.async_client.post(
+                '/api/chat/stream/', {'message': 'hi', 'conversation_id': 'c11'},
+                content_type='application/json', headers=self.auth)
+            body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        done = json.loads(body.strip().split('\n\n')[-1].split('data: ')[1])
+        self.assertEqual(done, {'conversation_id': 'c11'})
+        self.assertEqual(len(buffer), 2)
+
+    async def test_requires_token(self):
+        response = await self.async_client.post('/api/chat/stream/', {'message': 'hi'}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+
+# --- Async register/login (password hashing pool) ---
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AsyncAuthTests(TestCase):
+    async def test_register_then_login(self):
+        response = await self.async_client.post(
+            '/api/register/async/', {'email': 'a@example.com', 'username': 'a', 'password': 'pass12345'},
+            content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        response = await self.async_client.post(
+            '/api/login/async/', {'email': 'a@example.com', 'password': 'pass12345'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+        response = await self.async_client.post(
+            '/api/login/async/', {'email': 'a@example.com', 'password': 'wrong'}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_duplicate_registration_fails(self):
+        await User.objects.acreate(email='dup@example.com', username='dup')
+        response = await self.async_client.post(
+            '/api/register/async/', {'email': 'dup@example.com', 'username': 'dup2', 'password': 'pass12345'},
+            content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_saturated_pool_returns_429(self):
+        pool, release = HashingPool(workers=1, queue=0), threading.Event()
+        busy = pool.submit(release.wait)
+        try:
+            with patch('accounts.async_views.hashing_pool', pool):
+                response = await self.async_client.post(
+                    '/api/register/async/', {'email': 'b@example.com', 'username': 'b', 'password': 'pass12345'},
+                    content_type='application/json')
+        finally:
+            release.set()
+            busy.result()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(await User.objects.filter(email='b@example.com').aexists())
+
+
+# --- Chat write-behind buffer ---
+class ChatWriteBufferTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='wb@example.com', username='wb', password='pass12345')
+        self.client.force_authenticate(self.user)
+
+    def message(self, conversation_id, content):
+        return ChatMessage(user=self.user, conversation_id=conversation_id, role='user', content=content)
+
+    def test_flushes_on_size_in_one_insert(self):
+        buffer = ChatWriteBuffer(max_batch=3, autostart=False)
+        buffer.add([self.message('c', 'a'), self.message('c', 'b')])
+        self.assertEqual(ChatMessage.objects.count(), 0)
+        with CaptureQueriesContext(connection) as ctx:
+            buffer.add([self.message('c', 'c')])
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "accounts_chatmessage"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(list(ChatMessage.objects.values_list('content', flat=True)), ['a', 'b', 'c'])
+        self.assertEqual(len(buffer), 0)
+
+    def test_history_reads_its_own_writes(self):
+        buffer = ChatWriteBuffer(max_batch=100, autostart=False)
+        with patch('accounts.chat_buffer.chat_buffer', buffer), override_settings(CHAT_WRITE_BEHIND=True):
+            save_turn(self.user, 'c1', 'general', 'hello', 'hi there')
+            self.assertEqual(len(buffer), 2)
+            response = self.client.get('/api/chat/conversations/c1/messages/')
+        self.assertEqual([m['content'] for m in response.data['results']], ['hello', 'hi there'])
+        self.assertEqual(len(buffer), 0)
+
+    @override_settings(CHAT_WRITE_BEHIND=True)
+    def test_history_waits_for_another_workers_queue(self):
+        writer, reader = (ChatWriteBuffer(max_batch=100, autostart=False) for _ in range(2))
+        with patch('accounts.chat_buffer.chat_buffer', writer):
+            save_turn(self.user, 'c1', 'general', 'hello', 'hi there')
+        self.assertEqual(cache.get(pending_key(self.user.id))[0], writer.token)
+
+        # The reading worker has nothing queued; the writer flushes while it waits.
+        with patch('accounts.chat_buffer.chat_buffer', reader), \
+                patch('accounts.chat_buffer.time.sleep', side_effect=lambda _: writer.flush()) as sleep:
+            response = self.client.get('/api/chat/conversations/c1/messages/')
+        self.assertTrue(sleep.called)
+        self.assertEqual([m['content'] for m in response.data['results']], ['hello', 'hi there'])
+        self.assertIsNone(cache.get(pending_key(self.user.id)))
+
+        # A marker past its deadline (the writer died) does not block reads.
+        cache.set(pending_key(self.user.id), ('gone', time.time() - 1))
+        with patch('accounts.chat_buffer.chat_buffer', reader), patch('accounts.chat_buffer.time.sleep') as sleep:
+            self.assertEqual(self.client.get('/api/chat/conversations/c1/messages/').status_code, 200)
+        self.assertFalse(sleep.called)
+
+    def test_bad_row_is_dead_lettered_not_retried(self):
+        buffer = ChatWriteBuffer(max_batch=100, autostart=False)
+        buffer.add([self.message('c', 'a'), self.message('c', None), self.message('c', 'b')])
+        with self.assertLogs('accounts.chat_buffer', 'ERROR'):
+            self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(list(ChatMessage.objects.values_list('content', flat=True)), ['a', 'b'])
+        self.assertEqual((len(buffer), len(buffer.dead_letters)), (0, 1))
+
+    def test_database_errors_requeue_a_bounded_number_of_times(self):
+        buffer = ChatWriteBuffer(max_batch=100, autostart=False, max_attempts=2)
+        buffer.add([self.message('c', 'a')])
+        with patch.object(buffer, '_write', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('accounts.chat_buffer', 'WARNING'):
+            self.assertEqual(buffer.flush(), 0)
+            self.assertEqual(len(buffer), 1)
+            with patch('accounts.chat_buffer.chat_buffer', buffer):
+                flush_pending(self.user.id, 'c')  # second attempt; reads never raise
+            self.assertEqual((len(buffer), len(buffer.dead_letters)), (0, 1))
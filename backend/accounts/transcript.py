@@ -0,0 +1,109 @@
+"""Incremental maintenance of TranscriptSummary rows.
+
+Every Course write is turned into a (semester, credits, quality points) delta
+that is applied to the matching semester row, after which the per-semester and
+cumulative GPAs are recomputed from the user's semester rows only. Reading a
+transcript is therefore O(semesters), never O(courses).
+
+Semesters are ordered chronologically for the cumulative GPA, by the stored
+``semester_key`` (see ``accounts.models.semester_sort_key``); courses without
+a semester are grouped under ``''`` and come first.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .gpa import GRADE_POINTS
+from .models import Course, TranscriptSummary, semester_sort_key
+
+_TWO_PLACES = Decimal('0.01')
+
+
+def course_contribution(course):
+    """Return ``(semester, credits, quality_points)`` for one course.
+
+    Courses with an unknown grade still count towards ``course_count`` but
+    contribute no credits, matching the GPA engine.
+    """
+    semester = course.semester_year or ''
+    grade_point = GRADE_POINTS.get((course.letter_grade or '').upper().strip())
+    if grade_point is None:
+        return semester, Decimal('0'), Decimal('0')
+    credits = Decimal(str(course.credits))
+    return semester, credits, credits * Decimal(str(grade_point))
+
+
+def _gpa(points, credits):
+    if not credits:
+        return None
+    return (points / credits).quantize(_TWO_PLACES)
+
+
+def refresh_gpas(user_id):
+    """Recompute semester and cumulative GPAs from the stored semester rows."""
+    TranscriptSummary.objects.filter(user_id=user_id, course_count__lte=0).delete()
+    rows = list(TranscriptSummary.objects.filter(user_id=user_id).order_by('semester_key'))
+    running_credits = Decimal('0')
+    running_points = Decimal('0')
+    now = timezone.now()
+    for row in rows:
+        running_credits += row.total_credits
+        running_points += row.quality_points
+        row.semester_gpa = _gpa(row.quality_points, row.total_credits)
+        row.cumulative_gpa = _gpa(running_points, running_credits)
+        row.updated_at = now
+    TranscriptSummary.objects.bulk_update(rows, ['semester_gpa', 'cumulative_gpa', 'updated_at'])
+    return rows
+
+
+def apply_course_change(user_id, old=None, new=None):
+    """Apply one Course write. ``old``/``new`` are course instances (or None)."""
+    deltas = {}
+    for course, sign in ((old, -1), (new, 1)):
+        if course is None:
+            continue
+        semester, credits, points = course_contribution(course)
+        count, total, quality = deltas.get(semester, (0, Decimal('0'), Decimal('0')))
+        deltas[semester] = (count + sign, total + sign * credits, quality + sign * points)
+
+    with transaction.atomic():
+        for semester, (count, credits, points) in deltas.items():
+            if not count and not credits and not points:
+                continue
+            TranscriptSummary.objects.get_or_create(
+                user_id=user_id, semester_year=semester, defaults={'semester_key': semester_sort_key(semester)})
+            TranscriptSummary.objects.filter(user_id=user_id, semester_year=semester).update(
+                course_count=F('course_count') + count,
+                total_credits=F('total_credits') + credits,
+                quality_points=F('quality_points') + points,
+            )
+        return refresh_gpas(user_id)
+
+
+def rebuild_for_user(user_id):
+    """Recompute a user's transcript from their Course rows (one aggregate per grade)."""
+    per_semester = {}
+    aggregates = (
+        Course.objects.filter(user_id=user_id)
+        .values('semester_year', 'letter_grade')
+        .annotate(n=Count('id'), credits=Sum('credits'))
+        .order_by()
+    )
+    for agg in aggregates:
+        semester = agg['semester_year'] or ''
+        grade_point = GRADE_POINTS.get((agg['letter_grade'] or '').upper().strip())
+        credits = Decimal(str(agg['credits'] or 0)) if grade_point is not None else Decimal('0')
+        points = credits * Decimal(str(grade_point or 0))
+        count, total, quality = per_semester.get(semester, (0, Decimal('0'), Decimal('0')))
+        per_semester[semester] = (count + agg['n'], total + credits, quality + points)
+
+    with transaction.atomic():
+        TranscriptSummary.objects.filter(user_id=user_id).delete()
+        TranscriptSummary.objects.bulk_create([
+            TranscriptSummary(user_id=user_id, semester_year=semester, semester_key=semester_sort_key(semester),
+                              course_count=count, total_credits=credits, quality_points=points)
+            for semester, (count, credits, points) in per_semester.items()
+        ])
+        return refresh_gpas(user_id)
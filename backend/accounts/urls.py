@@ -4,8 +4,19 @@ from .views import (
     UserRegistrationView,
     CourseViewSet,
     calculate_gpa_endpoint, # Keep this!
-    health_check
+    transcript_view,
+    transcript_export,
+    admin_course_export,
+    knowledge_search,
+    conversation_list,
+    chat_history,
+    knowledge_answer,
+    knowledge_similar,
+    knowledge_cache_stats,
+    health_check,
+    metrics_view,
 )
+from .async_views import chat_stream, login as async_login, register as async_register
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -19,12 +30,25 @@ urlpatterns = [
     path('register/', UserRegistrationView.as_view(), name='register'),
     path('login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('register/async/', async_register, name='register_async'),
+    path('login/async/', async_login, name='login_async'),
 
     # Tools & Logic
     path('calculate-gpa/', calculate_gpa_endpoint, name='calculate_gpa'),
+    path('transcript/', transcript_view, name='transcript'),
+    path('transcript/export/', transcript_export, name='transcript_export'),
+    path('admin/courses/export/', admin_course_export, name='admin_course_export'),
+    path('chat/stream/', chat_stream, name='chat_stream'),
+    path('chat/conversations/', conversation_list, name='conversation_list'),
+    path('chat/conversations/<str:conversation_id>/messages/', chat_history, name='chat_history'),
+    path('knowledge/search/', knowledge_search, name='knowledge_search'),
+    path('knowledge/answer/', knowledge_answer, name='knowledge_answer'),
+    path('knowledge/similar/', knowledge_similar, name='knowledge_similar'),
+    path('knowledge/cache-stats/', knowledge_cache_stats, name='knowledge_cache_stats'),
 
     # Maintenance & Health
     path('health/', health_check, name='health_check'),
+    path('metrics/', metrics_view, name='metrics'),
 
     # Viewsets
     path('', include(router.urls)),
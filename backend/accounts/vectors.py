@@ -0,0 +1,255 @@
+"""Similar-question retrieval over KnowledgeBase with hashed n-gram vectors.
+
+Each question is embedded offline on CPU (no model download): word unigrams
+and character trigrams of ``normalize_question(text)`` are hashed into
+``KB_VECTOR_DIM`` signed buckets, weighted with ``1 + log(tf)`` and
+L2-normalized, so a dot product is the cosine similarity.
+
+The index lives in ``KB_VECTOR_DIR`` as four files:
+
+* ``vectors.<gen>.f32`` - raw float32 rows, row-major
+* ``ids.<gen>.i64``     - the KnowledgeBase id of each row (-1: superseded)
+* ``hashes.<gen>.i64``  - the ``question_hash`` each row was embedded from
+* ``meta.json``         - ``{"dim", "count", "generation"}``; readers only
+  trust ``count`` rows, so an append is published by rewriting this file last.
+  A full rebuild writes a new generation and never truncates mapped files.
+
+Workers open the files with ``np.memmap`` so every gunicorn process shares the
+same page cache. ``build_index()`` appends vectors for entries newer than the
+last indexed id and for entries whose question changed since it was embedded;
+the old row of an edited entry is then marked -1 in place. ``full=True``
+rewrites everything (worth it after many edits or deletes - deleted ids are
+filtered at query time). A replaced generation is kept until the next one
+replaces it, so a worker that read the old meta.json can still open its files.
+"""
+import itertools
+import json
+import math
+import os
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .models import KnowledgeBase, normalize_question
+from .versions import KNOWLEDGE_BASE, bump_version
+
+BUILD_CHUNK_SIZE = 2000
+# Written over the id of a row whose entry was re-embedded further down.
+_SUPERSEDED = np.int64(-1).tobytes()
+
+
+def vector_dim():
+    return getattr(settings, 'KB_VECTOR_DIM', 512)
+
+
+def index_dir():
+    return Path(getattr(settings, 'KB_VECTOR_DIR', Path(settings.BASE_DIR) / 'var' / 'kb_vectors'))
+
+
+def _features(text):
+    normalized = normalize_question(text)
+    features = Counter(f'w:{word}' for word in normalized.split())
+    padded = f' {normalized} '
+    features.update(f'c:{padded[i:i + 3]}' for i in range(len(padded) - 2))
+    return features
+
+
+def embed(texts, dim=None):
+    """Embed ``texts`` into an ``(n, dim)`` float32 array of unit vectors."""
+    dim = dim or vector_dim()
+    rows, cols, values = [], [], []
+    for row, text in enumerate(texts):
+        for feature, count in _features(text).items():
+            h = zlib.crc32(feature.encode('utf-8'))
+            rows.append(row)
+            cols.append(h % dim)
+            values.append((1.0 if h & 0x80000000 else -1.0) * (1.0 + math.log(count)))
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    np.add.at(matrix, (rows, cols), values)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def _read_meta(path):
+    try:
+        return json.loads((path / 'meta.json').read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_meta(path, meta):
+    tmp = path / 'meta.json.tmp'
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, path / 'meta.json')
+
+
+def _files(path, generation):
+    return path / f'vectors.{generation}.f32', path / f'ids.{generation}.i64', path / f'hashes.{generation}.i64'
+
+
+def _digest(question_hash):
+    """The leading 60 bits of ``question_hash`` as an int64 (0 if unset)."""
+    return int(question_hash[:15], 16) if question_hash else 0
+
+
+def build_index(full=False, path=None):
+    """Embed new and edited (or, with ``full``, all) KnowledgeBase entries. Returns rows written."""
+    path = Path(path or index_dir())
+    path.mkdir(parents=True, exist_ok=True)
+    dim = vector_dim()
+    meta = _read_meta(path)
+    # Indexes from before hashes.<gen>.i64 existed cannot spot edits: rebuild.
+    if full or meta is None or meta['dim'] != dim or not _files(path, meta['generation'])[2].exists():
+        previous = meta['generation'] if meta else 0
+        meta = {'dim': dim, 'count': 0, 'generation': previous + 1}
+        last_id, mode, stale = 0, 'wb', {}
+    else:
+        mode = 'ab'
+        vec_path, id_path, hash_path = _files(path, meta['generation'])
+        ids = np.fromfile(id_path, dtype=np.int64, count=meta['count'])
+        hashes = np.fromfile(hash_path, dtype=np.int64, count=meta['count'])
+        last_id = int(ids.max()) if meta['count'] else 0
+        # Drop any bytes past the published count (an interrupted append).
+        os.truncate(vec_path, meta['count'] * dim * 4)
+        os.truncate(id_path, meta['count'] * 8)
+        os.truncate(hash_path, meta['count'] * 8)
+        stale = _stale_rows(ids, hashes, last_id)
+
+    changed = sorted(stale)
+    entries = itertools.chain(
+        *(
+            KnowledgeBase.objects.filter(id__in=changed[i:i + BUILD_CHUNK_SIZE]).order_by('id')
+            .values_list('id', 'question', 'question_hash')
+            for i in range(0, len(changed), BUILD_CHUNK_SIZE)
+        ),
+        KnowledgeBase.objects.filter(id__gt=last_id).order_by('id')
+        .values_list('id', 'question', 'question_hash').iterator(chunk_size=BUILD_CHUNK_SIZE),
+    )
+    added = 0
+    vec_path, id_path, hash_path = _files(path, meta['generation'])
+    with open(vec_path, mode) as vec_file, open(id_path, mode) as id_file, open(hash_path, mode) as hash_file:
+        files = (vec_file, id_file, hash_file)
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) == BUILD_CHUNK_SIZE:
+                added += _append(batch, dim, files)
+                batch = []
+        if batch:
+            added += _append(batch, dim, files)
+        for f in files:
+            f.flush()
+            os.fsync(f.fileno())
+    meta['count'] += added
+    _write_meta(path, meta)
+
+    # The edited entries' new rows are published; retire their old ones.
+    if stale:
+        with open(id_path, 'r+b') as id_file:
+            for position in stale.values():
+                id_file.seek(position * 8)
+                id_file.write(_SUPERSEDED)
+            id_file.flush()
+            os.fsync(id_file.fileno())
+    # Similar-question results may change; invalidates knowledge-base ETags.
+    bump_version(KNOWLEDGE_BASE)
+    _remove_old_generations(path, meta['generation'])
+    return added
+
+
+def _stale_rows(ids, hashes, last_id):
+    """``{id: row}`` for indexed entries whose ``question_hash`` has changed."""
+    indexed = {int(pk): row for row, pk in enumerate(ids) if pk >= 0}
+    stale = {}
+    current = (
+        KnowledgeBase.objects.filter(id__lte=last_id).order_by('id')
+        .values_list('id', 'question_hash').iterator(chunk_size=BUILD_CHUNK_SIZE)
+    )
+    for pk, question_hash in current:
+        row = indexed.get(pk)
+        if row is not None and hashes[row] != _digest(question_hash):
+            stale[pk] = row
+    return stale
+
+
+def _remove_old_generations(path, generation):
+    # The generation just replaced stays: workers that read the old meta.json
+    # may still be about to map it. Anything older is unused by now.
+    for file in path.iterdir():
+        parts = file.name.split('.')
+        if len(parts) == 3 and parts[1].isdigit() and int(parts[1]) < generation - 1:
+            file.unlink(missing_ok=True)
+
+
+def _append(batch, dim, files):
+    vec_file, id_file, hash_file = files
+    embed([question for _, question, _ in batch], dim).tofile(vec_file)
+    np.asarray([pk for pk, _, _ in batch], dtype=np.int64).tofile(id_file)
+    np.asarray([_digest(h) for _, _, h in batch], dtype=np.int64).tofile(hash_file)
+    return len(batch)
+
+
+class VectorIndex:
+    """Read side: memory-maps the index and reloads it when meta.json changes."""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._vectors = None
+        self._ids = None
+
+    def _load(self):
+        path = self.path or index_dir()
+        try:
+            stat = os.stat(path / 'meta.json')
+        except FileNotFoundError:
+            return None, None
+        stamp = (str(path), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            with self._lock:
+                meta = _read_meta(path)
+                if not meta or not meta['count']:
+                    self._vectors, self._ids = None, None
+                else:
+                    vec_path, id_path, _ = _files(path, meta['generation'])
+                    self._vectors = np.memmap(vec_path, dtype=np.float32, mode='r',
+                                              shape=(meta['count'], meta['dim']))
+                    self._ids = np.memmap(id_path, dtype=np.int64, mode='r', shape=(meta['count'],))
+                self._stamp = stamp
+        return self._vectors, self._ids
+
+    def query(self, text, k=5):
+        """Return ``[(knowledge_base_id, cosine), ...]`` best first."""
+        vectors, ids = self._load()
+        if vectors is None:
+            return []
+        scores = vectors @ embed([text], vectors.shape[1])[0]
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+vector_index = VectorIndex()
+
+
+def similar_questions(text, k=5, verified_only=False):
+    """Return ``[(KnowledgeBase, score), ...]`` for the ``k`` nearest stored questions."""
+    # Over-fetch so deleted / unverified rows can be dropped and still fill k.
+    candidates = vector_index.query(text, k * 2 + 10)
+    queryset = KnowledgeBase.objects.all()
+    if verified_only:
+        queryset = queryset.filter(is_verified=True)
+    entries = queryset.in_bulk([pk for pk, _ in candidates])
+    results, seen = [], set()
+    for pk, score in candidates:
+        if pk in entries and pk not in seen:
+            seen.add(pk)
+            results.append((entries[pk], score))
+    return results[:k]
@@ -0,0 +1,115 @@
+"""Version counters and conditional GET (ETag / Last-Modified) for read views.
+
+Writers call :func:`bump_version` for the data they touched (the Course and
+KnowledgeBase signals, the bulk paths). Read views wrapped with
+:func:`conditional_view` read one DataVersion row, and when the client's
+``If-None-Match`` / ``If-Modified-Since`` still matches they return 304 before
+any queryset or serializer runs. With ``cache_timeout`` the response data is
+also kept in the shared cache under the same version, so other clients (and
+other workers) skip the queryset too.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .caching import get_or_compute, invalidate_namespace
+from .kb_cache import LRUCache
+from .models import DataVersion
+
+KNOWLEDGE_BASE = 'knowledge_base'
+
+# Shared, rarely written keys (the knowledge base) may be read through this
+# per-process cache, so a cache-hit read such as /api/knowledge/answer/ stays
+# query-free. Bumps in this process evict at once; other processes within the TTL.
+version_cache = LRUCache(maxsize=64, ttl=getattr(settings, 'KB_VERSION_CACHE_TTL', 5))
+
+
+def course_key(user_id):
+    return f'courses:{user_id}'
+
+
+def bump_version(key):
+    now = timezone.now()
+    # Evict now and again after commit, so a read racing the transaction
+    # cannot keep the old version cached.
+    version_cache.delete(key)
+    transaction.on_commit(lambda: version_cache.delete(key))
+    invalidate_namespace(key)
+    rows = DataVersion.objects.filter(key=key)
+    if rows.update(version=F('version') + 1, updated_at=now):
+        return
+    try:
+        with transaction.atomic():
+            DataVersion.objects.create(key=key, version=1, updated_at=now)
+    except IntegrityError:
+        rows.update(version=F('version') + 1, updated_at=now)
+
+
+def get_version(key, cached=False):
+    """``(version, updated_at)``; ``(0, None)`` if ``key`` was never written."""
+    row = version_cache.get(key) if cached else None
+    if row is None:
+        rows = list(DataVersion.objects.filter(key=key).values_list('version', 'updated_at')[:1])
+        row = rows[0] if rows else (0, None)
+        if cached:
+            version_cache.set(key, row)
+    return row
+
+
+def conditional_view(key_func, cached=False, cache_timeout=None):
+    """Add ETag/Last-Modified to a GET view and answer 304 when they still match.
+
+    ``key_func(request, *args, **kwargs)`` names the DataVersion key (which is
+    also the cache namespace); ``cached`` reads it through ``version_cache``;
+    ``cache_timeout`` caches 200 response data. Works on function views (below
+    ``@api_view``) and on APIView/ViewSet methods.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if isinstance(args[0], APIView):
+                request, rest = args[1], args[2:]
+            else:
+                request, rest = args[0], args[1:]
+            key = key_func(request, *rest, **kwargs)
+            version, updated_at = get_version(key, cached)
+            # The path, query string and Accept header pick the representation.
+            variant = hashlib.md5(
+                f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}".encode(),
+                usedforsecurity=False,
+            ).hexdigest()[:12]
+            etag = f'W/"{key}:{version}:{variant}"'
+            last_modified = int(updated_at.timestamp()) if updated_at else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None and cache_timeout is None:
+                response = view(*args, **kwargs)
+            elif response is None:
+                fresh = []
+
+                def compute():
+                    fresh.append(view(*args, **kwargs))
+                    return fresh[0].status_code, getattr(fresh[0], 'data', None)
+
+                status, data = get_or_compute(
+                    key, f'{version}:{updated_at and updated_at.timestamp()}:{variant}', compute,
+                    timeout=cache_timeout, cacheable=lambda value: value[0] == 200 and value[1] is not None,
+                )
+                response = fresh[0] if fresh else Response(data, status=status)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+                # Per-user data: browsers may keep it but must revalidate.
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapped
+    return decorator
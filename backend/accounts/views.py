@@ -1,10 +1,54 @@
+from copy import copy
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
 from rest_framework import generics, permissions, serializers, viewsets, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import (
+    action, api_view, authentication_classes, permission_classes, renderer_classes,
+)
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import AllowAny
 from django.contrib.auth import get_user_model
-from .models import User, Course
-from .serializers import CourseSerializer, UserRegistrationSerializer
+from .authentication import ClaimsJWTAuthentication
+from .chat import history_page
+from .chat_buffer import flush_pending
+from .exports import EXPORT_RENDERERS, stream_export
+from .kb_cache import answer_cache, lookup_answer
+from .metrics import collect, render
+from .models import User, Conversation, Course, TranscriptSummary
+from .pagination import CourseCursorPagination, keyset_page
+from .parsers import CSVParser, read_csv_rows
+from .querybudget import query_budget
+from .search import MAX_RESULTS, engine_for, search as search_knowledge_base
+from .serializers import (
+    ChatMessageSerializer, ConversationSerializer, CourseSerializer, KnowledgeBaseSerializer, TranscriptSummarySerializer,
+    UserRegistrationSerializer, requested_fields,
+)
+from .transcript import apply_course_change, rebuild_for_user
+from .vectors import similar_questions
+from .versions import KNOWLEDGE_BASE, bump_version, conditional_view, course_key
+from .gpa import GPAError, compute_gpa, compute_gpas
+
+MAX_GPA_BATCH = 10000
+# Read-only views that only need request.user.id (see accounts.authentication).
+READ_AUTHENTICATION = [ClaimsJWTAuthentication]
+MAX_IMPORT_ROWS = 5000
+MAX_HISTORY_PAGE = 200
+# Shared (cross-worker) cache lifetime for versioned read responses; see accounts.versions.
+RESPONSE_CACHE_TIMEOUT = 300
+COURSE_EXPORT_COLUMNS = ('id', 'course_name', 'credits', 'letter_grade', 'semester_year')
+TRANSCRIPT_EXPORT_COLUMNS = ('semester_year', 'course_count', 'total_credits', 'quality_points',
+                             'semester_gpa', 'cumulative_gpa')
+
+# Version keys for conditional_view: ETag counter and shared-cache namespace.
+def course_version_key(request, *args, **kwargs):
+    return course_key(request.user.id)
+
+def kb_version_key(request, *args, **kwargs):
+    return KNOWLEDGE_BASE
 
 # SERIALIZERS & REGISTRATION (Keep as is)
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -36,41 +80,312 @@ class UserRegistrationView(generics.CreateAPIView):
 class CourseViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CourseSerializer
+    pagination_class = CourseCursorPagination
+    # Per action, including one user lookup on a JWT cache miss (accounts.querybudget).
+    query_budget = {'list': 3, 'retrieve': 3, 'create': 15, 'update': 17, 'partial_update': 17, 'destroy': 13,
+                    'bulk_import': 15, 'export': 2}
 
     def get_queryset(self):
-        return Course.objects.filter(user=self.request.user).order_by('-id')
+        queryset = Course.objects.filter(user=self.request.user).order_by('-id')
+        # ?fields=course_name,letter_grade also narrows the SELECT list.
+        requested = requested_fields(self.request)
+        if requested:
+            columns = requested & set(CourseSerializer.Meta.fields)
+            queryset = queryset.only('id', *columns)
+        return queryset
+
+    # Conditional GET: 304 from the per-user course version, before any query.
+    @conditional_view(course_version_key, cache_timeout=RESPONSE_CACHE_TIMEOUT)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_view(course_version_key, cache_timeout=RESPONSE_CACHE_TIMEOUT)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
+    # Every write also applies its delta to the user's TranscriptSummary rows.
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            course = serializer.save(user=self.request.user)
+            apply_course_change(self.request.user.id, new=course)
+
+    def perform_update(self, serializer):
+        old = copy(serializer.instance)
+        with transaction.atomic():
+            course = serializer.save()
+            apply_course_change(self.request.user.id, old=old, new=course)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            apply_course_change(self.request.user.id, old=instance)
+            instance.delete()
+
+    # Bulk transcript import: JSON list ({'courses': [...]} also accepted),
+    # a text/csv body, or a multipart upload named 'file'. Rows are validated
+    # in one pass and upserted on (user, course_name, semester_year) with
+    # bulk_create/bulk_update, so the query count does not grow with the rows.
+    @action(detail=False, methods=['post'], url_path='bulk',
+            parser_classes=[JSONParser, CSVParser, MultiPartParser])
+    def bulk_import(self, request):
+        if 'file' in request.FILES:
+            rows = read_csv_rows(request.FILES['file'])
+        elif isinstance(request.data, dict):
+            rows = request.data.get('courses')
+        else:
+            rows = request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({'success': False, 'error': 'Expected a non-empty list of courses.'}, status=400)
+        if len(rows) > MAX_IMPORT_ROWS:
+            return Response({'success': False, 'error': f'At most {MAX_IMPORT_ROWS} courses per import.'}, status=400)
+
+        # One serializer instance validates every row (as ListSerializer does),
+        # keeping per-row errors.
+        child = CourseSerializer()
+        validated, errors = [], []
+        for i, row in enumerate(rows):
+            try:
+                validated.append(child.run_validation(row))
+            except serializers.ValidationError as exc:
+                errors.append({'row': i, 'errors': exc.detail})
+        if errors:
+            return Response({'success': False, 'errors': errors}, status=400)
+
+        # Last row wins when the payload repeats a key. A blank semester is
+        # stored as NULL but older rows may hold '', so both sides of the
+        # match use None for it.
+        incoming = {}
+        for row in validated:
+            row['semester_year'] = row.get('semester_year') or None
+            incoming[(row['course_name'], row['semester_year'])] = row
+
+        user = request.user
+        existing = {}
+        for course in Course.objects.filter(user=user, course_name__in={k[0] for k in incoming}).order_by('id'):
+            existing.setdefault((course.course_name, course.semester_year or None), course)
+
+        to_create, to_update = [], []
+        for key, row in incoming.items():
+            course = existing.get(key)
+            if course is None:
+                to_create.append(Course(user=user, **row))
+            else:
+                course.credits = row['credits']
+                course.letter_grade = row['letter_grade']
+                to_update.append(course)
+
+        with transaction.atomic():
+            Course.objects.bulk_create(to_create)
+            Course.objects.bulk_update(to_update, ['credits', 'letter_grade'])
+            rebuild_for_user(user.id)
+            bump_version(course_key(user.id))
+
+        return Response({'success': True, 'created': len(to_create), 'updated': len(to_update)})
+
+    # Streaming export: ?format=csv (default) or ?format=ndjson.
+    @action(detail=False, methods=['get'], url_path='export', renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        queryset = Course.objects.filter(user=request.user).order_by('id')
+        return stream_export(queryset, COURSE_EXPORT_COLUMNS, request.accepted_renderer.format, 'courses')
+
+# TRANSCRIPT (materialized per-semester summaries, O(semesters) to read)
+@query_budget(3)
+@api_view(['GET'])
+@authentication_classes(READ_AUTHENTICATION)
+@permission_classes([permissions.IsAuthenticated])
+@conditional_view(course_version_key, cache_timeout=RESPONSE_CACHE_TIMEOUT)
+def transcript_view(request):
+    rows = TranscriptSummary.objects.filter(user_id=request.user.id).order_by('semester_key')
+    semesters = TranscriptSummarySerializer(rows, many=True).data
+    cumulative_gpa = semesters[-1]['cumulative_gpa'] if semesters else None
+    return Response({'semesters': semesters, 'cumulative_gpa': cumulative_gpa})
+
+@query_budget(2)
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@renderer_classes(EXPORT_RENDERERS)
+def transcript_export(request):
+    queryset = TranscriptSummary.objects.filter(user=request.user).order_by('semester_key')
+    return stream_export(queryset, TRANSCRIPT_EXPORT_COLUMNS, request.accepted_renderer.format, 'transcript')
+
+# STAFF EXPORT (every user's courses, streamed in id order)
+@query_budget(2)
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+@renderer_classes(EXPORT_RENDERERS)
+def admin_course_export(request):
+    queryset = Course.objects.order_by('id')
+    columns = ('user__email',) + COURSE_EXPORT_COLUMNS
+    return stream_export(queryset, columns, request.accepted_renderer.format, 'all_courses')
+
+# GPA CALCULATION ENDPOINT
+# Accepts either a single {'grades': [...], 'credits': [...]} pair, a matrix
+# ({'grades': [[...], ...], 'credits': [[...], ...]}) or a list of pairs under
+# 'batch'. All shapes go through the same vectorized engine in accounts.gpa.
+def _gpa_result(gpa, total_credits):
+    if total_credits == 0:
+        return {'gpa': None, 'total_credits': 0.0, 'error': 'No credits'}
+    return {'gpa': round(float(gpa), 2), 'total_credits': float(total_credits)}
 
-# GPA CALCULATION ENDPOINT (Keep as is)
+@query_budget(1)
 @api_view(['POST'])
+@permission_classes([permissions.AllowAny])
 def calculate_gpa_endpoint(request):
     try:
+        batch = request.data.get('batch')
         grades = request.data.get('grades', [])
         credits = request.data.get('credits', [])
-        if not grades or not credits or len(grades) != len(credits):
-            return Response({'success': False, 'error': 'Invalid data'}, status=400)
 
-        grade_points = {'A':5.0,'B':4.0,'C':3.0,'D':2.0,'E':1.0,'F':0.0}
-        total_points = 0
-        total_credits = 0
+        if batch is None and grades and isinstance(grades[0], (list, tuple)):
+            if len(grades) != len(credits):
+                return Response({'success': False, 'error': 'Invalid data'}, status=400)
+            batch = [{'grades': g, 'credits': c} for g, c in zip(grades, credits)]
 
-        for grade, credit in zip(grades, credits):
-            grade_upper = grade.upper().strip()
-            if grade_upper in grade_points:
-                total_points += grade_points[grade_upper]*float(credit)
-                total_credits += float(credit)
+        if batch is not None:
+            if not isinstance(batch, list) or not batch or len(batch) > MAX_GPA_BATCH:
+                return Response({'success': False, 'error': 'Invalid data'}, status=400)
+            try:
+                gpas, totals = compute_gpas(
+                    [row.get('grades') or [] for row in batch],
+                    [row.get('credits') or [] for row in batch],
+                )
+            except (GPAError, AttributeError, TypeError, ValueError):
+                return Response({'success': False, 'error': 'Invalid data'}, status=400)
+            results = [_gpa_result(g, t) for g, t in zip(gpas, totals)]
+            return Response({'success': True, 'results': results})
 
-        if total_credits == 0:
-            return Response({'success': False, 'error': 'No credits'}, status=400)
-
-        gpa = total_points / total_credits
+        try:
+            gpa, total_credits = compute_gpa(grades, credits)
+        except GPAError as e:
+            return Response({'success': False, 'error': str(e)}, status=400)
         return Response({'success': True, 'gpa': round(gpa,2), 'total_credits': total_credits})
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
+# CONVERSATION LIST (most recently active first, keyset cursor on (last_activity, id))
+# Reads the denormalized Conversation table, so a page is one index range scan.
+@query_budget(2)
+@api_view(['GET'])
+@authentication_classes(READ_AUTHENTICATION)
+@permission_classes([permissions.IsAuthenticated])
+def conversation_list(request):
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 50)), MAX_HISTORY_PAGE))
+        flush_pending(request.user.id)
+        queryset = Conversation.objects.filter(user_id=request.user.id)
+        rows, next_cursor = keyset_page(queryset, request.query_params.get('before'), limit,
+                                        field='last_activity', chronological=False)
+    except ValueError:
+        return Response({'success': False, 'error': 'Invalid cursor or limit'}, status=400)
+
+    next_url = None
+    if next_cursor:
+        next_url = request.build_absolute_uri(f'{request.path}?before={next_cursor}&limit={limit}')
+    return Response({
+        'results': ConversationSerializer(rows, many=True).data,
+        'next': next_url,
+    })
+
+# CHAT HISTORY (newest page first, keyset cursor on (created_at, id); archived
+# conversations are read transparently from ConversationArchive)
+@query_budget(4)
+@api_view(['GET'])
+@authentication_classes(READ_AUTHENTICATION)
+@permission_classes([permissions.IsAuthenticated])
+def chat_history(request, conversation_id):
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 50)), MAX_HISTORY_PAGE))
+        rows, next_cursor = history_page(request.user.id, conversation_id, request.query_params.get('before'), limit)
+    except ValueError:
+        return Response({'success': False, 'error': 'Invalid cursor or limit'}, status=400)
+
+    next_url = None
+    if next_cursor:
+        next_url = request.build_absolute_uri(f'{request.path}?before={next_cursor}&limit={limit}')
+    return Response({
+        'conversation_id': conversation_id,
+        'results': ChatMessageSerializer(rows, many=True).data,
+        'next': next_url,
+    })
+
+# KNOWLEDGE BASE SEARCH (FTS5 / PostgreSQL full-text, BM25-style ranking)
+@query_budget(5)
+@api_view(['GET'])
+@authentication_classes(READ_AUTHENTICATION)
+@permission_classes([permissions.IsAuthenticated])
+@conditional_view(kb_version_key, cached=True, cache_timeout=RESPONSE_CACHE_TIMEOUT)
+def knowledge_search(request):
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'success': False, 'error': 'Missing q'}, status=400)
+    verified_only = request.query_params.get('verified', '').lower() in ('1', 'true', 'yes')
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 10)), MAX_RESULTS))
+    except ValueError:
+        return Response({'success': False, 'error': 'Invalid limit'}, status=400)
+
+    results = []
+    for entry, score in search_knowledge_base(query, verified_only=verified_only, limit=limit):
+        row = KnowledgeBaseSerializer(entry).data
+        row['score'] = round(score, 4)
+        results.append(row)
+    return Response({'success': True, 'engine': engine_for(), 'results': results})
+
+# KNOWLEDGE BASE EXACT ANSWER (hashed lookup + per-process LRU)
+@query_budget(2)
+@api_view(['GET'])
+@authentication_classes(READ_AUTHENTICATION)
+@permission_classes([permissions.IsAuthenticated])
+@conditional_view(kb_version_key, cached=True)
+def knowledge_answer(request):
+    question = request.query_params.get('q', '').strip()
+    if not question:
+        return Response({'success': False, 'error': 'Missing q'}, status=400)
+    entry, cached = lookup_answer(question)
+    return Response({'success': True, 'found': entry is not None, 'entry': entry, 'cached': cached})
+
+# SIMILAR QUESTIONS (hashed n-gram vectors, memory-mapped; see accounts.vectors)
+@query_budget(3)
+@api_view(['GET'])
+@authentication_classes(READ_AUTHENTICATION)
+@permission_classes([permissions.IsAuthenticated])
+@conditional_view(kb_version_key, cached=True, cache_timeout=RESPONSE_CACHE_TIMEOUT)
+def knowledge_similar(request):
+    question = request.query_params.get('q', '').strip()
+    if not question:
+        return Response({'success': False, 'error': 'Missing q'}, status=400)
+    try:
+        k = max(1, min(int(request.query_params.get('k', 5)), MAX_RESULTS))
+    except ValueError:
+        return Response({'success': False, 'error': 'Invalid k'}, status=400)
+    verified_only = request.query_params.get('verified', '').lower() in ('1', 'true', 'yes')
+
+    results = []
+    for entry, score in similar_questions(question, k=k, verified_only=verified_only):
+        row = KnowledgeBaseSerializer(entry).data
+        row['score'] = round(score, 4)
+        results.append(row)
+    return Response({'success': True, 'results': results})
+
+@query_budget(1)
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def knowledge_cache_stats(request):
+    return Response(answer_cache.stats())
+
 # HEALTH CHECK (Keep as is)
+@query_budget(1)
 @api_view(['GET'])
+@permission_classes([permissions.AllowAny])
 def health_check(request):
     return Response({'status':'ok'})
+
+# METRICS (Prometheus text format, summed over the host's workers; see accounts.metrics)
+# Plain Django view: scrapers send METRICS_TOKEN as a bearer token, not a JWT.
+# Without a token it is only served with DEBUG on.
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token and not settings.DEBUG:
+        return HttpResponse(status=403)
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=403)
+    return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
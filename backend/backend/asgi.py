@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Persistent connections belong to a thread, and under ASGI requests run on
+# short-lived executor threads whose connections are never reused or closed.
+# Use DB_POOL=native for reuse instead (backend/database.py).
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
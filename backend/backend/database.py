@@ -0,0 +1,76 @@
+"""Build ``DATABASES['default']`` from the environment.
+
+* ``DATABASE_URL``     - any dj-database-url URL (Render's ``thinkora-db``
+  connection string in production); SQLite next to the project by default.
+* ``DB_CONN_MAX_AGE``  - seconds a worker keeps its connection open (default
+  600, with health checks); 0 reconnects on every request. backend/asgi.py
+  defaults it to 0: persistent connections leak under ASGI.
+* ``DB_POOL``          - PostgreSQL only: ``native`` uses Django's psycopg 3
+  connection pool in each worker (``DB_POOL_MIN_SIZE`` / ``DB_POOL_MAX_SIZE``),
+  ``pgbouncer`` targets a transaction-mode PgBouncer (no server-side cursors).
+* ``SQLITE_PROFILE``   - ``tuned`` (default) or ``default``; see
+  ``SQLITE_TUNED_OPTIONS``. ``python manage.py bench_sqlite`` compares them.
+* ``DATABASE_REPLICA_URLS`` - comma-separated read replicas, added as
+  ``replica_1``, ``replica_2`` ... and used by accounts.routers. Locally a
+  second SQLite file works (``python manage.py sync_sqlite_replica``).
+"""
+import os
+
+import dj_database_url
+
+# Single-node SQLite: WAL lets readers run during a write, synchronous=NORMAL
+# only fsyncs at checkpoints (still safe against corruption in WAL mode), mmap
+# serves reads from the page cache, and BEGIN IMMEDIATE + a busy timeout make
+# concurrent writers queue instead of failing with "database is locked".
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-32000',
+    'PRAGMA temp_store=MEMORY',
+)
+SQLITE_TUNED_OPTIONS = {
+    'init_command': '; '.join(SQLITE_PRAGMAS),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 5,
+}
+
+
+def database_config(base_dir, env=os.environ):
+    url = env.get('DATABASE_URL') or f"sqlite:///{base_dir / 'db.sqlite3'}"
+    conn_max_age = int(env.get('DB_CONN_MAX_AGE', 600))
+    pool = env.get('DB_POOL', '').lower()
+    config = dj_database_url.parse(
+        url,
+        conn_max_age=conn_max_age,
+        conn_health_checks=conn_max_age > 0,
+        disable_server_side_cursors=pool == 'pgbouncer',
+        ssl_require=env.get('DB_SSL_REQUIRE', 'False') == 'True',
+    )
+    options = config.setdefault('OPTIONS', {})
+
+    if config['ENGINE'] == 'django.db.backends.sqlite3':
+        if env.get('SQLITE_PROFILE', 'tuned') == 'tuned':
+            options.update(SQLITE_TUNED_OPTIONS)
+    elif pool == 'native':
+        options['pool'] = {
+            'min_size': int(env.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(env.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(env.get('DB_POOL_TIMEOUT', 10)),
+        }
+        # The pool owns connection lifetime; Django rejects CONN_MAX_AGE with it.
+        config['CONN_MAX_AGE'] = 0
+        config['CONN_HEALTH_CHECKS'] = False
+    return config
+
+
+def replica_configs(env=os.environ):
+    """``{'replica_1': {...}, ...}`` from ``DATABASE_REPLICA_URLS``."""
+    urls = [url.strip() for url in env.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    replicas = {}
+    for i, url in enumerate(urls, 1):
+        config = database_config(None, {**env, 'DATABASE_URL': url})
+        # Tests run against the primary only.
+        config['TEST'] = {'MIRROR': 'default'}
+        replicas[f'replica_{i}'] = config
+    return replicas
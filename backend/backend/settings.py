@@ -1,42 +1,42 @@
+"""
+Django settings for Study Assistant backend.
+Production-ready with environment variable configuration. This is the only
+settings module; ``settings.py`` next to manage.py re-exports it.
+"""
+
 import os
 from pathlib import Path
+from datetime import timedelta
 from dotenv import load_dotenv
 
+from .database import database_config, replica_configs
+
 # Load environment variables
 load_dotenv()
 
-# Use environment variables
-SECRET_KEY = os.getenv('DJANGO_SECRET_KEY')
-DEBUG = os.getenv('DEBUG', 'False') == 'True'
-ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split(',')
-CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', '').split(',')
+BASE_DIR = Path(__file__).resolve().parent.parent
 
-# JWT settings
-from datetime import timedelta
-SIMPLE_JWT = {
-    'ACCESS_TOKEN_LIFETIME': timedelta(seconds=int(os.getenv('JWT_ACCESS_TOKEN_LIFETIME', 3600))),
-    'REFRESH_TOKEN_LIFETIME': timedelta(seconds=int(os.getenv('JWT_REFRESH_TOKEN_LIFETIME', 604800))),
-}
+# ==================== SECURITY ====================
+SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', 'django-insecure-dev-key-change-in-production')
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+# Allow local Termux and Render production hosts
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1,.onrender.com').split(',')
+
+CSRF_TRUSTED_ORIGINS = os.getenv('CSRF_TRUSTED_ORIGINS', 'http://localhost:5173').split(',')
 
-# Security
 SECURE_SSL_REDIRECT = os.getenv('SECURE_SSL_REDIRECT', 'False') == 'True'
 SESSION_COOKIE_SECURE = os.getenv('SESSION_COOKIE_SECURE', 'False') == 'True'
 CSRF_COOKIE_SECURE = os.getenv('CSRF_COOKIE_SECURE', 'False') == 'True'
 
-# Email
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
-# Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
 
-# SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-dev-key'
-
-# SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True  # <--- THIS IS THE CRITICAL FIX
-
-# ALLOW EVERYTHING
-ALLOWED_HOSTS = ['*']
+# DJANGO_PROFILE=api boots API-only workers without the admin, sessions,
+# messages, static files, djoser and authtoken (see PROFILE below);
+# ``python manage.py profile_startup --compare`` measures the difference.
+API_ONLY = os.getenv('DJANGO_PROFILE', 'full') == 'api'
 
+# ==================== APPLICATION DEFINITION ====================
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -44,18 +44,25 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+
     # Third party apps
     'rest_framework',
     'rest_framework.authtoken',
-    'djoser',
+    'rest_framework_simplejwt',
     'corsheaders',
+    'djoser',
+
     # Local apps
     'accounts',
 ]
 
 MIDDLEWARE = [
-    'corsheaders.middleware.CorsMiddleware', # <--- CORS MUST BE FIRST
+    'accounts.middleware.MetricsMiddleware',
+    'accounts.querybudget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'accounts.middleware.ReplicaPinningMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,17 +71,6 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-# ALLOW ALL ORIGINS
-CORS_ALLOW_ALL_ORIGINS = True
-
-CORS_ALLOWED_ORIGINS = [
-    "http://localhost:5173",
-    "http://127.0.0.1:5173",
-]
-
-
-CORS_ALLOW_CREDENTIALS = True
-
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -95,30 +91,72 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+# ==================== DATABASE ====================
+# DATABASE_URL (Render's thinkora-db) with persistent connections / optional
+# pooling, or a tuned SQLite file by default; see backend/database.py.
 DATABASES = {
+    'default': database_config(BASE_DIR),
+    **replica_configs(),
+}
+# Reads of accounts models go to DATABASE_REPLICAS; see accounts/routers.py.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['accounts.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+REPLICA_HEALTH_SECONDS = int(os.getenv('REPLICA_HEALTH_SECONDS', 5))
+# Filtered admin changelists count at most this many rows (accounts/admin_scaling.py).
+ADMIN_COUNT_LIMIT = int(os.getenv('ADMIN_COUNT_LIMIT', 10000))
+
+# ==================== CACHE ====================
+# Per-process LRU in front of a SQLite file shared by all workers on the host
+# (accounts/cache_backends.py); no Redis needed.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'accounts.cache_backends.TwoTierCache',
+        'LOCATION': os.getenv('CACHE_PATH', str(BASE_DIR / 'var' / 'cache.sqlite3')),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 20000)),
+            'LOCAL_MAX_ENTRIES': int(os.getenv('CACHE_LOCAL_MAX_ENTRIES', 1024)),
+            'LOCAL_TIMEOUT': float(os.getenv('CACHE_LOCAL_TIMEOUT', 5)),
+        },
     }
 }
 
+# ==================== METRICS ====================
+# Development query checks (accounts/querybudget.py): log repeated statements
+# and views over their @query_budget.
+QUERY_BUDGET_CHECKS = os.getenv('QUERY_BUDGET_CHECKS', str(DEBUG)) == 'True'
+QUERY_BUDGET_RAISE = os.getenv('QUERY_BUDGET_RAISE', 'False') == 'True'
+QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', 3))
+
+# /api/metrics/ (accounts/metrics.py): each worker writes its counters to
+# METRICS_DIR/<pid>.json at most every METRICS_FLUSH_SECONDS.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.getenv('METRICS_DIR', str(BASE_DIR / 'var' / 'metrics'))
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 5))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# ==================== REST FRAMEWORK & JWT ====================
 AUTH_USER_MODEL = 'accounts.User'
 
-LANGUAGE_CODE = 'en-us'
-TIME_ZONE = "Etc/GMT"
-USE_I18N = True
-USE_TZ = True
-STATIC_URL = 'static/'
-
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
+    'DEFAULT_PERMISSION_CLASSES': (
+        'rest_framework.permissions.IsAuthenticated',
+    ),
+    # DRF's handler; errors from the CSV/NDJSON export views are sent as JSON.
+    'EXCEPTION_HANDLER': 'accounts.exports.exception_handler',
 }
 
+# The frontend does not refresh tokens, so access tokens last a day by default.
 SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(seconds=int(os.getenv('JWT_ACCESS_TOKEN_LIFETIME', 86400))),
+    'REFRESH_TOKEN_LIFETIME': timedelta(seconds=int(os.getenv('JWT_REFRESH_TOKEN_LIFETIME', 604800))),
+    'ALGORITHM': 'HS256',
+    'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
-    'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
 }
 
 DJOSER = {
@@ -130,3 +168,67 @@ DJOSER = {
         'user': 'accounts.api.serializers.UserSerializer',
     }
 }
+
+# ==================== CORS SETTINGS ====================
+# Updated to match Study Assistant frontend deployment
+CORS_ALLOWED_ORIGINS = os.getenv(
+    'CORS_ALLOWED_ORIGINS', 
+    'http://localhost:5173,http://127.0.0.1:5173'
+).split(',')
+CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_ALL_ORIGINS = os.getenv('CORS_ALLOW_ALL_ORIGINS', 'False') == 'True'
+
+# ==================== STATIC FILES ====================
+STATIC_URL = 'static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+# Tests swap in plain static storage (no collectstatic manifest).
+TEST_RUNNER = 'accounts.test_runner.TestRunner'
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# ==================== INTERNATIONALIZATION ====================
+LANGUAGE_CODE = 'en-us'
+TIME_ZONE = 'UTC'
+USE_I18N = True
+USE_TZ = True
+
+# Authenticated requests resolve the JWT user from a per-process cache
+# (accounts.authentication); claims-only reads skip the lookup entirely.
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 4096))
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 60))
+JWT_CLAIMS_ONLY_READS = os.getenv('JWT_CLAIMS_ONLY_READS', 'False') == 'True'
+
+# Password hashing pool for the async register/login views (accounts/hashing.py)
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or None
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 32))
+
+# Chat write-behind buffer (see accounts/chat_buffer.py)
+CHAT_WRITE_BEHIND = os.getenv('CHAT_WRITE_BEHIND', 'False') == 'True'
+CHAT_WRITE_BEHIND_MAX_BATCH = int(os.getenv('CHAT_WRITE_BEHIND_MAX_BATCH', 200))
+CHAT_WRITE_BEHIND_MAX_DELAY = float(os.getenv('CHAT_WRITE_BEHIND_MAX_DELAY', 0.25))
+# Reads in other workers wait (up to MAX_DELAY + 0.25 s) for a worker that has
+# the user's messages queued, via a marker in the shared cache. Past
+# MAX_PENDING queued rows (while the database is failing) the oldest are
+# dropped and logged.
+CHAT_WRITE_BEHIND_MAX_PENDING = int(os.getenv('CHAT_WRITE_BEHIND_MAX_PENDING', 10000))
+
+# ==================== PROFILE ====================
+# API-only workers skip what only the admin and browsable API use; the admin
+# URLs are dropped with the app (backend/urls.py).
+if API_ONLY:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in (
+        'django.contrib.admin', 'django.contrib.sessions', 'django.contrib.messages',
+        'django.contrib.staticfiles', 'rest_framework.authtoken', 'djoser',
+    )]
+    MIDDLEWARE = [name for name in MIDDLEWARE if name not in (
+        'whitenoise.middleware.WhiteNoiseMiddleware',
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+    )]
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove('django.contrib.messages.context_processors.messages')
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = ('rest_framework.renderers.JSONRenderer',)
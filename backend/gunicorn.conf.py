@@ -0,0 +1,33 @@
+"""Gunicorn settings, read from the working directory (rootDir ``backend``).
+
+With ``preload_app`` the master boots Django once - settings, apps, URLconf,
+numpy - and forks the workers from it: they start in milliseconds instead of
+each repeating the boot, and share the warmed memory copy-on-write.
+GUNICORN_PRELOAD=False restores per-worker boot (needed for ``--reload``).
+Bind address and worker count come from $PORT and $WEB_CONCURRENCY.
+"""
+import gc
+import os
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        # Import every view (and what it imports) before forking, not on each
+        # worker's first request.
+        from django.urls import get_resolver
+        get_resolver().url_patterns
+
+
+def pre_fork(server, worker):
+    # Move the preloaded heap out of the collector's reach, so collections in
+    # the workers do not write to (and so copy) the shared pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        # Never share a database connection the master may have opened.
+        from django.db import connections
+        connections.close_all()
@@ -1,212 +1,250 @@
-# ~/Thinkora/tests/backend_tests.py - UPDATED VERSION
+"""In-process benchmark for the Thinkora API.
+
+Seeds a throwaway SQLite database (10k users, 1M chat messages at --scale 1),
+drives registration, JWT login, course CRUD, calculate-gpa, health and chat
+history through Django's test client - the full middleware stack, no server -
+and reports p50/p99 latency and throughput per scenario. Exits 1 when a
+scenario's p50 or p99 is more than --tolerance above the stored baseline, and 2
+when there is no baseline for the requested --scale and --concurrency.
+
+    python tests/backend_tests.py                      # full volume
+    python tests/backend_tests.py --scale 0.01         # quick run (CI)
+    python tests/backend_tests.py --scale 0.01 --update-baseline
+
+Baselines are stored per scale and concurrency, and are per machine: record one on the box
+that runs the comparison.
+"""
+import argparse
+import json
 import os
 import sys
-import django
-import requests
-import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+BACKEND = HERE.parent / 'backend'
+DEFAULT_BASELINE = HERE / 'benchmark_baseline.json'
+
+USERS = 10_000
+MESSAGES = 1_000_000
+COURSES_PER_USER = 8
+MESSAGES_PER_CONVERSATION = 20
+PASSWORD = 'BenchPass123!'
+
+
+def configure(workdir):
+    # Everything the settings read from the environment points into workdir.
+    sys.path.insert(0, str(BACKEND))
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'settings'
+    os.environ['DATABASE_URL'] = f'sqlite:///{workdir}/bench.sqlite3'
+    os.environ['CACHE_PATH'] = f'{workdir}/cache.sqlite3'
+    os.environ['METRICS_DIR'] = f'{workdir}/metrics'
+    os.environ['ALLOWED_HOSTS'] = 'testserver'
+    os.environ['DEBUG'] = 'False'
+    os.environ['QUERY_BUDGET_CHECKS'] = 'False'
+    import django
+    django.setup()
+
+
+def seed(scale, out):
+    from django.contrib.auth.hashers import make_password
+    from django.core.management import call_command
+    from django.db import transaction
+
+    from accounts.models import ChatMessage, Course, User
+
+    call_command('migrate', verbosity=0)
+    users = max(1, int(USERS * scale))
+    messages = max(MESSAGES_PER_CONVERSATION, int(MESSAGES * scale))
+    start = time.perf_counter()
+
+    # One hash for everyone: seeding should not spend minutes in PBKDF2.
+    password = make_password(PASSWORD)
+    with transaction.atomic():
+        User.objects.bulk_create(
+            [User(email=f'user{i}@bench.test', username=f'user{i}', password=password) for i in range(users)],
+            batch_size=2000)
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+
+    grades = ('A', 'B', 'C', 'D', 'F')
+    with transaction.atomic():
+        Course.objects.bulk_create(
+            [Course(user_id=uid, course_name=f'Course {n}', credits=(n % 4) + 1, letter_grade=grades[(uid + n) % 5],
+                    semester_year=f'{2020 + n % 4}-{n % 2 + 1}')
+             for uid in user_ids for n in range(COURSES_PER_USER)],
+            batch_size=5000)
+
+    batch = []
+    for i in range(messages):
+        conversation = i // MESSAGES_PER_CONVERSATION
+        batch.append(ChatMessage(user_id=user_ids[conversation % len(user_ids)], conversation_id=f'conv{conversation}',
+                                 role='user' if i % 2 == 0 else 'ai', content=f'Message {i} about GPA and credits.'))
+        if len(batch) == 10_000:
+            with transaction.atomic():
+                ChatMessage.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        with transaction.atomic():
+            ChatMessage.objects.bulk_create(batch)
+
+    with open(os.devnull, 'w') as devnull:
+        call_command('rebuild_transcripts', stdout=devnull)
+        call_command('backfill_conversations', stdout=devnull)
+    out(f'Seeded {users} users, {users * COURSES_PER_USER} courses, {messages} chat messages '
+        f'in {time.perf_counter() - start:.1f}s')
+    return user_ids
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def measure(name, requests, call, concurrency):
+    """Run call(i) for i in range(requests); returns p50/p99 (ms) and requests per second."""
+    def timed(i):
+        start = time.perf_counter()
+        call(i)
+        return time.perf_counter() - start
+
+    call(-1)  # warm-up
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(timed, range(requests)))
+    else:
+        latencies = [timed(i) for i in range(requests)]
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'rps': round(requests / elapsed, 1)}
+
+
+def scenarios(user_ids, requests, hashing_requests):
+    """``[(name, requests, call)]``; each call asserts its response status."""
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from accounts.models import User
+
+    user = User.objects.get(id=user_ids[0])
+    token = str(RefreshToken.for_user(user).access_token)
+    run_id = time.time_ns()
+
+    local = threading.local()
+
+    def api():
+        # APIClient keeps per-request state; each --concurrency thread gets its own.
+        if not hasattr(local, 'client'):
+            local.client = APIClient()
+            local.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return local.client
+
+    created = []
+
+    def check(response, status):
+        assert response.status_code == status, (response.status_code, getattr(response, 'data', None))
+        return response
+
+    def register(i):
+        check(APIClient().post('/api/register/', {'email': f'new{run_id}-{i}@bench.test', 'username': f'n{run_id}{i}',
+                                                  'password': PASSWORD}, format='json'), 201)
+
+    def login(i):
+        email = f'user{i % len(user_ids)}@bench.test'
+        check(APIClient().post('/api/login/', {'email': email, 'password': PASSWORD}, format='json'), 200)
+
+    def create(i):
+        response = check(api().post('/api/courses/', {'course_name': f'Bench {run_id} {i}', 'credits': 3,
+                                                    'letter_grade': 'B', 'semester_year': '2024-1'},
+                                  format='json'), 201)
+        if i >= 0:
+            created.append(response.data['id'])
+
+    def course_id(i):
+        return created[i % len(created)]
+
+    def gpa(i):
+        check(api().post('/api/calculate-gpa/', {'grades': ['A', 'B', 'C', 'A'], 'credits': [3, 4, 2, 3]},
+                       format='json'), 200)
+
+    return [
+        ('health', requests, lambda i: check(api().get('/api/health/'), 200)),
+        ('register', hashing_requests, register),
+        ('login', hashing_requests, login),
+        ('courses.create', requests, create),
+        ('courses.list', requests, lambda i: check(api().get('/api/courses/'), 200)),
+        ('courses.retrieve', requests, lambda i: check(api().get(f'/api/courses/{course_id(i)}/'), 200)),
+        ('courses.update', requests,
+         lambda i: check(api().patch(f'/api/courses/{course_id(i)}/', {'letter_grade': 'A'}, format='json'), 200)),
+        ('courses.delete', requests,
+         lambda i: check(api().delete(f'/api/courses/{created.pop()}/'), 204) if i >= 0 else None),
+        ('calculate-gpa', requests, gpa),
+        ('transcript', requests, lambda i: check(api().get('/api/transcript/'), 200)),
+        ('chat.conversations', requests, lambda i: check(api().get('/api/chat/conversations/'), 200)),
+        # conv0, conv<users>, ... belong to the benchmark user (see seed()).
+        ('chat.history', requests,
+         lambda i: check(api().get(f'/api/chat/conversations/conv{len(user_ids) * (i % 5)}/messages/'), 200)),
+    ]
+
+
+def compare(results, baseline, tolerance, out):
+    regressions = []
+    for name, row in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if row[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f'{name} {metric} {row[metric]:.2f} > {base[metric]:.2f} (+{tolerance:.0%})')
+    for line in regressions:
+        out(f'REGRESSION {line}')
+    return not regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', type=float, default=1.0, help='Fraction of the 10k users / 1M messages to seed.')
+    parser.add_argument('--requests', type=int, default=300, help='Requests per scenario.')
+    parser.add_argument('--hashing-requests', type=int, default=10,
+                        help='Requests for register/login, which spend most of their time in PBKDF2.')
+    parser.add_argument('--concurrency', type=int, default=1, help='Client threads per scenario.')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.5, help='Allowed slowdown over the baseline (0.5 = 50%%).')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure(workdir)
+        user_ids = seed(args.scale, print)
+        results = {}
+        print(f"{'scenario':20} {'requests':>8} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+        for name, requests, call in scenarios(user_ids, args.requests, args.hashing_requests):
+            row = measure(name, requests, call, 1 if name == 'courses.delete' else args.concurrency)
+            results[name] = row
+            print(f"{name:20} {requests:>8} {row['p50_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['rps']:>9.1f}")
+
+    # {"scale=<s> concurrency=<c>": {scenario: {p50_ms, p99_ms, rps}}}
+    key = f'scale={args.scale} concurrency={args.concurrency}'
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.update_baseline:
+        baselines[key] = results
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+        print(f'Baseline for {key} written to {args.baseline}')
+        return 0
+    baseline = baselines.get(key)
+    if baseline is None:
+        print(f"ERROR: no baseline for {key} in {args.baseline} (recorded: {', '.join(sorted(baselines)) or 'none'}); "
+              f'run with --update-baseline to record one.', file=sys.stderr)
+        return 2
+    if compare(results, baseline, args.tolerance, print):
+        print('No regressions against the baseline.')
+        return 0
+    return 1
+
 
-# Setup Django
-sys.path.append('/data/data/com.termux/files/home/Thinkora/backend')
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
-django.setup()
-
-# Now import Django modules
-from django.test import TestCase
-from rest_framework.test import APITestCase
-from rest_framework import status
-
-class SimpleAuthTests:
-    """Simple tests that don't require full Django test setup"""
-    
-    def __init__(self):
-        self.base_url = "http://localhost:8000/api"
-        self.test_results = []
-    
-    def run_tests(self):
-        print("🚀 STARTING SIMPLE AUTHENTICATION TESTS")
-        print("=" * 50)
-        
-        try:
-            self.test_registration()
-            self.test_login()
-            self.test_protected_endpoint()
-            self.test_duplicate_registration()
-            self.test_invalid_login()
-            
-            self.print_results()
-            return all(r['passed'] for r in self.test_results)
-        except Exception as e:
-            print(f"❌ Test suite failed: {e}")
-            return False
-    
-    def test_registration(self):
-        print("🧪 Testing User Registration...")
-        
-        test_user = {
-            'username': f'testuser_{os.getpid()}_{os.times()[4]}',
-            'email': f'test_{os.getpid()}_{os.times()[4]}@example.com',
-            'password': 'TestPass123!'
-        }
-        
-        try:
-            response = requests.post(f'{self.base_url}/register/', json=test_user, timeout=10)
-            data = response.json()
-            
-            if response.status_code == 201 and data.get('success'):
-                print(f"✅ Registration test passed! User: {data['user']['email']}")
-                self.test_results.append({'test': 'Registration', 'passed': True})
-                return data
-            else:
-                raise Exception(f"Failed: {response.status_code} - {data}")
-                
-        except Exception as e:
-            print(f"❌ Registration test failed: {e}")
-            self.test_results.append({'test': 'Registration', 'passed': False})
-            return None
-    
-    def test_login(self):
-        print("🧪 Testing JWT Login...")
-        
-        # Create a test user first
-        test_user = {
-            'username': f'login_test_{os.getpid()}',
-            'email': f'login_test_{os.getpid()}@example.com',
-            'password': 'LoginTest123!'
-        }
-        
-        try:
-            # Register
-            requests.post(f'{self.base_url}/register/', json=test_user, timeout=10)
-            
-            # Login
-            response = requests.post(f'{self.base_url}/token/', json={
-                'email': test_user['email'],
-                'password': test_user['password']
-            }, timeout=10)
-            
-            data = response.json()
-            
-            if response.status_code == 200 and 'access' in data:
-                print(f"✅ JWT Login test passed! Token: {data['access'][:20]}...")
-                self.test_results.append({'test': 'JWT Login', 'passed': True})
-                return data['access']
-            else:
-                raise Exception(f"Failed: {response.status_code} - {data}")
-                
-        except Exception as e:
-            print(f"❌ Login test failed: {e}")
-            self.test_results.append({'test': 'JWT Login', 'passed': False})
-            return None
-    
-    def test_protected_endpoint(self):
-        print("🧪 Testing Protected Endpoint...")
-        
-        try:
-            # Create user and get token
-            test_user = {
-                'username': f'protected_test_{os.getpid()}',
-                'email': f'protected_{os.getpid()}@example.com',
-                'password': 'Protected123!'
-            }
-            
-            requests.post(f'{self.base_url}/register/', json=test_user, timeout=10)
-            
-            token_response = requests.post(f'{self.base_url}/token/', json={
-                'email': test_user['email'],
-                'password': test_user['password']
-            }, timeout=10)
-            
-            token_data = token_response.json()
-            access_token = token_data['access']
-            
-            # Access protected endpoint
-            headers = {'Authorization': f'Bearer {access_token}'}
-            response = requests.get(f'{self.base_url}/test/', headers=headers, timeout=10)
-            data = response.json()
-            
-            if response.status_code == 200 and 'user_email' in data:
-                print(f"✅ Protected endpoint test passed! User: {data['user_email']}")
-                self.test_results.append({'test': 'Protected Endpoint', 'passed': True})
-            else:
-                raise Exception(f"Failed: {response.status_code} - {data}")
-                
-        except Exception as e:
-            print(f"❌ Protected endpoint test failed: {e}")
-            self.test_results.append({'test': 'Protected Endpoint', 'passed': False})
-    
-    def test_duplicate_registration(self):
-        print("🧪 Testing Duplicate Registration Prevention...")
-        
-        try:
-            test_user = {
-                'username': f'duplicate_test_{os.getpid()}',
-                'email': f'duplicate_{os.getpid()}@example.com',
-                'password': 'Duplicate123!'
-            }
-            
-            # First registration
-            requests.post(f'{self.base_url}/register/', json=test_user, timeout=10)
-            
-            # Try duplicate email
-            duplicate_user = {
-                'username': 'different_username',
-                'email': test_user['email'],  # Same email
-                'password': 'DifferentPass123!'
-            }
-            
-            response = requests.post(f'{self.base_url}/register/', json=duplicate_user, timeout=10)
-            data = response.json()
-            
-            if response.status_code == 400 and 'error' in data:
-                print(f"✅ Duplicate prevention test passed: {data['error']}")
-                self.test_results.append({'test': 'Duplicate Prevention', 'passed': True})
-            else:
-                raise Exception(f"Expected 400 but got {response.status_code}")
-                
-        except Exception as e:
-            print(f"❌ Duplicate test failed: {e}")
-            self.test_results.append({'test': 'Duplicate Prevention', 'passed': False})
-    
-    def test_invalid_login(self):
-        print("🧪 Testing Invalid Login...")
-        
-        try:
-            response = requests.post(f'{self.base_url}/token/', json={
-                'email': 'nonexistent@example.com',
-                'password': 'wrongpassword'
-            }, timeout=10)
-            
-            if response.status_code in [401, 400]:
-                print("✅ Invalid login test passed!")
-                self.test_results.append({'test': 'Invalid Login', 'passed': True})
-            else:
-                raise Exception(f"Expected 401/400 but got {response.status_code}")
-                
-        except Exception as e:
-            print(f"❌ Invalid login test failed: {e}")
-            self.test_results.append({'test': 'Invalid Login', 'passed': False})
-    
-    def print_results(self):
-        print("=" * 50)
-        print("📊 TEST RESULTS:")
-        print("=" * 50)
-        
-        passed = sum(1 for r in self.test_results if r['passed'])
-        total = len(self.test_results)
-        
-        for result in self.test_results:
-            status = "✅ PASS" if result['passed'] else "❌ FAIL"
-            print(f"{status} - {result['test']}")
-        
-        print("=" * 50)
-        print(f"🏆 {passed}/{total} tests passed")
-        
-        if passed == total:
-            print("🎉 ALL TESTS PASSED!")
-        else:
-            print("⚠️  Some tests failed")
-
-if __name__ == "__main__":
-    tests = SimpleAuthTests()
-    success = tests.run_tests()
-    sys.exit(0 if success else 1)
+if __name__ == '__main__':
+    sys.exit(main())